@@ -18,6 +18,19 @@ app = typer.Typer(name="music manager")
 print(__name__)
 
 
+@app.callback()
+def main(
+    probe_backend: str = typer.Option(
+        None, help="元数据读取方式: native, ffprobe, auto (默认读取配置)"
+    ),
+):
+    """Music Manager"""
+    if probe_backend is not None:
+        if probe_backend not in ("native", "ffprobe", "auto"):
+            raise typer.BadParameter(f"不支持的读取方式: {probe_backend}")
+        settings.probe_backend = probe_backend
+
+
 @app.command(name="server")
 def server():
     return
@@ -38,13 +51,70 @@ def init():
 
 
 @app.command(name="import")
-def imports(path: Path = typer.Argument(help="需要导入的音乐文件或包含音乐文件的目录")):
-    """导入音乐文件或目录"""
-    from music_manager.music_lib.importer import import_music
+def imports(
+    path: Path = typer.Argument(help="需要导入的音乐文件或包含音乐文件的目录"),
+    mode: str = typer.Option(None, help="放入音乐库的方式: link, copy, move (默认读取配置)"),
+    hash_workers: int = typer.Option(None, help="计算摘要的线程数 (默认读取配置)"),
+    probe_workers: int = typer.Option(None, help="读取标签的线程数 (默认读取配置)"),
+    place_workers: int = typer.Option(None, help="放入音乐库的线程数 (默认读取配置)"),
+    resume: bool = typer.Option(False, help="从上次中断的目录导入继续, 跳过已完成的文件"),
+):
+    """导入音乐文件或目录, 目录以流水线并行导入"""
+    from music_manager.music_lib.importer import import_music, import_tree
+
+    if mode is not None and mode not in ("link", "copy", "move"):
+        raise typer.BadParameter(f"不支持的导入方式: {mode}")
+    if path.is_dir():
+        res = import_tree(
+            path,
+            mode=mode,
+            hash_workers=hash_workers,
+            probe_workers=probe_workers,
+            place_workers=place_workers,
+            resume=resume,
+        )
+    else:
+        res = import_music(path, mode=mode)
+    rich.print(res)
+
 
-    res = import_music(path)
+@app.command(name="index")
+def index(
+    path: Path = typer.Argument(None, help="音乐库目录, 默认读取配置"),
+    workers: int = typer.Option(None, help="探测的并行数量, 默认 CPU 核数"),
+):
+    """增量更新音乐库索引: 只探测新增或已变化的文件, 删除已不存在的文件"""
+    from music_manager.music_lib.database import init as init_db
+    from music_manager.music_lib.music_index import index_library
+
+    init_db()
+    res = index_library(path, workers=workers)
     rich.print(res)
 
 
+@app.command(name="stats")
+def stats(
+    rebuild: bool = typer.Option(False, help="由音乐表重新计算全部统计"),
+    top: int = typer.Option(10, help="显示音乐最多的艺术家 / 专辑数量"),
+):
+    """音乐库统计"""
+    from music_manager.music_lib.database import init as init_db
+    from music_manager.music_lib.stats import library_stats, rebuild_stats
+
+    init_db()
+    if rebuild:
+        rebuild_stats()
+    rich.print(library_stats(top))
+
+
+@app.command(name="cache-prune")
+def cache_prune():
+    """清理元数据缓存: 删除已变化或已删除文件的条目, 淘汰超出数量的条目, 删除不再引用的封面"""
+    from music_manager.music_lib.probe_cache import probe_cache
+
+    removed = probe_cache.prune()
+    rich.print(f"[green]已清理 {removed} 条缓存[/green]")
+
+
 if __name__ == "__main__":
     app()
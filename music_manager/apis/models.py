@@ -6,14 +6,20 @@
 @Date-Time  : 2023/12/22 22:23
 
 """
-import base64
+import asyncio
 import datetime
 from pathlib import Path
 from typing import Optional, Literal, Any
 
 from sqlmodel import SQLModel, Field
 
-from music_manager.music_lib.ffmpeg_operator import get_music_artwork
+from music_manager.config import settings
+from music_manager.music_lib.artwork_store import ArtworkInfo, artwork_store
+from music_manager.music_lib.ffmpeg_operator import (
+    get_music_artwork,
+    get_music_artwork_async,
+    get_music_meta_artwork_native_async,
+)
 from music_manager.music_lib.model_ffmpeg import FfprobrModel
 
 NoneType = type(None)
@@ -38,6 +44,9 @@ ResourceModify = Literal[
     "acoustid",  # AcoustID
 ]
 
+# 封面接口 (router.artwork), 前端通过 <img src> 按需加载并缓存
+ARTWORK_URL = "/api/artwork/{digest}"
+
 MusicIDModify = Literal[
     "tag",
     "format",
@@ -69,8 +78,8 @@ class MusicId3(SQLModel):
     uuid: str | None = Field(None, description="musicbrainz上的Music UUID")
 
     # Music 相关
-    title: str = Field(None, description="歌曲名 - tag")
-    artist: str = Field(None, description="歌手 - tag")
+    title: str | None = Field(None, description="歌曲名 - tag")
+    artist: str | None = Field(None, description="歌手 - tag")
     lyrics: str | None = Field(None, description="歌词 - tag")
     year: int | None = Field(None, description="年份 - tag")
     comment: str | None = Field(None, description="备注 - tag")
@@ -88,7 +97,8 @@ class MusicId3(SQLModel):
     bit_rate: int | None = Field(None, description="码率 - format")
 
     # 封面相关
-    artwork: str | None = Field(None, description="封面 Base64 Image")
+    artwork: str | None = Field(None, description="封面 URL, 旧数据为 Base64 Image")
+    artwork_hash: str | None = Field(None, description="封面摘要 - ArtworkStore")
     artwork_w: int | None = Field(None, description="封面宽高 - Video Stream")
     artwork_h: int | None = Field(None, description="封面宽高 - Video Stream")
     artwork_size: int | None = Field(None, description="封面占用空间 - 计算得到")
@@ -111,14 +121,64 @@ class MusicId3(SQLModel):
     @classmethod
     def from_ffprobe(cls, music_path: str | Path):
         music_path = Path(music_path)
-        try:
-            artwork = base64.b64encode(get_music_artwork(music_path)).decode()
-            artwork_size = len(artwork)
-            artwork = "data:image/jpeg;base64," + artwork
-        except RuntimeError:
-            artwork = None
-            artwork_size = None
-        ffprobe: FfprobrModel = FfprobrModel.from_media_file(music_path)
+        if settings.ffmpeg_config.single_pass:
+            ffprobe, artwork = FfprobrModel.from_media_file_with_artwork(music_path)
+        else:
+            ffprobe = FfprobrModel.from_media_file(music_path)
+            try:
+                artwork = get_music_artwork(music_path)
+            except RuntimeError:
+                artwork = None
+        return cls.from_ffprobe_model(music_path, ffprobe, artwork)
+
+    @classmethod
+    async def from_ffprobe_async(cls, music_path: str | Path):
+        """
+        from_ffprobe 的异步版本, ffprobe / ffmpeg 并发执行
+        native 读取 (settings.probe_backend) 一次得到元数据与封面, 不并发读取同一个文件.
+        """
+        music_path = Path(music_path)
+        if settings.ffmpeg_config.single_pass:
+            ffprobe, artwork = await FfprobrModel.from_media_file_with_artwork_async(
+                music_path
+            )
+        elif native := await get_music_meta_artwork_native_async(music_path):
+            ffprobe, artwork = FfprobrModel.from_meta(native[0]), native[1]
+        else:
+            ffprobe, artwork = await asyncio.gather(
+                FfprobrModel.from_media_file_async(music_path),
+                get_music_artwork_async(music_path),
+                return_exceptions=True,
+            )
+            if isinstance(ffprobe, BaseException):
+                raise ffprobe
+            if isinstance(artwork, RuntimeError):
+                artwork = None
+            elif isinstance(artwork, BaseException):
+                raise artwork
+        info = await artwork_store.put_async(artwork) if artwork else None
+        return cls.from_ffprobe_info(music_path, ffprobe, info)
+
+    @classmethod
+    def from_ffprobe_model(
+        cls, music_path: Path, ffprobe: FfprobrModel, artwork: bytes | None = None
+    ):
+        """由 ffprobe 结果与封面构建, 封面保存到 ArtworkStore 中, 只记录摘要"""
+        info = artwork_store.put(artwork) if artwork else None
+        return cls.from_ffprobe_info(music_path, ffprobe, info)
+
+    @classmethod
+    def from_ffprobe_info(
+        cls, music_path: Path, ffprobe: FfprobrModel, info: ArtworkInfo | None = None
+    ):
+        """由 ffprobe 结果与已保存的封面 (ArtworkStore.put) 构建"""
+        stream_video = ffprobe.stream_video[0] if ffprobe.stream_video else None
+        artwork_w = stream_video.width if stream_video else None
+        artwork_h = stream_video.height if stream_video else None
+        artwork_hash = artwork_size = None
+        if info is not None:
+            artwork_hash, artwork_size = info.digest, info.size
+            artwork_w, artwork_h = info.width or artwork_w, info.height or artwork_h
         return cls(
             title=ffprobe.format.tags.title,  # tag
             artist=ffprobe.format.tags.artist,  # tag
@@ -130,13 +190,15 @@ class MusicId3(SQLModel):
             bit_rate=ffprobe.format.bit_rate,  # format
             tracknumber=0,  # tag CD Track Number
             discnumber=0,  # tag CD Disc Number
-            artwork=artwork,  # 封面: get_music_artwork
-            artwork_w=ffprobe.stream_video[0].width,  # video stream
-            artwork_h=ffprobe.stream_video[0].height,  # video stream
+            artwork=artwork_hash and ARTWORK_URL.format(digest=artwork_hash),
+            artwork_hash=artwork_hash,  # 封面: get_music_artwork -> ArtworkStore
+            artwork_w=artwork_w,  # video stream
+            artwork_h=artwork_h,  # video stream
             artwork_size=artwork_size,  # 封面大小，计算得到
             album=ffprobe.format.tags.album,  # tag
             album_type=ffprobe.format.tags.album_type,  # tag
             genre=ffprobe.format.tags.genre,  # tag
+            file_full_path=music_path,  # 文件全路径
             filename=music_path.name,  # 文件名
             albumartist=ffprobe.format.tags.album_artist,
             language="中文",  # FIXME: detect_language
@@ -151,27 +213,36 @@ class MusicId3(SQLModel):
         from mutagen import File as MutagenFile
 
         _mu = MutagenFile(music_path)
+        tags = _mu.tags or {}
+
+        def _tag(key):
+            # Vorbis comment 等的值为列表, 取第一个
+            value = tags.get(key)
+            return value[0] if isinstance(value, list) and value else value
+
+        artwork = artwork_store.put(_mu.pictures[0].data) if _mu.pictures else None
 
         return cls(
-            title=_mu.tags["title"],  # tag
-            artist=_mu.tags.get("artist"),  # tag
-            year=_mu.tags.get("year"),  # tag
-            comment=_mu.tags.get("comment"),  # tag
-            lyrics=_mu.tags.get("lyrics"),  # tag
+            title=_tag("title"),  # tag
+            artist=_tag("artist"),  # tag
+            year=_tag("year"),  # tag
+            comment=_tag("comment"),  # tag
+            lyrics=_tag("lyrics"),  # tag
             duration=_mu.info.length,  # format
             size=Path(_mu.filename).stat().st_size,  # format
             bit_rate=_mu.info.bitrate,  # format
-            tracknumber=_mu.tags.get("tracknumber"),  # tag CD Track Number
-            discnumber=_mu.tags.get("discnumber"),  # tag CD Disc Number
-            artwork=_mu.pictures[0].data if _mu.pictures else None,  # 封面
+            tracknumber=_tag("tracknumber"),  # tag CD Track Number
+            discnumber=_tag("discnumber"),  # tag CD Disc Number
+            artwork=artwork and ARTWORK_URL.format(digest=artwork.digest),
+            artwork_hash=artwork and artwork.digest,  # 封面
             artwork_w=_mu.pictures[0].width if _mu.pictures else None,  # video stream
             artwork_h=_mu.pictures[0].height if _mu.pictures else None,  # video stream
-            artwork_size=_mu.pictures[0].data.__len__() if _mu.pictures else None,
-            album=_mu.tags.get("album"),  # tag
-            album_type=_mu.tags.get("album_type"),
-            genre=_mu.tags.get("genre"),
+            artwork_size=artwork and artwork.size,
+            album=_tag("album"),  # tag
+            album_type=_tag("album_type"),
+            genre=_tag("genre"),
             filename=music_path.name,
-            albumartist=_mu.tags.get("albumartist"),
+            albumartist=_tag("albumartist"),
             language="中文",  # FIXME: detect_language
         )
 
@@ -230,9 +301,80 @@ class FetchMusic(SQLModel):
     album_img: str
 
 
+class SearchResult(SQLModel):
+    """分页的搜索结果"""
+
+    total: int
+    page: int
+    size: int
+    items: list[MusicId3]
+
+
+class LibraryPage(SQLModel):
+    """音乐库的一页 (键集分页), next_cursor 为空表示没有下一页"""
+
+    items: list[dict[str, Any]]
+    next_cursor: str | None = None
+
+
+class StatsItem(SQLModel):
+    """一个分组的统计: 艺术家 / 专辑 / 文件格式"""
+
+    name: str
+    artist: str | None = None  # 专辑艺术家
+    tracks: int
+    duration: float
+    size: int
+
+
+class LibraryStats(SQLModel):
+    """音乐库统计"""
+
+    tracks: int
+    duration: float
+    size: int
+    artists: int
+    albums: int
+    formats: list[StatsItem]
+    top_artists: list[StatsItem]
+    top_albums: list[StatsItem]
+
+
+class ResourceCacheStats(SQLModel):
+    """第三方平台结果缓存的计数"""
+
+    memory_hits: int = 0  # 内存命中
+    disk_hits: int = 0  # SQLite 命中
+    stale_hits: int = 0  # 已过期, 返回旧结果并在后台刷新
+    misses: int = 0  # 未命中, 请求平台
+    refresh_errors: int = 0  # 后台刷新失败
+    memory_entries: int = 0  # 当前内存中的结果数量
+
+
+class ProviderStatus(SQLModel):
+    """第三方平台的限速与熔断状态"""
+
+    provider: str
+    rate: float  # 每秒的请求数, 0 不限速
+    tokens: float  # 当前可用的令牌, 负数表示排队中的请求
+    state: Literal["closed", "open", "half_open"]  # 熔断状态
+    failures: int  # 连续失败的次数
+    retry_after: float  # 熔断时距离下一次试探的秒数
+    requests: int = 0  # 发出的请求 (含重试)
+    retries: int = 0  # 重试
+    throttled: int = 0  # 因限速等待
+    rejected: int = 0  # 熔断时直接失败
+
+
 class ResponseModel(SQLModel):
     code: str = "200"
-    data: None | str | list[File] | MusicId3 | list[FetchMusic] | list[
+    data: None | str | list[
+        File
+    ] | MusicId3 | SearchResult | LibraryPage | LibraryStats | ResourceCacheStats | list[
+        ProviderStatus
+    ] | list[
+        FetchMusic
+    ] | list[
         dict
     ] | Any = None
     message: str = "success"
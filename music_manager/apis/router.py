@@ -8,13 +8,21 @@
 """
 import logging
 from pathlib import Path
-from typing import Any
+from typing import Any, Literal
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Query, Request, Response
+from fastapi.responses import FileResponse
 from pydantic import BaseModel
 
 from music_manager.apis.models import ResponseModel, File, MusicId3, ResourceModify
-from music_manager.music_lib.music_resource import MusicResource
+from music_manager.music_lib.artwork_store import artwork_store
+from music_manager.music_lib.ffmpeg_operator import get_music_artwork_async
+from music_manager.music_lib.music_resource import MusicResource, provider_status
+from music_manager.music_lib.library import SORT_FIELDS, list_library_async
+from music_manager.music_lib.models import Music
+from music_manager.music_lib.resource_cache import resource_cache
+from music_manager.music_lib.search import search_async
+from music_manager.music_lib.stats import library_stats_async
 
 router = APIRouter()
 
@@ -70,7 +78,7 @@ class MusicId3Body(BaseModel):
 
 
 @router.post("/music_id3/")
-def music_id3(body: MusicId3Body):
+async def music_id3(body: MusicId3Body):
     """获取音乐文件的元信息"""
     full_path = body.file_path.joinpath(body.file_name)
     if full_path.suffix in ["txt", "lrc"]:
@@ -80,7 +88,93 @@ def music_id3(body: MusicId3Body):
     if not full_path.exists() or full_path.suffix not in [".flac", ".mp3", ".wav"]:
         return ResponseModel(code="400", message="文件不存在", result=False)
 
-    return ResponseModel(data=MusicId3.from_ffprobe(full_path))
+    return ResponseModel(data=await MusicId3.from_ffprobe_async(full_path))
+
+
+@router.get("/search/")
+async def search(
+    q: str, page: int = Query(1, ge=1), size: int = Query(20, ge=1, le=200)
+):
+    """搜索 标题 / 艺术家 / 专辑 / 歌词, 按相关度排序"""
+    return ResponseModel(data=await search_async(q, page=page, size=size))
+
+
+@router.get("/music/{music_id}")
+async def music(music_id: int):
+    """按 id 获取库中的音乐"""
+    data = await Music.get_async(music_id)
+    if data is None:
+        return ResponseModel(code="404", message="音乐不存在", result=False)
+    return ResponseModel(data=MusicId3.model_validate(data, from_attributes=True))
+
+
+@router.get("/library/")
+async def library(
+    sort: str = Query("title", description=f"排序列: {', '.join(SORT_FIELDS)}"),
+    order: Literal["asc", "desc"] = "asc",
+    cursor: str | None = Query(None, description="上一页的 next_cursor"),
+    size: int = Query(50, ge=1, le=500),
+    fields: str | None = Query(None, description="以逗号分隔的列, 歌词等较大的列需明确指定"),
+):
+    """浏览音乐库, 键集分页"""
+    names = [_.strip() for _ in fields.split(",") if _.strip()] if fields else None
+    try:
+        data = await list_library_async(sort, order, cursor, size, names)
+    except ValueError as e:
+        return ResponseModel(code="400", message=str(e), result=False)
+    return ResponseModel(data=data)
+
+
+@router.get("/stats/")
+async def stats(top: int = Query(20, ge=0, le=200)):
+    """音乐库统计: 总计 / 文件格式分布 / 音乐最多的艺术家与专辑"""
+    return ResponseModel(data=await library_stats_async(top))
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match 使用弱比较 (RFC 9110 13.1.2)"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    tags = {_.strip().removeprefix("W/") for _ in if_none_match.split(",")}
+    return "*" in tags or etag in tags
+
+
+def _artwork_response(
+    request: Request, path: Path | None, cache_control: str
+) -> Response:
+    if path is None:
+        return Response(status_code=404)
+    headers = {"ETag": f'"{path.stem}"', "Cache-Control": cache_control}
+    if _etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(
+        path, media_type=artwork_store.MIME[path.suffix], headers=headers
+    )
+
+
+@router.get("/artwork/{digest}")
+def artwork(request: Request, digest: str, size: int | None = None):
+    """按摘要获取封面, 内容不可变, 允许浏览器长期缓存; 缩略图在第一次请求时生成"""
+    return _artwork_response(
+        request,
+        artwork_store.thumbnail(digest, size),
+        "public, max-age=31536000, immutable",
+    )
+
+
+@router.get("/music_artwork/")
+async def music_artwork(request: Request, file_path: Path, size: int | None = None):
+    """获取音乐文件的封面, 文件可能被修改, 浏览器每次使用 ETag 重新验证"""
+    if not file_path.is_file():
+        return Response(status_code=404)
+    try:
+        data = await get_music_artwork_async(file_path)
+    except RuntimeError:
+        return Response(status_code=404)
+    digest = (await artwork_store.put_async(data)).digest
+    path = await artwork_store.thumbnail_async(digest, size)
+    return _artwork_response(request, path, "no-cache")
 
 
 class FetchId3ByTitleBody(BaseModel):
@@ -125,6 +219,18 @@ async def fetch_lyric(body: FetchLyricBody):
     )
 
 
+@router.get("/resource_cache/")
+def resource_cache_stats():
+    """第三方平台结果缓存的命中 / 未命中计数"""
+    return ResponseModel(data=resource_cache.stats())
+
+
+@router.get("/resource_status/")
+def resource_status():
+    """各平台的限速与熔断状态"""
+    return ResponseModel(data=provider_status())
+
+
 @router.post("/translation_lyc")
 def translation_lyc():
     """翻译歌词"""
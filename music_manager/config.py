@@ -7,6 +7,7 @@
 
 """
 from pathlib import Path
+from typing import Literal
 
 from pydantic import BaseModel
 from pydantic_settings import BaseSettings
@@ -45,6 +46,133 @@ class FeishuConfig(BaseModel):
     enable: bool = False
 
 
+class FfmpegConfig(BaseModel):
+    """"""
+    # 单次 ffprobe 同时获取元数据与封面; 封面以十六进制转储传输, 封面越大越慢,
+    # 仅在进程启动开销大 (冷 NAS / 慢 fork) 时划算, 参见 tests/bench_probe.py
+    single_pass: bool = False
+    # 单次调用的超时时间 (秒)
+    timeout: float = 60
+    # 异步调用时同时运行的 ffmpeg/ffprobe 数量, 为空时使用 CPU 核数
+    concurrency: int | None = None
+    # 批量探测 (batch_probe.probe_many) 的并行数量, 为空时使用 CPU 核数
+    batch_workers: int | None = None
+
+
+class ProbeCacheConfig(BaseModel):
+    """"""
+    enable: bool = True
+    # 最多缓存的文件数量, 超出后淘汰最久未访问的条目
+    max_entries: int = 200_000
+
+
+class ArtworkConfig(BaseModel):
+    """"""
+    # 缩略图边长, 第一次请求该尺寸时生成
+    thumbnail_sizes: list[int] = [64, 256, 512]
+
+
+class DatabaseConfig(BaseModel):
+    """"""
+    # 输出所有 SQL 语句, 仅用于调试
+    echo: bool = False
+    # 以下 PRAGMA 在每个连接建立时设置
+    # WAL: 导入 (写) 时不阻塞读
+    journal_mode: str = "WAL"
+    # WAL 下 NORMAL 只在 checkpoint 时 fsync, 断电可能丢失最近的事务但不会损坏
+    synchronous: str = "NORMAL"
+    # 内存映射读取的字节数
+    mmap_size: int = 256 * 1024 * 1024
+    # 页缓存, 负数表示 KiB
+    cache_size: int = -64 * 1024
+    # 数据库被锁定时等待的毫秒数
+    busy_timeout: int = 5000
+
+
+class HttpConfig(BaseModel):
+    """"""
+    # 第三方平台 (music_resource) 的 HTTP 客户端, 每个平台一个, 服务运行期间复用连接
+    # 单次请求的超时时间 (秒)
+    timeout: float = 5
+    # 每个平台最多同时打开的连接数
+    max_connections: int = 20
+    # 空闲时保留的连接数, 与保留的秒数
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 60
+    # 使用 HTTP/2, 同一连接上并发多个请求 (需要 h2: pip install httpx[http2])
+    http2: bool = False
+
+
+class RateLimitConfig(BaseModel):
+    """"""
+    # 第三方平台请求的限速 (令牌桶), 每个平台独立
+    # 每秒的请求数, rates 中未列出的平台使用 default_rate; 0 表示不限速
+    default_rate: float = 5
+    rates: dict[str, float] = {}
+    # 空闲之后最多连续发出的请求数
+    burst: int = 10
+    # 429 / 5xx / 网络错误时的重试次数; 等待 0 ~ backoff * 2^n 秒的随机值, 不超过 max_backoff
+    retries: int = 2
+    backoff: float = 0.5
+    max_backoff: float = 10
+    # 熔断: 连续 failure_threshold 个请求失败 (重试用尽) 后, cooldown 秒内直接失败, 之后放行一个请求试探
+    failure_threshold: int = 5
+    cooldown: float = 30
+
+
+class SmartTagConfig(BaseModel):
+    """"""
+    # 智能标签 (smart_tag) 同时查询的平台, 结果按此顺序交替合并
+    providers: list[str] = ["migu", "qmusic", "kuwo"]
+    # 整体的时间预算 (秒), 到期时返回已完成平台的结果
+    deadline: float = 3.0
+    # 第一个平台返回结果后, 最多再等待其他平台的秒数
+    grace: float = 0.3
+    # 单个平台的超时时间 (秒), timeouts 中未列出的平台使用 default_timeout
+    default_timeout: float = 2.5
+    timeouts: dict[str, float] = {}
+
+
+class ResourceCacheConfig(BaseModel):
+    """"""
+    # 缓存第三方平台的搜索 / 歌词结果: 内存 LRU + SQLite (data/resource_cache.db)
+    enable: bool = True
+    # 内存中最多缓存的结果数量
+    memory_entries: int = 1024
+    # SQLite 中最多缓存的结果数量, 超出后淘汰最久未访问的条目
+    max_entries: int = 100_000
+    # 结果的有效期 (秒), ttl 中未列出的平台使用 default_ttl
+    default_ttl: float = 24 * 3600
+    ttl: dict[str, float] = {"qmusic": 3 * 24 * 3600}
+    # 过期之后的这段时间 (秒) 内仍返回旧结果, 同时在后台刷新
+    stale_ttl: float = 7 * 24 * 3600
+
+
+class WatcherConfig(BaseModel):
+    """"""
+    # 服务运行时监听音乐库变化并更新索引 (需要 watchdog)
+    enable: bool = True
+    # 事件平静多少秒后更新索引, 合并成批的文件复制
+    debounce: float = 2.0
+    # 持续有事件时, 最多等待多少秒更新一次
+    max_delay: float = 30.0
+
+
+class ImportConfig(BaseModel):
+    """"""
+    # 目录导入流水线 (importer.import_tree) 各阶段的线程数, 为空时按 CPU 核数
+    # 计算摘要: 读取文件与 sha1 释放 GIL
+    hash_workers: int | None = None
+    # 读取标签 (settings.probe_backend)
+    probe_workers: int | None = None
+    # 放入音乐库 (链接 / 复制), 跨文件系统复制时受磁盘限制
+    place_workers: int = 4
+    # 阶段之间队列的长度, 队列满时上游阶段等待
+    queue_size: int = 256
+    # 每个事务写入的行数
+    chunk_size: int = 500
+
+
 class Settings(BaseSettings):
     # 项目名称
     app_name: str = "music_manager"
@@ -58,9 +186,23 @@ class Settings(BaseSettings):
     music_library: Path = Path(__file__).parent.parent.joinpath("music_library")
     # 数据目录
     data_dir: Path = Path(__file__).parent.parent.joinpath("data")
+    # 元数据读取方式: native (mutagen, 进程内), ffprobe, auto (native 不支持时回退 ffprobe)
+    probe_backend: Literal["native", "ffprobe", "auto"] = "auto"
+    # 导入文件的方式: link (同一文件系统时硬链接), copy, move
+    import_mode: Literal["link", "copy", "move"] = "link"
 
     fastapi_config: FastAPIConfig = FastAPIConfig()
     feishu_config: FeishuConfig = FeishuConfig()
+    ffmpeg_config: FfmpegConfig = FfmpegConfig()
+    probe_cache_config: ProbeCacheConfig = ProbeCacheConfig()
+    artwork_config: ArtworkConfig = ArtworkConfig()
+    watcher_config: WatcherConfig = WatcherConfig()
+    database_config: DatabaseConfig = DatabaseConfig()
+    import_config: ImportConfig = ImportConfig()
+    http_config: HttpConfig = HttpConfig()
+    resource_cache_config: ResourceCacheConfig = ResourceCacheConfig()
+    rate_limit_config: RateLimitConfig = RateLimitConfig()
+    smart_tag_config: SmartTagConfig = SmartTagConfig()
 
 
 config = IncludeLazyConfig("music_manager", __name__)
@@ -1,10 +1,31 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse
 
-from apis.router import router as task_router
+from music_manager.apis.router import router as task_router
+from music_manager.config import settings
+from music_manager.music_lib.database import get_async_engine, init as init_db
+from music_manager.music_lib.music_resource import close_clients, open_clients
+from music_manager.music_lib.watcher import LibraryWatcher
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_db()
+    open_clients()
+    watcher = LibraryWatcher(settings.music_library)
+    if settings.watcher_config.enable:
+        await watcher.start()
+    yield
+    await watcher.stop()
+    await close_clients()
+    if (async_engine := get_async_engine()) is not None:
+        await async_engine.dispose()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 app.include_router(task_router, prefix="/api")
 
 app.mount("/static", StaticFiles(directory="music_manager/static"), name="static")
@@ -0,0 +1,242 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : artwork_store.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/18 22:30
+
+封面存储
+
+按内容摘要 (sha1) 保存封面, 相同的封面只保存一次:
+
+    data/artwork/ab/abcdef....jpg        原图
+    data/artwork/ab/abcdef..._256.jpg    缩略图 (settings.artwork_config.thumbnail_sizes)
+
+缩略图在第一次请求该尺寸时由 ffmpeg 生成 (thumbnail / thumbnail_async).
+put / thumbnail 读写文件, 在事件循环中使用 put_async / thumbnail_async.
+collect_garbage 删除不再被引用的封面.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Iterable
+
+from pydantic import BaseModel
+
+from music_manager.config import settings
+from music_manager.music_lib.native_probe import image_size
+
+__all__ = ["ArtworkInfo", "ArtworkStore", "artwork_store"]
+
+logger = logging.getLogger("music_manager.music_lib.artwork_store")
+
+
+class ArtworkInfo(BaseModel):
+    digest: str
+    mime: str
+    size: int
+    width: int | None = None
+    height: int | None = None
+
+
+def _suffix(data: bytes) -> str:
+    return ".png" if data[:4] == b"\x89PNG" else ".jpg"
+
+
+class ArtworkStore:
+    """按内容寻址的封面存储"""
+
+    MIME = {".jpg": "image/jpeg", ".png": "image/png"}
+
+    def __init__(self, root: Path, thumbnail_sizes: list[int] = ()):
+        self.root = Path(root)
+        self.thumbnail_sizes = sorted(thumbnail_sizes)
+
+    @staticmethod
+    def digest(data: bytes) -> str:
+        return hashlib.sha1(data).hexdigest()
+
+    def _dir(self, digest: str) -> Path:
+        return self.root.joinpath(digest[:2])
+
+    def _original(self, digest: str) -> Path | None:
+        if len(digest) != 40 or not digest.isalnum():
+            return None
+        for suffix in self.MIME:
+            original = self._dir(digest).joinpath(digest + suffix)
+            if original.exists():
+                return original
+        return None
+
+    def _tier(self, size: int | None) -> int | None:
+        """不小于 size 的最小缩略图边长"""
+        if size is None:
+            return None
+        return next((_ for _ in self.thumbnail_sizes if _ >= size), None)
+
+    def path(self, digest: str, size: int | None = None) -> Path | None:
+        """
+        封面文件路径 (不生成缩略图)
+        :param digest: 封面摘要
+        :param size: 需要的边长, 返回不小于该边长的最小缩略图, 没有时返回原图
+        :return: 封面不存在时返回 None
+        """
+        original = self._original(digest)
+        if original is None:
+            return None
+        tier = self._tier(size)
+        if tier is not None:
+            thumbnail = original.with_name(f"{digest}_{tier}.jpg")
+            if thumbnail.exists():
+                return thumbnail
+        return original
+
+    def thumbnail(self, digest: str, size: int | None = None) -> Path | None:
+        """同 path, 缩略图不存在时先生成 (启动 ffmpeg, 阻塞)"""
+        from music_manager.music_lib.ffmpeg_operator import runner
+
+        path = self.path(digest, size)
+        job = self._thumbnail_job(path, size)
+        if job is None:
+            return path
+        try:
+            runner(job[0])
+            self._install_thumbnails(job[1])
+        except (RuntimeError, TimeoutError, FileNotFoundError) as e:
+            logger.warning("生成缩略图失败, 使用原图: %s: %s", path, e)
+        finally:
+            shutil.rmtree(job[1], ignore_errors=True)
+        return self.path(digest, size)
+
+    async def thumbnail_async(self, digest: str, size: int | None = None):
+        """thumbnail 的异步版本"""
+        from music_manager.music_lib.ffmpeg_operator import async_runner
+
+        path = self.path(digest, size)
+        job = self._thumbnail_job(path, size)
+        if job is None:
+            return path
+        try:
+            await async_runner(job[0])
+            self._install_thumbnails(job[1])
+        except (RuntimeError, TimeoutError, FileNotFoundError) as e:
+            logger.warning("生成缩略图失败, 使用原图: %s: %s", path, e)
+        finally:
+            shutil.rmtree(job[1], ignore_errors=True)
+        return self.path(digest, size)
+
+    def get(self, digest: str, size: int | None = None) -> bytes | None:
+        path = self.path(digest, size)
+        return path.read_bytes() if path else None
+
+    def info(self, digest: str) -> ArtworkInfo | None:
+        path = self.path(digest)
+        if path is None:
+            return None
+        data = path.read_bytes()
+        width, height = image_size(data)
+        return ArtworkInfo(
+            digest=digest,
+            mime=self.MIME[path.suffix],
+            size=len(data),
+            width=width,
+            height=height,
+        )
+
+    def put(self, data: bytes) -> ArtworkInfo:
+        """保存封面原图, 已存在时直接返回"""
+        digest = self.digest(data)
+        suffix = _suffix(data)
+        original = self._dir(digest).joinpath(digest + suffix)
+        width, height = image_size(data)
+        if not original.exists():
+            original.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=original.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            # mkstemp 创建的文件为 0600, 与缩略图一致, 允许其他用户 (web 服务, 备份) 读取
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, original)
+        return ArtworkInfo(
+            digest=digest,
+            mime=self.MIME[suffix],
+            size=len(data),
+            width=width,
+            height=height,
+        )
+
+    async def put_async(self, data: bytes) -> ArtworkInfo:
+        """put 的异步版本, 摘要计算与写入在线程中执行"""
+        return await asyncio.to_thread(self.put, data)
+
+    def _thumbnail_job(self, path: Path | None, size: int | None):
+        """
+        需要生成缩略图时, 一次 ffmpeg 调用生成所有缺少且小于原图的缩略图
+        :return: (命令, 临时目录) 或 None
+        """
+        tier = self._tier(size)
+        if path is None or tier is None or path.stem.endswith(f"_{tier}"):
+            return None
+        width, _ = image_size(path.read_bytes())
+        if width is not None and tier >= width:
+            return None
+        digest = path.stem
+        sizes = [
+            _
+            for _ in self.thumbnail_sizes
+            if (width is None or _ < width)
+            and not path.with_name(f"{digest}_{_}.jpg").exists()
+        ]
+        # 写入临时目录后改名, 并发的请求不会读到未写完的缩略图
+        tmp = Path(tempfile.mkdtemp(dir=path.parent, prefix=".thumbnail_"))
+        split = "".join(f"[s{_}]" for _ in sizes)
+        filters = [f"[0:v]split={len(sizes)}{split}"] + [
+            f"[s{_}]scale={_}:-2[t{_}]" for _ in sizes
+        ]
+        cmd = ["ffmpeg", "-v", "quiet", "-y", "-i", path]
+        cmd += ["-filter_complex", ";".join(filters)]
+        for _ in sizes:
+            cmd += ["-map", f"[t{_}]", "-frames:v", "1", "-q:v", "3"]
+            cmd += [tmp.joinpath(f"{digest}_{_}.jpg")]
+        return cmd, tmp
+
+    def _install_thumbnails(self, tmp: Path):
+        for file in tmp.iterdir():
+            os.replace(file, tmp.parent.joinpath(file.name))
+
+    def digests(self) -> Iterable[str]:
+        """已保存的全部封面摘要"""
+        for file in self.root.glob("??/*"):
+            if file.suffix in self.MIME and len(file.stem) == 40:
+                yield file.stem
+
+    def delete(self, digest: str) -> bool:
+        """删除封面原图与缩略图"""
+        original = self._original(digest)
+        if original is None:
+            return False
+        for file in original.parent.glob(f"{digest}*"):
+            file.unlink(missing_ok=True)
+        return True
+
+    def collect_garbage(self, referenced: set[str]) -> int:
+        """
+        删除不在 referenced 中的封面
+        :param referenced: 仍被引用的摘要 (music_table.artwork_hash, 元数据缓存)
+        :return: 删除的封面数量
+        """
+        removed = sum(
+            self.delete(_) for _ in list(self.digests()) if _ not in referenced
+        )
+        logger.info("artwork store: removed %d unreferenced covers", removed)
+        return removed
+
+
+artwork_store = ArtworkStore(
+    settings.data_dir.joinpath("artwork"),
+    thumbnail_sizes=settings.artwork_config.thumbnail_sizes,
+)
@@ -0,0 +1,138 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : audio_hash.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 03:10
+
+音频内容摘要
+
+只对音频数据计算摘要, 跳过标签与封面, 修改标签后的同一录音摘要不变, 用于导入时查重.
+
+- FLAC: 跳过 fLaC 之后的所有元数据块 (STREAMINFO 除外, 其中包含采样参数与 MD5)
+- MP3:  跳过开头的 ID3v2, 结尾的 ID3v1 / APEv2 / Lyrics3v2
+- WAV:  只计算 fmt 与 data 块
+- 其他格式: 跳过 ID3v2 / ID3v1 后计算整个文件
+"""
+import hashlib
+import io
+import logging
+import os
+import struct
+from pathlib import Path
+from typing import BinaryIO
+
+__all__ = ["audio_hash", "audio_hash_bytes"]
+
+logger = logging.getLogger("music_manager.music_lib.audio_hash")
+
+_CHUNK_SIZE = 1024 * 1024
+
+
+def _skip_id3v2(f: BinaryIO, offset: int = 0) -> int:
+    """跳过 offset 处连续的 ID3v2 标签, 返回之后的偏移"""
+    while True:
+        f.seek(offset)
+        header = f.read(10)
+        if len(header) < 10 or header[:3] != b"ID3":
+            return offset
+        size = 0
+        for byte in header[6:10]:  # syncsafe integer
+            size = (size << 7) | (byte & 0x7F)
+        offset += 10 + size + (10 if header[5] & 0x10 else 0)
+
+
+def _strip_trailing_tags(f: BinaryIO, start: int, end: int) -> int:
+    """去掉结尾的 ID3v1 / APEv2 / Lyrics3v2 标签, 返回音频数据的结束偏移"""
+    while end - start >= 32:
+        if end - start >= 128:
+            f.seek(end - 128)
+            if f.read(3) == b"TAG":
+                end -= 128
+                continue
+        f.seek(end - 32)
+        footer = f.read(32)
+        if footer[:8] == b"APETAGEX":
+            size, _, flags = struct.unpack("<III", footer[12:24])
+            end -= size + (32 if flags & 0x80000000 else 0)
+            continue
+        f.seek(end - 15)
+        lyrics = f.read(15)
+        if lyrics[6:] == b"LYRICS200" and lyrics[:6].isdigit():
+            end -= 15 + int(lyrics[:6])
+            continue
+        return end
+    return end
+
+
+def _flac_ranges(f: BinaryIO, start: int, end: int) -> list[tuple[int, int]]:
+    f.seek(start + 4)
+    offset, ranges = start + 4, []
+    while True:
+        header = f.read(4)
+        if len(header) < 4:
+            raise ValueError("FLAC 元数据块不完整")
+        last, block_type = header[0] & 0x80, header[0] & 0x7F
+        length = int.from_bytes(header[1:4], "big")
+        if block_type == 0:  # STREAMINFO
+            ranges.append((offset + 4, offset + 4 + length))
+        offset += 4 + length
+        f.seek(offset)
+        if last:
+            break
+    ranges.append((offset, end))
+    return ranges
+
+
+def _wav_ranges(f: BinaryIO, end: int) -> list[tuple[int, int]]:
+    offset, ranges = 12, []
+    while offset + 8 <= end:
+        f.seek(offset)
+        chunk_id, size = struct.unpack("<4sI", f.read(8))
+        if chunk_id in (b"fmt ", b"data"):
+            ranges.append((offset + 8, min(offset + 8 + size, end)))
+        offset += 8 + size + (size & 1)
+    return ranges
+
+
+def _payload_ranges(f: BinaryIO) -> list[tuple[int, int]]:
+    """音频数据所在的 (start, end) 区间"""
+    end = f.seek(0, os.SEEK_END)
+    f.seek(0)
+    head = f.read(12)
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return _wav_ranges(f, end)
+    start = _skip_id3v2(f)
+    f.seek(start)
+    if f.read(4) == b"fLaC":
+        return _flac_ranges(f, start, _strip_trailing_tags(f, start, end))
+    return [(start, _strip_trailing_tags(f, start, end))]
+
+
+def _hash_fileobj(f: BinaryIO) -> str:
+    digest = hashlib.sha1()
+    for start, end in _payload_ranges(f):
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            data = f.read(min(_CHUNK_SIZE, remaining))
+            if not data:
+                break
+            digest.update(data)
+            remaining -= len(data)
+    return digest.hexdigest()
+
+
+def audio_hash(file_path: str | Path) -> str:
+    """
+    音频数据的摘要 (sha1), 与标签 / 封面无关
+    :param file_path: 音乐文件路径
+    :return:
+    """
+    with open(file_path, "rb") as f:
+        return _hash_fileobj(f)
+
+
+def audio_hash_bytes(data: bytes) -> str:
+    """audio_hash 的内存版本"""
+    return _hash_fileobj(io.BytesIO(data))
@@ -0,0 +1,95 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : batch_probe.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/18 22:00
+
+批量获取音乐文件的元数据
+
+将文件分发到进程池 (或线程池) 中并行执行 MusicId3.from_ffprobe, 按完成顺序产出结果.
+单个文件的异常被记录在结果中, 不会中断整个批次.
+"""
+import logging
+import os
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from pathlib import Path
+from typing import Iterable, Iterator, Literal
+
+from pydantic import BaseModel
+
+from music_manager.apis.models import MusicId3
+from music_manager.config import settings
+from music_manager.music_lib.audio_hash import audio_hash
+
+__all__ = ["ProbeResult", "probe_many"]
+
+logger = logging.getLogger("music_manager.music_lib.batch_probe")
+
+
+class ProbeResult(BaseModel):
+    """单个文件的探测结果, music 与 error 二选一"""
+
+    path: Path
+    music: MusicId3 | None = None
+    audio_hash: str | None = None  # probe_many(with_audio_hash=True) 时计算
+    error: str | None = None
+
+
+def _init_worker(probe_backend: str):
+    # spawn 方式启动的子进程不会继承运行时修改的配置
+    settings.probe_backend = probe_backend
+
+
+def _probe_one(path: Path, with_hash: bool = False) -> ProbeResult:
+    try:
+        return ProbeResult(
+            path=path,
+            music=MusicId3.from_ffprobe(path),
+            audio_hash=audio_hash(path) if with_hash else None,
+        )
+    except Exception as e:
+        logger.debug("探测失败: %s: %r", path, e)
+        return ProbeResult(path=path, error=f"{type(e).__name__}: {e}")
+
+
+def probe_many(
+    paths: Iterable[str | Path],
+    workers: int | None = None,
+    executor: Literal["process", "thread"] = "process",
+    with_audio_hash: bool = False,
+) -> Iterator[ProbeResult]:
+    """
+    批量获取音乐文件的元数据, 按完成顺序产出结果
+    :param paths: 音乐文件路径, 可以是惰性的迭代器
+    :param workers: 并行数量, 默认 settings.ffmpeg_config.batch_workers 或 CPU 核数
+    :param executor: process - 进程池, native 后端可以使用多核;
+                     thread - 线程池, 适合 ffprobe 后端 (耗时在子进程中)
+    :param with_audio_hash: 同时计算音频摘要 (读取整个文件)
+    :return:
+    """
+    workers = workers or settings.ffmpeg_config.batch_workers or os.cpu_count() or 1
+    if executor == "process":
+        pool: Executor = ProcessPoolExecutor(
+            workers, initializer=_init_worker, initargs=(settings.probe_backend,)
+        )
+    else:
+        pool = ThreadPoolExecutor(workers)
+
+    with pool:
+        # 限制在途任务数量, 避免一次性提交整个音乐库
+        pending = set()
+        for path in paths:
+            pending.add(pool.submit(_probe_one, Path(path), with_audio_hash))
+            if len(pending) >= workers * 4:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                yield from (_.result() for _ in done)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            yield from (_.result() for _ in done)
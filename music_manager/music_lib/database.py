@@ -5,25 +5,139 @@
 @Author     : LeeCQ
 @Date-Time  : 2023/12/24 21:14
 
+
+同步引擎 engine 用于脚本 / 索引 / 导入;
+异步引擎 get_async_engine() (aiosqlite) 供 async 接口使用, 不占用线程池.
 """
+import asyncio
+import contextlib
+import functools
+import logging
+import weakref
+from typing import AsyncIterator
+
+from sqlalchemy import event, inspect
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.schema import CreateColumn
 from sqlmodel import create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from music_manager.config import settings
 
-__all__ = ["engine", "init"]
+__all__ = ["engine", "get_async_engine", "async_session", "init", "migrate"]
+
+logger = logging.getLogger("music_manager.music_lib.database")
+
+_DB_FILE = settings.data_dir.joinpath("data.db")
+_ASYNC_POOL_SIZE = 5
 
 engine = create_engine(
-    f"sqlite:///{settings.data_dir.joinpath('data.db')}",
-    echo=True,
+    f"sqlite:///{_DB_FILE}",
+    echo=settings.database_config.echo,
     pool_size=5,
     connect_args={"check_same_thread": False},
 )
 
 
+@event.listens_for(engine, "connect")
+def _set_pragmas(dbapi_connection, connection_record):
+    """按 settings.database_config 设置连接的 PRAGMA"""
+    config = settings.database_config
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={config.journal_mode}")
+    cursor.execute(f"PRAGMA synchronous={config.synchronous}")
+    cursor.execute(f"PRAGMA mmap_size={int(config.mmap_size)}")
+    cursor.execute(f"PRAGMA cache_size={int(config.cache_size)}")
+    cursor.execute(f"PRAGMA busy_timeout={int(config.busy_timeout)}")
+    cursor.close()
+
+
+@functools.cache
+def get_async_engine() -> AsyncEngine | None:
+    """
+    异步引擎, 与 engine 使用同一个数据库文件与 PRAGMA
+    aiosqlite 未安装时返回 None, 调用方回退到线程中的同步访问.
+    """
+    try:
+        async_engine = create_async_engine(
+            f"sqlite+aiosqlite:///{_DB_FILE}",
+            echo=settings.database_config.echo,
+            pool_size=_ASYNC_POOL_SIZE,
+            max_overflow=0,
+        )
+    except ImportError:
+        logger.warning("aiosqlite 未安装, 异步接口在线程中访问数据库")
+        return None
+    event.listen(async_engine.sync_engine, "connect", _set_pragmas)
+    return async_engine
+
+
+# 事件循环 -> 获取连接的排队信号量
+_gates: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+@contextlib.asynccontextmanager
+async def async_session(**kwargs) -> AsyncIterator[AsyncSession]:
+    """
+    异步 Session, 调用方需先确认 get_async_engine() 不为 None
+    连接池的等待队列允许新的请求插队, 高并发时个别请求要等待很久 (p99 为 p50 的数倍);
+    这里先按先来后到排队, 再从连接池获取连接.
+    """
+    loop = asyncio.get_running_loop()
+    gate = _gates.get(loop)
+    if gate is None:
+        gate = _gates[loop] = asyncio.Semaphore(_ASYNC_POOL_SIZE)
+    async with gate:
+        async with AsyncSession(get_async_engine(), **kwargs) as session:
+            yield session
+
+
 def init():
     from music_manager.music_lib.models import SQLModel, Music, MusicBrainZMapping
 
     SQLModel.metadata.create_all(engine)
+    migrate()
+
+
+def _collapse_duplicates(conn, table_name: str, index):
+    """创建唯一索引之前删除重复的行, 每组保留最后写入的一行"""
+    columns = ", ".join(_.name for _ in index.columns)
+    removed = conn.exec_driver_sql(
+        f"DELETE FROM {table_name} WHERE rowid NOT IN "
+        f"(SELECT MAX(rowid) FROM {table_name} GROUP BY {columns})"
+    ).rowcount
+    if removed:
+        logger.info("migrate: %s 删除 %d 行重复的 (%s)", table_name, removed, columns)
+
+
+def migrate():
+    """升级已有的数据库: 为已存在的表补充新增的列与索引, 创建全文索引与统计汇总表"""
+    from music_manager.music_lib.models import SQLModel
+    from music_manager.music_lib.search import create_fts
+    from music_manager.music_lib.stats import create_stats
+
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        for table in SQLModel.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            exists = {_["name"] for _ in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in exists:
+                    continue
+                ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                logger.info("migrate: %s ADD COLUMN %s", table.name, ddl)
+                conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {ddl}")
+            indexes = {_["name"] for _ in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in indexes:
+                    continue
+                if index.unique:
+                    _collapse_duplicates(conn, table.name, index)
+                logger.info("migrate: CREATE INDEX %s ON %s", index.name, table.name)
+                index.create(conn)
+        create_fts(conn)
+        create_stats(conn)
 
 
 if __name__ == "__main__":
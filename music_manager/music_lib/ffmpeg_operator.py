@@ -6,13 +6,19 @@
 @Date-Time  : 2023/12/22 23:57
 
 """
+import asyncio
 import json
 import logging
 import os
 import subprocess
+import weakref
 from pathlib import Path
 from typing import List
 
+from music_manager.config import settings
+from music_manager.music_lib import native_probe
+from music_manager.music_lib.probe_cache import probe_cache
+
 logger = logging.getLogger("task.music_operator")
 
 
@@ -47,49 +53,102 @@ def fund_exec(file_name: str, file_path: str | Path = "") -> Path:
     raise FileNotFoundError(f"文件不存在: {file_name} not in {paths}[{os.getenv('SHELL')}]")
 
 
-def runner(cmd: list[str] | str) -> tuple[bytes, bytes]:
+def runner(cmd: list[str] | str, timeout: float | None = None) -> tuple[bytes, bytes]:
     """
     执行命令
     :param cmd:
+    :param timeout: 超时时间 (秒), 默认 settings.ffmpeg_config.timeout
     :return:
     """
     if isinstance(cmd, list):
         cmd[0] = fund_exec(cmd[0]) if isinstance(cmd[0], str) else cmd[0]
     logger.debug("CMD: %s", " ".join(str(_) for _ in cmd))
+    timeout = settings.ffmpeg_config.timeout if timeout is None else timeout
     res = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    stdout, stderr = res.communicate()
+    try:
+        stdout, stderr = res.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        res.kill()
+        res.communicate()
+        raise TimeoutError(f"执行超时 ({timeout}s): {cmd}")
     if res.returncode != 0:
         raise RuntimeError(stderr.decode())
     return stdout, stderr
 
 
-def get_music_meta(file_path: str | Path) -> dict:
+_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]"
+_semaphores = weakref.WeakKeyDictionary()
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    """当前事件循环上的全局并发限制, 默认为 CPU 核数"""
+    loop = asyncio.get_running_loop()
+    if loop not in _semaphores:
+        concurrency = settings.ffmpeg_config.concurrency or os.cpu_count() or 1
+        _semaphores[loop] = asyncio.Semaphore(concurrency)
+    return _semaphores[loop]
+
+
+async def async_runner(
+    cmd: list[str], timeout: float | None = None
+) -> tuple[bytes, bytes]:
     """
-    获取音乐文件的元数据
-    :param file_path: 音乐文件路径
+    异步执行命令, 不占用线程; 同时运行的子进程数量受全局信号量限制
+    :param cmd:
+    :param timeout: 超时时间 (秒), 默认 settings.ffmpeg_config.timeout
     :return:
     """
-    cmd = [
-        f"ffprobe",
+    cmd[0] = fund_exec(cmd[0]) if isinstance(cmd[0], str) else cmd[0]
+    logger.debug("CMD: %s", " ".join(str(_) for _ in cmd))
+    timeout = settings.ffmpeg_config.timeout if timeout is None else timeout
+    async with _get_semaphore():
+        res = await asyncio.create_subprocess_exec(
+            *cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(res.communicate(), timeout)
+        except asyncio.TimeoutError:
+            res.kill()
+            await res.communicate()
+            raise TimeoutError(f"执行超时 ({timeout}s): {cmd}")
+        except BaseException:
+            # 调用方被取消 (客户端断开, 服务停止): 结束子进程, 不留下孤儿进程
+            if res.returncode is None:
+                res.kill()
+            await res.wait()
+            raise
+    if res.returncode != 0:
+        raise RuntimeError(stderr.decode())
+    return stdout, stderr
+
+
+# 只输出 MusicId3 / FfprobrModel 用到的字段, 代替 -show_format -show_streams
+PROBE_ENTRIES = ":".join(
+    [
+        "format=filename,nb_streams,format_name,duration,size,bit_rate",
+        "format_tags",
+        "stream=index,codec_name,codec_type,sample_rate,channels,bits_per_sample,"
+        "width,height,duration,bit_rate",
+        "stream_disposition=attached_pic",
+    ]
+)
+
+
+def _meta_cmd(file_path: str | Path) -> list:
+    return [
+        "ffprobe",
         "-v",
         "quiet",
         "-print_format",
         "json",
-        f"-show_format",
-        "-show_streams",
+        "-show_entries",
+        PROBE_ENTRIES,
         file_path,
     ]
-    stdout, stderr = runner(cmd)
-    return json.loads(stdout.decode("utf-8"))
 
 
-def get_music_artwork(file_path: str | Path) -> bytes:
-    """
-    获取音乐文件的封面
-    :param file_path: 音乐文件路径
-    :return:
-    """
-    cmd = [
+def _artwork_cmd(file_path: str | Path) -> list:
+    return [
         "ffmpeg",
         "-i",
         file_path,
@@ -100,10 +159,215 @@ def get_music_artwork(file_path: str | Path) -> bytes:
         "image2pipe",
         "-",
     ]
-    stdout, stderr = runner(cmd)
+
+
+def _meta_artwork_cmd(file_path: str | Path) -> list:
+    """
+    封面 (attached_pic) 会被 libavformat 排在第一个数据包,
+    所以只需读取 1 个数据包并转储其数据即可, 不会遍历整个文件.
+    """
+    return [
+        "ffprobe",
+        "-v",
+        "quiet",
+        "-print_format",
+        "json",
+        "-show_entries",
+        PROBE_ENTRIES,
+        "-show_packets",
+        "-show_data",
+        "-show_entries",
+        "packet=stream_index,data",
+        "-read_intervals",
+        "%+#1",
+        file_path,
+    ]
+
+
+def _parse_meta(file_path: str | Path, stdout: bytes) -> dict:
+    meta = json.loads(stdout.decode("utf-8"))
+    probe_cache.set_meta(file_path, meta)
+    return meta
+
+
+def _parse_hex_dump(data: str) -> bytes:
+    """
+    解析 ffprobe -show_data 输出的十六进制转储
+    每行格式: `00000000: ffd8 ffe0 0010 4a46 ...  ......JFIF......`
+    """
+    return bytes.fromhex("".join(line[10:51] for line in data.splitlines()))
+
+
+def _parse_meta_artwork(file_path: str | Path, stdout: bytes):
+    meta = json.loads(stdout.decode("utf-8"))
+    packets = meta.pop("packets", [])
+
+    artwork_index = {
+        _["index"]
+        for _ in meta.get("streams", [])
+        if _.get("disposition", {}).get("attached_pic")
+    }
+    artwork = None
+    for packet in packets:
+        if packet.get("stream_index") in artwork_index and packet.get("data"):
+            artwork = _parse_hex_dump(packet["data"])
+            break
+    probe_cache.set_meta(file_path, meta)
+    probe_cache.set_artwork(file_path, artwork)
+    return meta, artwork
+
+
+def _cached_artwork(file_path: str | Path) -> bytes | None:
+    hit, artwork = probe_cache.get_artwork(file_path)
+    if hit and artwork is None:
+        raise RuntimeError(f"没有封面: {file_path}")
+    return artwork
+
+
+def _cached_meta_artwork(file_path: str | Path) -> tuple[dict, bytes | None] | None:
+    meta = probe_cache.get_meta(file_path)
+    hit, artwork = probe_cache.get_artwork(file_path)
+    if meta is not None and hit:
+        return meta, artwork
+    return None
+
+
+def _native_meta_artwork(file_path: str | Path) -> tuple[dict, bytes | None] | None:
+    """
+    按 settings.probe_backend 在进程内读取元数据与封面
+    :return: 不使用 native, 或 auto 模式下 native 不支持该文件时返回 None
+    """
+    if settings.probe_backend == "ffprobe":
+        return None
+    try:
+        meta, artwork = native_probe.get_music_meta_artwork(file_path)
+    except native_probe.UnsupportedFormat as e:
+        if settings.probe_backend == "native":
+            raise
+        logger.debug("native 不支持, 回退到 ffprobe: %s", e)
+        return None
+    probe_cache.set_meta(file_path, meta)
+    probe_cache.set_artwork(file_path, artwork)
+    return meta, artwork
+
+
+def _native_artwork(file_path: str | Path, native) -> bytes:
+    if native[1] is None:
+        raise RuntimeError(f"没有封面: {file_path}")
+    return native[1]
+
+
+def get_music_meta(file_path: str | Path) -> dict:
+    """
+    获取音乐文件的元数据
+    :param file_path: 音乐文件路径
+    :return:
+    """
+    meta = probe_cache.get_meta(file_path)
+    if meta is not None:
+        return meta
+    native = _native_meta_artwork(file_path)
+    if native is not None:
+        return native[0]
+    stdout, stderr = runner(_meta_cmd(file_path))
+    return _parse_meta(file_path, stdout)
+
+
+async def get_music_meta_async(file_path: str | Path) -> dict:
+    """get_music_meta 的异步版本"""
+    meta = probe_cache.get_meta(file_path)
+    if meta is not None:
+        return meta
+    native = await asyncio.to_thread(_native_meta_artwork, file_path)
+    if native is not None:
+        return native[0]
+    stdout, stderr = await async_runner(_meta_cmd(file_path))
+    return _parse_meta(file_path, stdout)
+
+
+def get_music_artwork(file_path: str | Path) -> bytes:
+    """
+    获取音乐文件的封面
+    :param file_path: 音乐文件路径
+    :return:
+    """
+    artwork = _cached_artwork(file_path)
+    if artwork is not None:
+        return artwork
+    native = _native_meta_artwork(file_path)
+    if native is not None:
+        return _native_artwork(file_path, native)
+    try:
+        stdout, stderr = runner(_artwork_cmd(file_path))
+    except RuntimeError:
+        probe_cache.set_artwork(file_path, None)
+        raise
+    probe_cache.set_artwork(file_path, stdout or None)
     return stdout
 
 
+async def get_music_artwork_async(file_path: str | Path) -> bytes:
+    """get_music_artwork 的异步版本"""
+    artwork = _cached_artwork(file_path)
+    if artwork is not None:
+        return artwork
+    native = await asyncio.to_thread(_native_meta_artwork, file_path)
+    if native is not None:
+        return _native_artwork(file_path, native)
+    try:
+        stdout, stderr = await async_runner(_artwork_cmd(file_path))
+    except RuntimeError:
+        probe_cache.set_artwork(file_path, None)
+        raise
+    probe_cache.set_artwork(file_path, stdout or None)
+    return stdout
+
+
+def get_music_meta_artwork(file_path: str | Path) -> tuple[dict, bytes | None]:
+    """
+    一次 ffprobe 调用同时获取音乐文件的元数据与封面
+    :param file_path: 音乐文件路径
+    :return: (元数据, 封面) 没有封面时为 None
+    """
+    cached = _cached_meta_artwork(file_path)
+    if cached is not None:
+        return cached
+    native = _native_meta_artwork(file_path)
+    if native is not None:
+        return native
+    stdout, stderr = runner(_meta_artwork_cmd(file_path))
+    return _parse_meta_artwork(file_path, stdout)
+
+
+async def get_music_meta_artwork_async(
+    file_path: str | Path,
+) -> tuple[dict, bytes | None]:
+    """get_music_meta_artwork 的异步版本"""
+    cached = _cached_meta_artwork(file_path)
+    if cached is not None:
+        return cached
+    native = await asyncio.to_thread(_native_meta_artwork, file_path)
+    if native is not None:
+        return native
+    stdout, stderr = await async_runner(_meta_artwork_cmd(file_path))
+    return _parse_meta_artwork(file_path, stdout)
+
+
+async def get_music_meta_artwork_native_async(
+    file_path: str | Path,
+) -> tuple[dict, bytes | None] | None:
+    """
+    不启动子进程获取元数据与封面: 缓存命中, 或按 settings.probe_backend 在线程中读取一次
+    :return: (元数据, 封面); 需要启动 ffprobe / ffmpeg 时返回 None
+    """
+    cached = _cached_meta_artwork(file_path)
+    if cached is not None:
+        return cached
+    if settings.probe_backend == "ffprobe":
+        return None
+    return await asyncio.to_thread(_native_meta_artwork, file_path)
+
+
 if __name__ == "__main__":
     import json
 
@@ -0,0 +1,126 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : file_ops.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 06:20
+
+将文件放入音乐库, 不经过 Python 的内存
+
+- 同一文件系统: 移动使用 rename, 复制使用硬链接, 不复制数据
+- 跨文件系统: copy_file_range (可使用 reflink / 服务端复制), 不支持时 sendfile,
+  数据只在内核中复制; 都不可用时按块复制
+- 复制时先写入同目录下的隐藏临时文件再重命名, 扫描 / 监听不会读到写了一半的文件
+"""
+import errno
+import logging
+import os
+import shutil
+from pathlib import Path
+from typing import Literal
+
+__all__ = ["place_file"]
+
+logger = logging.getLogger("music_manager.music_lib.file_ops")
+
+PlaceMethod = Literal["rename", "link", "copy_file_range", "sendfile", "copy"]
+
+_CHUNK_SIZE = 64 * 1024 * 1024
+# 这些错误表示当前方式不可用, 换下一种方式
+_UNSUPPORTED = {
+    errno.EXDEV,
+    errno.ENOSYS,
+    errno.EINVAL,
+    errno.EOPNOTSUPP,
+    errno.ENOTSUP,
+    errno.EPERM,
+    errno.EMLINK,
+}
+
+
+def _copy_file_range(fsrc: int, fdst: int, size: int):
+    offset = 0
+    while offset < size:
+        copied = os.copy_file_range(fsrc, fdst, min(_CHUNK_SIZE, size - offset))
+        if copied == 0:
+            break
+        offset += copied
+
+
+def _sendfile(fsrc: int, fdst: int, size: int):
+    offset = 0
+    while offset < size:
+        sent = os.sendfile(fdst, fsrc, offset, min(_CHUNK_SIZE, size - offset))
+        if sent == 0:
+            break
+        offset += sent
+
+
+# 按顺序尝试, 不支持的平台上没有对应的函数
+_COPY_METHODS = [
+    (name, func)
+    for name, func in [("copy_file_range", _copy_file_range), ("sendfile", _sendfile)]
+    if hasattr(os, name)
+]
+
+
+def _copy(src: Path, dst: Path) -> PlaceMethod:
+    """复制到 dst, 返回使用的方式"""
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        size = os.fstat(fsrc.fileno()).st_size
+        for method, func in _COPY_METHODS:
+            try:
+                func(fsrc.fileno(), fdst.fileno(), size)
+                return method
+            except OSError as e:
+                if e.errno not in _UNSUPPORTED:
+                    raise
+                logger.debug("%s 不可用: %s", method, e)
+                fsrc.seek(0)
+                fdst.seek(0)
+                fdst.truncate()
+        shutil.copyfileobj(fsrc, fdst, 1024 * 1024)
+        return "copy"
+
+
+def place_file(
+    src: str | Path, dst: str | Path, mode: Literal["link", "copy", "move"] = "link"
+) -> PlaceMethod:
+    """
+    将 src 放到 dst, 内存占用与文件大小无关
+    :param src: 源文件
+    :param dst: 目标文件, 不能已存在; 目录不存在时创建
+    :param mode: link - 同一文件系统时硬链接 (与源文件共享数据, 原地修改标签会同时修改源文件),
+                        否则复制
+                 copy - 总是复制 (支持 reflink 的文件系统上同样不复制数据)
+                 move - 移动, 同一文件系统时 rename
+    :return: 使用的方式
+    :raise FileExistsError: dst 已存在
+    """
+    src, dst = Path(src), Path(dst)
+    if dst.exists():
+        raise FileExistsError(f"文件已存在: {dst}")
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        if mode == "move":
+            os.rename(src, dst)
+            return "rename"
+        if mode == "link":
+            os.link(src, dst)
+            return "link"
+    except OSError as e:
+        if e.errno not in _UNSUPPORTED:
+            raise
+        logger.debug("%s 不可用, 复制: %s", mode, e)
+
+    part = dst.with_name(f".{dst.name}.part")
+    try:
+        method = _copy(src, part)
+        shutil.copystat(src, part)
+        os.replace(part, dst)
+    except BaseException:
+        part.unlink(missing_ok=True)
+        raise
+    if mode == "move":
+        os.unlink(src)
+    return method
@@ -0,0 +1,138 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : import_journal.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 08:20
+
+导入日志
+
+目录导入时, 每个文件完成一个阶段就向 data/import_journal/ 下的日志追加一行 JSON:
+
+    {"path": 源文件, "stage": 阶段, ...}
+
+- hashed:     已计算摘要 (hash, 计算时源文件的 size / mtime_ns)
+- placed:     已放入音乐库 (hash, dst)
+- committed:  已写入数据库
+- duplicated: 与库中的音乐重复, 已跳过
+- failed:     导入失败 (error), 恢复时重新导入
+
+同一源目录使用同一个日志文件. 中断 (崩溃 / 重启) 后以 resume 重新导入时, 读取日志中每个文件
+最后的阶段, 已完成的文件直接跳过, 已计算摘要 / 已放入音乐库的文件从该阶段继续.
+读取时同一文件的记录按顺序合并 (hashed 记录开始新的一轮), 后续阶段沿用 hashed 记录的
+hash / size / mtime_ns;
+文件在中断之后被修改 (size / mtime_ns 不同) 时重新导入, 见 importer.
+每次写入数据库后 fsync, 写了一半的最后一行在读取时忽略.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+
+from music_manager.config import settings
+
+__all__ = [
+    "HASHED",
+    "PLACED",
+    "COMMITTED",
+    "DUPLICATED",
+    "FAILED",
+    "DONE_STAGES",
+    "ImportJournal",
+]
+
+logger = logging.getLogger("music_manager.music_lib.import_journal")
+
+HASHED = "hashed"
+PLACED = "placed"
+COMMITTED = "committed"
+DUPLICATED = "duplicated"
+FAILED = "failed"
+# 恢复时跳过的阶段
+DONE_STAGES = {COMMITTED, DUPLICATED}
+
+
+class ImportJournal:
+    """一个源目录的导入日志, 可以在多个线程中写入"""
+
+    def __init__(self, root: str | Path, resume: bool = False):
+        """
+        :param root: 导入的源目录
+        :param resume: 读取已有的日志并追加; 否则清空日志
+        """
+        self.root = os.path.abspath(root)
+        digest = hashlib.sha1(self.root.encode()).hexdigest()[:16]
+        self.path = settings.data_dir.joinpath("import_journal", f"{digest}.jsonl")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # 源文件 -> 最后一条记录
+        self.entries: dict[str, dict] = self._load() if resume else {}
+        self._lock = threading.Lock()
+        self._file = open(self.path, "a" if resume else "w", encoding="utf-8")
+        if not resume:
+            self._write({"root": self.root})
+
+    def _load(self) -> dict[str, dict]:
+        entries = {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        logger.warning("忽略损坏的日志行: %s: %r", self.path, line)
+                        continue
+                    if "path" not in entry:
+                        continue
+                    if entry["stage"] != HASHED:
+                        entry = {**entries.get(entry["path"], {}), **entry}
+                    entries[entry["path"]] = entry
+        except FileNotFoundError:
+            return {}
+        logger.info("恢复导入 %s: 日志中有 %d 个文件", self.root, len(entries))
+        return entries
+
+    def _write(self, entry: dict):
+        with self._lock:
+            self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._file.flush()
+
+    @staticmethod
+    def unchanged(entry: dict | None, size: int, mtime_ns: int) -> bool:
+        """文件的 size / mtime_ns 与记录中的相同"""
+        if not entry:
+            return False
+        return entry.get("size") == size and entry.get("mtime_ns") == mtime_ns
+
+    def stage(self, path: str | Path) -> str | None:
+        """文件在日志中最后的阶段"""
+        entry = self.entries.get(str(path))
+        return entry and entry["stage"]
+
+    def pending(self, stage: str) -> list[dict]:
+        """日志中最后的阶段为 stage 的记录 (合并之后)"""
+        return [_ for _ in self.entries.values() if _["stage"] == stage]
+
+    def record(self, path: str | Path, stage: str, **fields):
+        """追加一条记录, 只写入文件, 不更新 entries"""
+        self._write({"path": str(path), "stage": stage, **fields})
+
+    def checkpoint(self):
+        """将已写入的记录持久化"""
+        with self._lock:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
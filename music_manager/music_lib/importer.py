@@ -10,28 +10,491 @@
 将Music导入到MusicLib中.
 
 1. 获取被导入的文件的元数据
-2. 比对数据库中的元数据
+2. 比对数据库中的元数据与音频摘要
     如果数据库中存在, 则报告存在并跳过
-3. 将文件移动到MusicLib中
+3. 将文件放入MusicLib中 (硬链接 / 移动 / 复制)
 4. 将元数据写入数据库
 
+导入目录时以上步骤组成流水线, 各阶段在各自的线程中同时运行:
+
+    扫描 -> 计算摘要 -> 查重 -> 读取标签 -> 放入音乐库 -> 写入数据库
+
+阶段之间以有界队列连接, 下游慢时上游在队列满时等待 (背压), 内存占用与目录大小无关.
+查重与写入数据库各只有一个线程, 本批次中的重复文件 / 文件名不会被同时放入音乐库.
+每个文件完成的阶段记录在导入日志 (import_journal) 中, 中断后可以从日志继续.
 """
 
+import filecmp
 import logging
+import os
+import queue
+import threading
+import time
 from pathlib import Path
+from typing import Callable, Iterable, Iterator, Literal
+
+from pydantic import BaseModel
 
-from music_manager.music_lib.models import Music
+from music_manager.config import settings
+from music_manager.music_lib.audio_hash import audio_hash
+from music_manager.music_lib.file_ops import place_file
+from music_manager.music_lib.import_journal import (
+    COMMITTED,
+    DONE_STAGES,
+    DUPLICATED,
+    FAILED,
+    HASHED,
+    PLACED,
+    ImportJournal,
+)
+from music_manager.music_lib.models import Music, save_all
+from music_manager.music_lib.music_index import scan_library
 
-__all__ = ["import_music"]
+__all__ = ["ImportResult", "import_tree", "import_music"]
 
 logger = logging.getLogger("music_manager.music_lib.importer")
 
+_DONE = object()  # 上游阶段已结束
+_POLL = 0.1  # 等待队列时检查是否中止的间隔 (秒)
+_FLUSH_INTERVAL = 1.0  # 没有新文件时, 最多等待多少秒提交已放入音乐库的文件
+_DEDUP_BATCH = 500  # 每次查询数据库的摘要数量
+
+
+class ImportResult(BaseModel):
+    """导入结果统计"""
+
+    scanned: int = 0  # 扫描到的音乐文件
+    resumed: int = 0  # 由导入日志跳过或继续的文件
+    imported: int = 0  # 已放入音乐库并写入数据库
+    duplicated: int = 0  # 与库中或本批次中的音乐重复, 跳过
+    errors: dict[str, str] = {}  # 导入失败的文件 -> 原因
+    seconds: float = 0
+
+
+class _Pipeline:
+    """一次目录导入, 持有各阶段共享的队列与状态"""
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self.stop = threading.Event()
+        self.error: BaseException | None = None
+        self.threads: list[threading.Thread] = []
+
+    def channel(self) -> queue.Queue:
+        """连接两个阶段的有界队列"""
+        return queue.Queue(self.queue_size)
+
+    def get(self, q: queue.Queue):
+        """从 q 中取出一项, 中止时返回 _DONE"""
+        while not self.stop.is_set():
+            try:
+                return q.get(timeout=_POLL)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def put(self, q: queue.Queue, item) -> bool:
+        """放入 q, 队列满时等待; 中止后队列仍然满时丢弃, 返回 False"""
+        while True:
+            try:
+                q.put(item, timeout=_POLL)
+                return True
+            except queue.Full:
+                if self.stop.is_set():
+                    return False
+
+    def fail(self, e: BaseException):
+        """阶段中出现未处理的异常, 中止整个流水线"""
+        if self.error is None:
+            self.error = e
+        self.stop.set()
+
+    def start(self, name: str, target: Callable[[], None]):
+        thread = threading.Thread(target=target, name=f"import-{name}", daemon=True)
+        thread.start()
+        self.threads.append(thread)
+
+    def stage(
+        self,
+        name: str,
+        func: Callable[[list], Iterable],
+        workers: int,
+        inq: queue.Queue,
+        outq: queue.Queue,
+        batch: int = 1,
+    ):
+        """
+        启动 workers 个线程: 从 inq 取出最多 batch 项交给 func, func 产出的结果放入 outq
+        最后一个线程结束时向 outq 发送 _DONE.
+        """
+        alive = [workers]
+        lock = threading.Lock()
+
+        def run():
+            try:
+                while (item := self.get(inq)) is not _DONE:
+                    items = [item]
+                    while len(items) < batch:
+                        try:
+                            item = inq.get_nowait()
+                        except queue.Empty:
+                            break
+                        if item is _DONE:
+                            self.put(inq, item)
+                            break
+                        items.append(item)
+                    for result in func(items):
+                        self.put(outq, result)
+                # 让同一阶段的其他线程也能收到结束标记
+                self.put(inq, _DONE)
+            except BaseException as e:
+                logger.exception("导入流水线 %s 阶段异常", name)
+                self.fail(e)
+            finally:
+                with lock:
+                    alive[0] -= 1
+                    last = alive[0] == 0
+                if last:
+                    self.put(outq, _DONE)
+
+        for i in range(workers):
+            self.start(f"{name}-{i}", run)
+
+    def join(self, q: queue.Queue) -> list:
+        """中止并等待所有线程结束, 返回 q (最后一个阶段的输出) 中剩余的条目"""
+        self.stop.set()
+        rest = []
+        for thread in self.threads:
+            # 等待期间持续取出 q, 最后一个阶段的结果不会因为队列满被丢弃
+            while thread.is_alive():
+                rest += _drain(q)
+                thread.join(_POLL)
+        return rest + _drain(q)
+
+
+def _drain(q: queue.Queue) -> list:
+    items = []
+    while True:
+        try:
+            item = q.get_nowait()
+        except queue.Empty:
+            return items
+        if item is not _DONE:
+            items.append(item)
+
+
+def _stat(path: str | Path) -> tuple[int, int]:
+    """(size, mtime_ns); 文件不存在时为 (-1, -1)"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return -1, -1
+    return st.st_size, st.st_mtime_ns
+
+
+def _undo(src: Path, dst: Path, mode):
+    """撤销 place_file"""
+    try:
+        if mode == "move":
+            place_file(dst, src, "move")
+        else:
+            dst.unlink()
+    except OSError as e:
+        logger.warning("撤销导入失败: %s -> %s: %s", src, dst, e)
+
+
+def import_tree(
+    root: str | Path,
+    mode: Literal["link", "copy", "move"] | None = None,
+    on_commit: Callable[[list[Music]], None] | None = None,
+    hash_workers: int | None = None,
+    probe_workers: int | None = None,
+    place_workers: int | None = None,
+    queue_size: int | None = None,
+    chunk_size: int | None = None,
+    resume: bool = False,
+) -> ImportResult:
+    """
+    以流水线导入目录中的音乐文件 (跳过隐藏文件与目录, 只导入 MUSIC_SUFFIXES)
+    未指定的参数读取 settings.import_config.
+    每个文件完成的阶段记录在 ImportJournal 中.
+    :param root: 目录
+    :param mode: 放入音乐库的方式, 见 place_file, 默认 settings.import_mode
+    :param on_commit: 每次写入数据库后以写入的 Music 调用, 在调用方的线程中执行
+    :param hash_workers: 计算摘要的线程数
+    :param probe_workers: 读取标签的线程数
+    :param place_workers: 放入音乐库的线程数
+    :param queue_size: 阶段之间队列的长度
+    :param chunk_size: 每个事务写入的行数
+    :param resume: 从上次中断的导入继续: 跳过日志中已完成的文件, 已计算摘要 /
+                   已放入音乐库的文件从该阶段继续; 之后被修改的文件重新导入
+    :return:
+    """
+    conf = settings.import_config
+    cpus = os.cpu_count() or 1
+    mode = mode or settings.import_mode
+    hash_workers = hash_workers or conf.hash_workers or min(8, cpus + 4)
+    probe_workers = probe_workers or conf.probe_workers or cpus
+    place_workers = place_workers or conf.place_workers
+    chunk_size = chunk_size or conf.chunk_size
+
+    start = time.perf_counter()
+    result = ImportResult()
+    with ImportJournal(root, resume=resume) as journal:
+        _run(
+            root,
+            mode,
+            on_commit,
+            result,
+            journal,
+            hash_workers,
+            probe_workers,
+            place_workers,
+            queue_size or conf.queue_size,
+            chunk_size,
+        )
+
+    result.seconds = round(time.perf_counter() - start, 3)
+    logger.info(
+        "import %s: scanned=%d resumed=%d imported=%d duplicated=%d errors=%d "
+        "in %.3fs",
+        root,
+        result.scanned,
+        result.resumed,
+        result.imported,
+        result.duplicated,
+        len(result.errors),
+        result.seconds,
+    )
+    return result
+
+
+def _run(
+    root,
+    mode,
+    on_commit,
+    result: ImportResult,
+    journal: ImportJournal,
+    hash_workers: int,
+    probe_workers: int,
+    place_workers: int,
+    queue_size: int,
+    chunk_size: int,
+):
+    """
+    import_tree 的流水线
+    阶段之间传递 (源文件, 摘要, 音乐库中的文件), 放入音乐库之前第三项为空.
+    """
+
+    def on_error(path, error):
+        logger.warning("导入失败, 跳过: %s: %s", path, error)
+        result.errors[str(path)] = error
+        journal.record(path, FAILED, error=error)
+
+    pipeline = _Pipeline(queue_size)
+    paths, hashed, unique, probed, placed = (pipeline.channel() for _ in range(5))
+
+    def resume(entry: dict):
+        """
+        日志中已计算摘要 / 已放入音乐库的文件: 未修改时直接交给查重阶段, 沿用日志中的摘要;
+        否则撤销放入音乐库, 重新导入.
+        放入音乐库时保留 mtime (见 place_file), 音乐库中的文件与源文件都与日志比较.
+        """
+        path, dst = Path(entry["path"]), entry.get("dst")
+        dst = Path(dst) if dst and os.path.exists(dst) else None
+        if dst is None:
+            fresh = journal.unchanged(entry, *_stat(path))
+        else:
+            fresh = journal.unchanged(entry, *_stat(dst)) and (
+                not path.exists() or journal.unchanged(entry, *_stat(path))
+            )
+        if fresh:
+            result.resumed += 1
+            pipeline.put(hashed, (path, entry["hash"], dst))
+            return
+        logger.info("文件在中断之后被修改, 重新导入: %s", path)
+        if dst is not None:
+            _undo(path, dst, "copy" if path.exists() else "move")
+        pipeline.put(paths, path)
+
+    def scan():
+        try:
+            for entry in journal.pending(HASHED) + journal.pending(PLACED):
+                resume(entry)
+            for path, size, mtime_ns in scan_library(root):
+                result.scanned += 1
+                entry = journal.entries.get(path)
+                stage = entry and entry["stage"]
+                if stage in (HASHED, PLACED):
+                    continue
+                if stage in DONE_STAGES and journal.unchanged(entry, size, mtime_ns):
+                    result.resumed += 1
+                else:
+                    pipeline.put(paths, Path(path))
+        except BaseException as e:
+            pipeline.fail(e)
+        finally:
+            pipeline.put(paths, _DONE)
+
+    def hash_(items: list[Path]) -> Iterator[tuple[Path, str, None]]:
+        for path in items:
+            try:
+                st = os.stat(path)
+                digest = audio_hash(path)
+            except Exception as e:
+                on_error(path, f"{type(e).__name__}: {e}")
+                continue
+            journal.record(
+                path, HASHED, hash=digest, size=st.st_size, mtime_ns=st.st_mtime_ns
+            )
+            yield path, digest, None
+
+    # 只在查重线程中访问
+    seen_hashes: dict[str, Path] = {}
+    seen_names: set[str] = set()
+
+    def dedup(items: list[tuple]) -> Iterator[tuple]:
+        existing = Music.find_by_audio_hash(h for _, h, _d in items)
+        for path, digest, dst in items:
+            duplicated = existing.get(digest) or seen_hashes.get(digest)
+            if duplicated is not None and dst is not None:
+                if duplicated == dst:
+                    # 上次写入数据库之后, 记录日志之前中断
+                    journal.record(path, COMMITTED)
+                    continue
+                _undo(path, dst, mode)
+            if duplicated is not None:
+                logger.info("重复的音乐, 跳过: %s -> %s", path, duplicated)
+                result.duplicated += 1
+                journal.record(path, DUPLICATED)
+                continue
+            name = (dst or path).name
+            if name in seen_names:
+                on_error(path, "文件名与本次导入的其他文件相同")
+                continue
+            seen_hashes[digest] = path
+            seen_names.add(name)
+            yield path, digest, dst
+
+    def probe(items: list[tuple]) -> Iterator[tuple[Path, str, Path | None, Music]]:
+        for path, digest, dst in items:
+            try:
+                # 与索引相同的探测方式: 按 settings.probe_backend, 支持全部 MUSIC_SUFFIXES
+                music = Music.from_ffprobe(dst or path)
+            except Exception as e:
+                on_error(path, f"{type(e).__name__}: {e}")
+                continue
+            music.audio_hash = digest
+            yield path, digest, dst, music
+
+    def place_one(path: Path, digest: str) -> Path:
+        music_file = settings.music_library.joinpath(path.name)
+        try:
+            method = place_file(path, music_file, mode)
+        except FileExistsError:
+            # 上次放入音乐库之后, 记录日志之前中断: 只沿用内容完全相同的文件, 源文件保留
+            if not music_file.is_file() or not filecmp.cmp(
+                path, music_file, shallow=False
+            ):
+                raise FileExistsError(f"音乐库中已存在同名的文件: {music_file}") from None
+            method = "existing"
+        logger.debug("import %s -> %s (%s)", path, music_file, method)
+        journal.record(path, PLACED, hash=digest, dst=str(music_file))
+        return music_file
+
+    def place(items: list[tuple]) -> Iterator[tuple[Path, Music]]:
+        for path, digest, dst, music in items:
+            try:
+                dst = dst or place_one(path, digest)
+            except Exception as e:
+                on_error(path, f"{type(e).__name__}: {e}")
+                continue
+            music.file_full_path = dst
+            music.filename = dst.name
+            music.set_stat(dst)
+            yield path, music
+
+    def undo(chunk: list[tuple[Path, Music]], error: str):
+        for path, music in chunk:
+            _undo(path, music.file_full_path, mode)
+            journal.record(path, FAILED, error=error)
+
+    def commit(chunk: list[tuple[Path, Music]]):
+        musics = [music for _, music in chunk]
+        try:
+            save_all(
+                musics,
+                [_ for music in musics for _ in music.brainz_mappings()],
+                chunk_size=len(musics),
+            )
+        except BaseException as e:
+            undo(chunk, f"{type(e).__name__}: {e}")
+            raise
+        for path, _ in chunk:
+            journal.record(path, COMMITTED)
+        journal.checkpoint()
+        result.imported += len(musics)
+        if on_commit is not None:
+            on_commit(musics)
+
+    pipeline.start("scan", scan)
+    pipeline.stage("hash", hash_, hash_workers, paths, hashed)
+    pipeline.stage("dedup", dedup, 1, hashed, unique, batch=_DEDUP_BATCH)
+    pipeline.stage("probe", probe, probe_workers, unique, probed)
+    pipeline.stage("place", place, place_workers, probed, placed)
+
+    # 写入数据库在调用方的线程中进行
+    chunk: list[tuple[Path, Music]] = []
+    try:
+        while True:
+            try:
+                item = placed.get(timeout=_FLUSH_INTERVAL)
+            except queue.Empty:
+                item = None
+            if item is not None and item is not _DONE:
+                chunk.append(item)
+            finished = item is _DONE or pipeline.stop.is_set()
+            if chunk and (len(chunk) >= chunk_size or item is None or finished):
+                committing, chunk = chunk, []
+                commit(committing)
+            if finished:
+                break
+    except BaseException as e:
+        undo(chunk + pipeline.join(placed), f"{type(e).__name__}: {e}")
+        raise
+    # 中止时已放入音乐库的文件同样写入数据库
+    if rest := pipeline.join(placed):
+        commit(rest)
+    if pipeline.error is not None:
+        raise pipeline.error
+
 
-def import_music(file: Path):
+def import_music(
+    file: Path,
+    chunk_size: int = 500,
+    mode: Literal["link", "copy", "move"] | None = None,
+    resume: bool = False,
+):
+    """
+    导入音乐文件或目录
+    文件按路径放入音乐库 (硬链接 / rename / 内核复制), 不读入内存.
+    目录使用 import_tree 导入, 每 chunk_size 行一个事务.
+    音频数据与库中音乐相同的文件 (包括只修改了标签的副本) 被跳过.
+    :param mode: 放入音乐库的方式, 见 place_file, 默认 settings.import_mode
+    :param resume: 目录: 从上次中断的导入继续, 见 import_tree
+    :return: 文件 -> Music; 目录 -> list[Music]
+    """
     if file.is_file():
-        return Music.importer(file.name, file.read_bytes())
+        return Music.import_file(file, mode=mode)
     elif file.is_dir():
-        for _ in file.iterdir():
-            return import_music(_)
+        musics: list[Music] = []
+        import_tree(
+            file,
+            mode=mode,
+            on_commit=musics.extend,
+            chunk_size=chunk_size,
+            resume=resume,
+        )
+        return musics
     else:
         logger.warning("不支持的文件类型, %s", file)
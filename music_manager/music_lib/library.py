@@ -0,0 +1,160 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : library.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 05:00
+
+浏览音乐库
+
+- 键集 (游标) 分页: 以上一页最后一行的 (排序列, id) 作为起点, 使用索引定位,
+  任意页的耗时都与第一页相同, 不随 OFFSET 增长.
+- 只能按有索引的列排序, 索引中隐含 rowid (即 id), 同时满足排序与定位.
+- 只查询需要的列, 歌词 / 封面 / 备注等较大的列只在明确请求时返回.
+"""
+import asyncio
+import base64
+import json
+from typing import Any, Literal
+
+from sqlmodel import Session, select, tuple_
+
+from music_manager.apis.models import LibraryPage
+from music_manager.music_lib.database import async_session, engine, get_async_engine
+from music_manager.music_lib.models import Music
+
+__all__ = [
+    "SORT_FIELDS",
+    "DEFAULT_FIELDS",
+    "HEAVY_FIELDS",
+    "LibraryPage",
+    "list_library",
+    "list_library_async",
+]
+
+# 有索引的列
+SORT_FIELDS = ("title", "artist", "album", "file_full_path", "id")
+DEFAULT_FIELDS = (
+    "id",
+    "title",
+    "artist",
+    "album",
+    "albumartist",
+    "duration",
+    "filename",
+    "artwork_hash",
+)
+# 较大的列, 只在 fields 中明确请求时返回; 旧数据的 artwork 为 Base64 图片
+HEAVY_FIELDS = ("lyrics", "artwork", "comment")
+
+
+def _encode_cursor(value, _id: int) -> str:
+    data = json.dumps([None if value is None else str(value), _id])
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[Any, int]:
+    try:
+        data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, _id = json.loads(data)
+        if value is not None and not isinstance(value, str):
+            raise TypeError(value)
+        return value, int(_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"无效的游标: {cursor}") from e
+
+
+def _statements(sort: str, order: str, cursor: str | None, fields: list[str]):
+    """
+    :return: (依次执行的查询语句, 查询的列名)
+    SQLite 中 NULL 最小 (升序时在最前, 降序时在最后); NULL 与非 NULL 的部分分别查询,
+    避免 OR 条件使索引无法定位.
+    """
+    if sort not in SORT_FIELDS:
+        raise ValueError(f"不支持的排序列: {sort}, 可选: {', '.join(SORT_FIELDS)}")
+    unknown = [_ for _ in fields if _ not in Music.model_fields]
+    if unknown:
+        raise ValueError(f"未知的列: {', '.join(unknown)}")
+    # 生成游标需要 id 与排序列
+    names = list(dict.fromkeys([*fields, "id", sort]))
+    column, desc = getattr(Music, sort), order == "desc"
+    if sort == "id":
+        ordering = [Music.id.desc() if desc else Music.id]
+    else:
+        ordering = [column.desc(), Music.id.desc()] if desc else [column, Music.id]
+    stmt = select(*[getattr(Music, _) for _ in names]).order_by(*ordering)
+    if cursor is None:
+        return [stmt], names
+
+    value, _id = _decode_cursor(cursor)
+    key, null = tuple_(column, Music.id), column.is_(None)
+    if sort == "id":
+        stmts = [stmt.where(Music.id < _id if desc else Music.id > _id)]
+    elif desc and value is None:
+        stmts = [stmt.where(null, Music.id < _id)]
+    elif desc:
+        stmts = [stmt.where(key < tuple_(value, _id)), stmt.where(null)]
+    elif value is None:
+        stmts = [stmt.where(null, Music.id > _id), stmt.where(column.is_not(None))]
+    else:
+        stmts = [stmt.where(key > tuple_(value, _id))]
+    return stmts, names
+
+
+def _page(rows, names: list[str], fields: list[str], sort: str, size: int):
+    rows = [dict(zip(names, _)) for _ in rows]
+    next_cursor = None
+    if len(rows) > size:
+        rows = rows[:size]
+        next_cursor = _encode_cursor(rows[-1][sort], rows[-1]["id"])
+    items = [{_: row[_] for _ in fields} for row in rows]
+    return LibraryPage(items=items, next_cursor=next_cursor)
+
+
+def list_library(
+    sort: str = "title",
+    order: Literal["asc", "desc"] = "asc",
+    cursor: str | None = None,
+    size: int = 50,
+    fields: list[str] | None = None,
+) -> LibraryPage:
+    """
+    分页列出音乐库
+    :param sort: 排序列, 见 SORT_FIELDS
+    :param order: asc / desc
+    :param cursor: 上一页的 next_cursor, 为空时返回第一页
+    :param size: 每页数量
+    :param fields: 返回的列, 默认 DEFAULT_FIELDS
+    :raise ValueError: 排序列 / 列名 / 游标无效
+    """
+    fields = list(fields or DEFAULT_FIELDS)
+    stmts, names = _statements(sort, order, cursor, fields)
+    rows = []
+    with Session(engine) as session:
+        for stmt in stmts:
+            # 多查询一行, 判断是否有下一页
+            rows += session.exec(stmt.limit(size + 1 - len(rows))).all()
+            if len(rows) > size:
+                break
+    return _page(rows, names, fields, sort, size)
+
+
+async def list_library_async(
+    sort: str = "title",
+    order: Literal["asc", "desc"] = "asc",
+    cursor: str | None = None,
+    size: int = 50,
+    fields: list[str] | None = None,
+) -> LibraryPage:
+    """list_library 的异步版本"""
+    if get_async_engine() is None:
+        return await asyncio.to_thread(list_library, sort, order, cursor, size, fields)
+    fields = list(fields or DEFAULT_FIELDS)
+    stmts, names = _statements(sort, order, cursor, fields)
+    rows = []
+    async with async_session() as session:
+        for stmt in stmts:
+            rows += (await session.exec(stmt.limit(size + 1 - len(rows)))).all()
+            if len(rows) > size:
+                break
+    return _page(rows, names, fields, sort, size)
@@ -6,13 +6,17 @@
 @Date-Time  : 2023/12/23 13:00
 
 """
-import json
 import logging
 from pathlib import Path
 
 from pydantic import BaseModel, Field, AliasChoices
 
-from music_manager.music_lib.ffmpeg_operator import runner
+from music_manager.music_lib.ffmpeg_operator import (
+    get_music_meta,
+    get_music_meta_async,
+    get_music_meta_artwork,
+    get_music_meta_artwork_async,
+)
 
 __all__ = [
     "BaseModel",
@@ -58,15 +62,15 @@ class FormatModel(BaseModel):
 
     filename: str
     nb_streams: int
-    nb_programs: int
+    nb_programs: int | None = None
     format_name: str
-    format_long_name: str
-    start_time: float
-    duration: float
-    size: int
-    bit_rate: int
-    probe_score: int
-    tags: Tags
+    format_long_name: str | None = None
+    start_time: float | None = None
+    duration: float | None = None
+    size: int | None = None
+    bit_rate: int | None = None
+    probe_score: int | None = None
+    tags: Tags = Field(default_factory=Tags)
 
 
 class StreamsModel(BaseModel):
@@ -76,11 +80,11 @@ class StreamsModel(BaseModel):
 
     index: int
     profile: str | None = None  # Video Only
-    codec_name: str
-    codec_long_name: str
+    codec_name: str | None = None  # 未知编码时没有
+    codec_long_name: str | None = None
     codec_type: str
-    codec_tag_string: str
-    codec_tag: str
+    codec_tag_string: str | None = None
+    codec_tag: str | None = None
     sample_fmt: str | None = None  # Audio Only
     sample_rate: int | None = None  # Audio Only
     channels: int | None = None  # Audio Only
@@ -141,7 +145,11 @@ class FfprobrModel(BaseModel):
 
     @classmethod
     def from_meta(cls, meta: dict):
-        return cls(**meta)
+        """
+        由 ffprobe 的 JSON 输出构建
+        pydantic-core 的校验比 model_construct 更快, 这里不跳过校验.
+        """
+        return cls.model_validate(meta)
 
     @classmethod
     def from_media_file(cls, file_path: str | Path):
@@ -150,19 +158,28 @@ class FfprobrModel(BaseModel):
         :param file_path: 音乐文件路径
         :return:
         """
-        cmd = [
-            f"ffprobe",
-            "-v",
-            "quiet",
-            "-print_format",
-            "json",
-            "-show_format",
-            "-show_streams",
-            # "-show_entries",
-            file_path,
-        ]
-        stdout, stderr = runner(cmd)
-        return cls.from_meta(json.loads(stdout.decode("utf-8")))
+        return cls.from_meta(get_music_meta(file_path))
+
+    @classmethod
+    async def from_media_file_async(cls, file_path: str | Path):
+        """from_media_file 的异步版本"""
+        return cls.from_meta(await get_music_meta_async(file_path))
+
+    @classmethod
+    def from_media_file_with_artwork(cls, file_path: str | Path):
+        """
+        一次调用获取音乐文件的元数据与封面
+        :param file_path: 音乐文件路径
+        :return: (FfprobrModel, 封面 bytes | None)
+        """
+        meta, artwork = get_music_meta_artwork(file_path)
+        return cls.from_meta(meta), artwork
+
+    @classmethod
+    async def from_media_file_with_artwork_async(cls, file_path: str | Path):
+        """from_media_file_with_artwork 的异步版本"""
+        meta, artwork = await get_music_meta_artwork_async(file_path)
+        return cls.from_meta(meta), artwork
 
 
 if __name__ == "__main__":
@@ -6,19 +6,44 @@
 @Date-Time  : 2023/12/24 18:14
 
 """
+import asyncio
 import datetime
+import itertools
+import logging
+import threading
+import time
 from pathlib import Path
-from typing import Optional
+from collections import OrderedDict
+from typing import Iterable, Iterator, Literal, Optional
 from uuid import UUID
 from enum import Enum
 
-from sqlmodel import SQLModel, Field, Session
+from pydantic import BaseModel
+from sqlalchemy import Index
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.types import String, TypeDecorator
+from sqlmodel import SQLModel, Field, Session, select
 
 from music_manager.apis.models import MusicId3
-from music_manager.music_lib.database import engine
+from music_manager.music_lib.audio_hash import (
+    audio_hash as audio_hash_file,
+    audio_hash_bytes,
+)
+from music_manager.music_lib.database import async_session, engine, get_async_engine
+from music_manager.music_lib.file_ops import place_file
 from music_manager.config import settings
 
-__all__ = ["Music", "MusicBrainZMapping", "BrainZModify", "SQLModel"]
+__all__ = [
+    "Music",
+    "MusicBrainZMapping",
+    "BrainZModify",
+    "SQLModel",
+    "BulkResult",
+    "mapping_cache",
+    "save_all",
+]
+
+logger = logging.getLogger("music_manager.music_lib.models")
 
 
 class BrainZModify(str, Enum):
@@ -30,12 +55,37 @@ class BrainZModify(str, Enum):
     work = "work"  # 作品
 
 
+class PathType(TypeDecorator):
+    """Path <-> TEXT"""
+
+    impl = String
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else str(value)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else Path(value)
+
+
 class Music(MusicId3, table=True):
     """"""
 
     __tablename__ = "music_table"
+    __table_args__ = (
+        Index("ix_music_table_artist", "artist"),
+        Index("ix_music_table_album", "album"),
+        Index("ix_music_table_title", "title"),
+        Index("ix_music_table_file_full_path", "file_full_path"),
+        Index("ix_music_table_audio_hash", "audio_hash"),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
+    file_full_path: Path | None = Field(
+        None, sa_type=PathType, description="文件全路径, Path"
+    )
+    mtime_ns: int | None = Field(None, description="文件修改时间 (ns) - 增量索引")
+    audio_hash: str | None = Field(None, description="音频数据摘要 - 导入查重")
 
     def save_to_db(self):
         with Session(engine) as session:
@@ -43,30 +93,151 @@ class Music(MusicId3, table=True):
             session.commit()
             session.refresh(self)
 
+    async def save_to_db_async(self):
+        """save_to_db 的异步版本"""
+        if get_async_engine() is None:
+            return await asyncio.to_thread(self.save_to_db)
+        async with async_session(expire_on_commit=False) as session:
+            session.add(self)
+            await session.commit()
+            await session.refresh(self)
+
     @classmethod
-    def importer(cls, filename: str, data: bytes):
-        """导入器"""
-        settings.data_dir.joinpath("cache").mkdir(parents=True, exist_ok=True)
-        cache_file = settings.data_dir.joinpath("cache", filename)
-        cache_file.write_bytes(data)
-        music_file = settings.music_library.joinpath(filename)
+    def get(cls, music_id: int) -> Optional["Music"]:
+        with Session(engine) as session:
+            return session.get(cls, music_id)
+
+    @classmethod
+    async def get_async(cls, music_id: int) -> Optional["Music"]:
+        """get 的异步版本"""
+        if get_async_engine() is None:
+            return await asyncio.to_thread(cls.get, music_id)
+        async with async_session() as session:
+            return await session.get(cls, music_id)
+
+    def set_stat(self, path: Path):
+        """记录音乐库中文件的 size / mtime_ns, 与增量索引比较, 未变化时不再探测"""
+        stat = path.stat()
+        self.size, self.mtime_ns = stat.st_size, stat.st_mtime_ns
+
+    def brainz_mappings(self) -> list["MusicBrainZMapping"]:
+        """需要写入 MusicBrainZMapping 的 艺术家 / 专辑 / 歌曲"""
+        now = datetime.datetime.now()
+        return [
+            MusicBrainZMapping(type=type_, name=name, update_time=now)
+            for type_, name in [
+                (BrainZModify.artist, self.artist),
+                (BrainZModify.album, self.album),
+                (BrainZModify.recording, self.title),
+            ]
+            if name
+        ]
+
+    @classmethod
+    def find_by_audio_hash(cls, hashes: Iterable[str]) -> dict[str, Path]:
+        """已存在的音频摘要 -> 文件路径"""
+        hashes, result = list(dict.fromkeys(hashes)), {}
+        with Session(engine) as session:
+            for i in range(0, len(hashes), 500):
+                rows = session.exec(cls._audio_hash_query(hashes[i : i + 500]))
+                result.update(tuple(_) for _ in rows)
+        return result
+
+    @classmethod
+    async def find_by_audio_hash_async(cls, hashes: Iterable[str]) -> dict[str, Path]:
+        """find_by_audio_hash 的异步版本"""
+        if get_async_engine() is None:
+            return await asyncio.to_thread(cls.find_by_audio_hash, list(hashes))
+        hashes, result = list(dict.fromkeys(hashes)), {}
+        async with async_session() as session:
+            for i in range(0, len(hashes), 500):
+                rows = await session.exec(cls._audio_hash_query(hashes[i : i + 500]))
+                result.update(tuple(_) for _ in rows)
+        return result
+
+    @classmethod
+    def _audio_hash_query(cls, hashes: list[str]):
+        return select(cls.audio_hash, cls.file_full_path).where(
+            cls.audio_hash.in_(hashes)
+        )
+
+    @classmethod
+    def _check_exists(cls, audio_hash: str, music_file: Path):
+        duplicated = cls.find_by_audio_hash([audio_hash])
+        if duplicated:
+            raise FileExistsError(f"重复的音乐: {duplicated[audio_hash]}")
         if music_file.exists():
             raise FileExistsError("文件已存在")
-        self = cls.from_mutagen(cache_file)
-        self.file_full_path = music_file
-        self.save_to_db()
 
-        MusicBrainZMapping.add(BrainZModify.artist, self.artist)
-        MusicBrainZMapping.add(BrainZModify.album, self.album)
-        MusicBrainZMapping.add(BrainZModify.recording, self.title)
-        cache_file.rename(cache_file)
+    @classmethod
+    def import_file(
+        cls,
+        src: str | Path,
+        save=True,
+        audio_hash: str | None = None,
+        mode: Literal["link", "copy", "move"] | None = None,
+        filename: str | None = None,
+    ) -> "Music":
+        """
+        将文件导入音乐库, 不将文件读入内存
+        :param src: 音乐文件
+        :param save: 立即写入数据库; 批量导入时为 False, 由调用方使用 save_all 写入
+        :param audio_hash: 预先计算的音频摘要, 为空时由 src 计算
+        :param mode: 放入音乐库的方式, 见 place_file, 默认 settings.import_mode
+        :param filename: 音乐库中的文件名, 默认与 src 相同
+        :raise FileExistsError: 文件名已存在, 或音频数据与库中的音乐相同
+        """
+        src = Path(src)
+        mode = mode or settings.import_mode
+        audio_hash = audio_hash or audio_hash_file(src)
+        music_file = settings.music_library.joinpath(filename or src.name)
+        cls._check_exists(audio_hash, music_file)
+        self = cls.from_ffprobe(src)
+        method = place_file(src, music_file, mode)
+        logger.debug("import %s -> %s (%s)", src, music_file, method)
+        self.file_full_path = music_file
+        self.filename = music_file.name
+        self.audio_hash = audio_hash
+        self.set_stat(music_file)
+        if save:
+            try:
+                save_all([self], self.brainz_mappings())
+            except Exception:
+                if mode == "move":
+                    place_file(music_file, src, "move")
+                else:
+                    music_file.unlink()
+                raise
         return self
 
+    @classmethod
+    def importer(
+        cls, filename: str, data: bytes, save=True, audio_hash: str | None = None
+    ) -> "Music":
+        """
+        导入内存中的音乐数据 (例如上传的文件)
+        查重之后 data 写入 data/cache 再移动到音乐库, 只写一次; 导入文件请使用 import_file.
+        """
+        audio_hash = audio_hash or audio_hash_bytes(data)
+        cls._check_exists(audio_hash, settings.music_library.joinpath(filename))
+        settings.data_dir.joinpath("cache").mkdir(parents=True, exist_ok=True)
+        cache_file = settings.data_dir.joinpath("cache", filename)
+        cache_file.write_bytes(data)
+        try:
+            return cls.import_file(
+                cache_file, save=save, audio_hash=audio_hash, mode="move"
+            )
+        finally:
+            cache_file.unlink(missing_ok=True)
+
 
 class MusicBrainZMapping(SQLModel, table=True):
     """MusicBrainZ的信息映射表，缓存信息"""
 
     __tablename__ = "music_brain_z_mapping"
+    __table_args__ = (
+        Index("ux_music_brain_z_mapping_type_name", "type", "name", unique=True),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
     type: BrainZModify
@@ -82,12 +253,139 @@ class MusicBrainZMapping(SQLModel, table=True):
             session.refresh(self)
 
     @classmethod
-    def add(cls, type_, name: str):
-        """"""
+    def add(cls, type_, name: str) -> "MusicBrainZMapping":
+        """添加映射, (type, name) 已存在时返回已有的行"""
+        save_all(
+            mappings=[cls(type=type_, name=name, update_time=datetime.datetime.now())]
+        )
+        with Session(engine) as session:
+            return session.exec(
+                select(cls).where(cls.type == type_, cls.name == name)
+            ).one()
 
-        self = cls(type=type_, name=name, update_time=datetime.datetime.now())
-        self.save_to_db()
-        return self
+
+class _KeyCache:
+    """
+    已写入数据库的 (type, name), 最近最少使用淘汰
+    只用于跳过重复写入, 未命中时由 ON CONFLICT DO NOTHING 保证唯一.
+    """
+
+    def __init__(self, maxsize: int = 10_000):
+        self.maxsize = maxsize
+        self._keys: OrderedDict[tuple, None] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key: tuple) -> bool:
+        with self._lock:
+            if key not in self._keys:
+                return False
+            self._keys.move_to_end(key)
+            return True
+
+    def update(self, keys: Iterable[tuple]):
+        with self._lock:
+            for key in keys:
+                self._keys[key] = None
+                self._keys.move_to_end(key)
+            while len(self._keys) > self.maxsize:
+                self._keys.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._keys.clear()
+
+
+mapping_cache = _KeyCache()
+
+
+class BulkResult(BaseModel):
+    """批量写入的统计"""
+
+    rows: int = 0
+    seconds: float = 0
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def _values(row: SQLModel) -> dict:
+    return {_.name: getattr(row, _.name) for _ in row.__table__.columns}
+
+
+def _insert_musics(conn, rows: list[Music]):
+    """
+    一条 INSERT 写入多行, 已有 id 的行按 id 更新 (ON CONFLICT DO UPDATE)
+    写入后为新行回填 id
+    """
+    table = Music.__table__
+    stmt = sqlite_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.id],
+        set_={_.name: stmt.excluded[_.name] for _ in table.columns if _.name != "id"},
+    ).returning(table.c.id, sort_by_parameter_order=True)
+    ids = conn.execute(stmt, [_values(_) for _ in rows]).scalars().all()
+    for row, _id in zip(rows, ids):
+        row.id = _id
+
+
+def _insert_mappings(conn, rows: list[MusicBrainZMapping]):
+    """一条 INSERT 写入多行, (type, name) 已存在的行跳过 (ON CONFLICT DO NOTHING)"""
+    table = MusicBrainZMapping.__table__
+    stmt = sqlite_insert(table).on_conflict_do_nothing(
+        index_elements=[table.c.type, table.c.name]
+    )
+    conn.execute(stmt, [_values(_) for _ in rows])
+
+
+def _new_mappings(
+    mappings: Iterable[MusicBrainZMapping],
+) -> Iterator[MusicBrainZMapping]:
+    """跳过 mapping_cache 中已有的与本批次中重复的 (type, name)"""
+    seen = set()
+    for mapping in mappings:
+        key = (mapping.type, mapping.name)
+        if key in seen or key in mapping_cache:
+            continue
+        seen.add(key)
+        yield mapping
+
+
+def save_all(
+    musics: Iterable[Music] = (),
+    mappings: Iterable[MusicBrainZMapping] = (),
+    chunk_size: int = 500,
+) -> BulkResult:
+    """
+    批量写入 Music 与 MusicBrainZMapping
+    每 chunk_size 行一个事务, 代替逐行 save_to_db (每行一个事务与 fsync).
+    :param musics: 新增 (id 为空) 或更新 (按 id) 的 Music
+    :param mappings: MusicBrainZMapping, (type, name) 已存在的被跳过
+    :param chunk_size: 每个事务写入的行数
+    :return:
+    """
+    start = time.perf_counter()
+    result = BulkResult()
+    musics = iter(musics)
+    while chunk := list(itertools.islice(musics, chunk_size)):
+        with engine.begin() as conn:
+            _insert_musics(conn, chunk)
+        result.rows += len(chunk)
+    mappings = _new_mappings(mappings)
+    while chunk := list(itertools.islice(mappings, chunk_size)):
+        with engine.begin() as conn:
+            _insert_mappings(conn, chunk)
+        mapping_cache.update((_.type, _.name) for _ in chunk)
+        result.rows += len(chunk)
+    result.seconds = time.perf_counter() - start
+    if result.rows:
+        logger.info(
+            "save_all: %d rows in %.3fs (%.0f rows/s)",
+            result.rows,
+            result.seconds,
+            result.rows_per_sec,
+        )
+    return result
 
 
 if __name__ == "__main__":
@@ -9,6 +9,236 @@
 
 遍历音乐库中的文件, 将文件的元数据写入数据库中
 
+增量索引: 以 (size, mtime_ns) 判断文件是否变化, 只探测新增或已变化的文件,
+删除数据库中文件已不存在的行; 写入按批次提交.
 """
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from pydantic import BaseModel
+from sqlmodel import Session, and_, delete, or_, select
 
 from music_manager.config import settings
+from music_manager.music_lib.batch_probe import probe_many
+from music_manager.music_lib.database import engine
+from music_manager.music_lib.models import Music, save_all
+
+__all__ = [
+    "MUSIC_SUFFIXES",
+    "IndexResult",
+    "scan_library",
+    "index_library",
+    "index_paths",
+]
+
+logger = logging.getLogger("music_manager.music_lib.music_index")
+
+MUSIC_SUFFIXES = {".flac", ".mp3", ".wav", ".ogg", ".m4a", ".ape", ".aac", ".opus"}
+
+
+class IndexResult(BaseModel):
+    """索引结果统计"""
+
+    scanned: int = 0  # 扫描到的音乐文件
+    unchanged: int = 0  # 未变化, 跳过
+    added: int = 0  # 新增
+    updated: int = 0  # 已变化, 重新探测
+    removed: int = 0  # 文件已不存在, 删除
+    errors: dict[str, str] = {}  # 探测失败的文件 -> 原因
+    seconds: float = 0
+
+
+def scan_library(root: str | Path) -> Iterator[tuple[str, int, int]]:
+    """
+    遍历音乐库, 跳过隐藏文件与目录
+    :param root: 音乐库目录
+    :return: (文件绝对路径, size, mtime_ns)
+    """
+    stack = [os.path.abspath(root)]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError as e:
+            logger.warning("无法读取目录: %s", e)
+            continue
+        with it:
+            for entry in it:
+                if entry.name.startswith("."):
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif os.path.splitext(entry.name)[1].lower() in MUSIC_SUFFIXES:
+                        stat = entry.stat()
+                        yield entry.path, stat.st_size, stat.st_mtime_ns
+                except OSError as e:
+                    logger.warning("无法读取文件: %s", e)
+
+
+def _under(path: str) -> str:
+    return path.rstrip(os.sep) + os.sep
+
+
+def _indexed(paths: list[str]) -> dict[str, tuple[int, int | None, int | None]]:
+    """数据库中等于 path 或位于 path 目录下的文件 -> (id, size, mtime_ns)"""
+    result = {}
+    with Session(engine) as session:
+        for i in range(0, len(paths), 100):
+            conditions = []
+            for path in paths[i : i + 100]:
+                # 以范围代替 LIKE 'path/%', 可以使用 file_full_path 上的索引
+                prefix = _under(path)
+                conditions.append(Music.file_full_path == path)
+                conditions.append(
+                    and_(
+                        Music.file_full_path >= prefix,
+                        Music.file_full_path < prefix[:-1] + chr(ord(os.sep) + 1),
+                    )
+                )
+            rows = session.exec(
+                select(
+                    Music.id, Music.file_full_path, Music.size, Music.mtime_ns
+                ).where(or_(*conditions))
+            )
+            result.update(
+                (str(path), (_id, size, mtime_ns)) for _id, path, size, mtime_ns in rows
+            )
+    return result
+
+
+def _remove(ids: Iterable[int], batch_size: int) -> int:
+    ids, removed = list(ids), 0
+    with Session(engine) as session:
+        for i in range(0, len(ids), batch_size):
+            chunk = ids[i : i + batch_size]
+            session.exec(delete(Music).where(Music.id.in_(chunk)))
+            removed += len(chunk)
+        session.commit()
+    return removed
+
+
+def _index(
+    paths: list[str],
+    files: Iterable[tuple[str, int, int]],
+    workers: int | None,
+    batch_size: int,
+    executor,
+) -> IndexResult:
+    """
+    以 files 为准更新 paths 范围内的索引
+    :param paths: 更新范围, 文件或目录 (绝对路径)
+    :param files: 范围内现存的音乐文件 (path, size, mtime_ns)
+    """
+    start = time.perf_counter()
+    result = IndexResult()
+    indexed = _indexed(paths)
+
+    # 需要探测的文件 -> (已有的行 id, size, mtime_ns)
+    stats: dict[str, tuple[int | None, int, int]] = {}
+    for path, size, mtime_ns in files:
+        result.scanned += 1
+        row = indexed.pop(path, None)
+        if row is not None and row[1:] == (size, mtime_ns):
+            result.unchanged += 1
+            continue
+        stats[path] = row and row[0], size, mtime_ns
+
+    # 剩余的行对应的文件已被删除
+    result.removed = _remove((_[0] for _ in indexed.values()), batch_size)
+
+    def musics() -> Iterator[Music]:
+        for probe in probe_many(
+            stats, workers=workers, executor=executor, with_audio_hash=True
+        ):
+            path = str(probe.path)
+            if probe.music is None:
+                result.errors[path] = probe.error
+                continue
+            _id, size, mtime_ns = stats[path]
+            if _id is None:
+                result.added += 1
+            else:
+                result.updated += 1
+            yield Music(
+                **probe.music.model_dump(exclude={"id", "size"}),
+                id=_id,
+                size=size,
+                mtime_ns=mtime_ns,
+                audio_hash=probe.audio_hash,
+            )
+
+    save_all(musics(), chunk_size=batch_size)
+
+    result.seconds = round(time.perf_counter() - start, 3)
+    logger.info(
+        "index %s: scanned=%d unchanged=%d added=%d updated=%d removed=%d errors=%d",
+        paths[0] if len(paths) == 1 else f"{len(paths)} paths",
+        result.scanned,
+        result.unchanged,
+        result.added,
+        result.updated,
+        result.removed,
+        len(result.errors),
+    )
+    return result
+
+
+def index_library(
+    root: str | Path | None = None,
+    workers: int | None = None,
+    batch_size: int = 500,
+    executor="process",
+) -> IndexResult:
+    """
+    增量更新音乐库索引
+    :param root: 音乐库目录, 默认 settings.music_library
+    :param workers: 探测的并行数量, 见 probe_many
+    :param batch_size: 每次提交写入的行数
+    :param executor: process / thread, 见 probe_many
+    :return:
+    """
+    root = os.path.abspath(root or settings.music_library)
+    return _index([root], scan_library(root), workers, batch_size, executor)
+
+
+def _stat_paths(paths: list[str]) -> Iterator[tuple[str, int, int]]:
+    for path in paths:
+        if os.path.isdir(path):
+            yield from scan_library(path)
+            continue
+        name = os.path.basename(path)
+        if (
+            name.startswith(".")
+            or os.path.splitext(name)[1].lower() not in MUSIC_SUFFIXES
+        ):
+            continue
+        try:
+            stat = os.stat(path)
+        except OSError:  # 已被删除
+            continue
+        yield path, stat.st_size, stat.st_mtime_ns
+
+
+def index_paths(
+    paths: Iterable[str | Path],
+    workers: int | None = None,
+    batch_size: int = 500,
+    executor="process",
+) -> IndexResult:
+    """
+    只更新指定文件或目录的索引, 用于响应文件系统事件
+    已不存在的路径会删除对应 (及其目录下) 的行.
+    :param paths: 发生变化的文件或目录
+    """
+    # 去掉位于其他目录之下的路径, 避免重复扫描
+    kept: list[str] = []
+    for path in sorted({os.path.abspath(_) for _ in paths}):
+        if kept and path.startswith(_under(kept[-1])):
+            continue
+        kept.append(path)
+    if not kept:
+        return IndexResult()
+    return _index(kept, _stat_paths(kept), workers, batch_size, executor)
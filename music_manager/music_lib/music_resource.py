@@ -7,17 +7,26 @@
 
 从第三方平台获取音乐的标签信息
 
+每个平台一个长期存在的客户端 (get_client), 请求之间复用连接池中的 TCP / TLS 连接;
+服务启动时 open_clients 创建, 停止时 close_clients 关闭.
+
+请求经过 rate_limit: 每个平台独立限速, 失败时退避重试, 平台故障时熔断.
+
+smart_tag (SmartTagClient) 同时查询多个平台, 在时间预算内合并去重各平台的结果.
 """
 import abc
+import asyncio
 import base64
 import hashlib
 import json
+import logging
 import random
 import typing
 import uuid
 from functools import cached_property
+from pathlib import Path
 
-from httpx import AsyncClient, USE_CLIENT_DEFAULT, Response
+from httpx import AsyncClient, Limits, USE_CLIENT_DEFAULT, Response
 from httpx._client import UseClientDefault
 from httpx._types import (
     URLTypes,
@@ -32,10 +41,31 @@ from httpx._types import (
     RequestExtensions,
 )
 
+from music_manager.config import settings
+from music_manager.music_lib.rate_limit import ProviderStatus, get_guard
+from music_manager.music_lib.resource_cache import normalize_query, resource_cache
+
+logger = logging.getLogger("music_manager.music_lib.music_resource")
+
+
+def _http2() -> bool:
+    """配置启用 HTTP/2 并且安装了 h2"""
+    if not settings.http_config.http2:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning("未安装 h2, 不使用 HTTP/2")
+        return False
+    return True
+
 
 class AbcClient(AsyncClient):
     """"""
 
+    # MusicResource 是否缓存结果
+    cacheable = True
+
     USER_AGENT_LIST = [
         (
             "Mozilla/5.0 (X11; Linux x86_64) "
@@ -118,16 +148,32 @@ class AbcClient(AsyncClient):
     def random_user_agent(self):
         return random.choice(self.USER_AGENT_LIST)
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, **kwargs):
+        conf = settings.http_config
+        super().__init__(
+            timeout=conf.timeout,
+            limits=Limits(
+                max_connections=conf.max_connections,
+                max_keepalive_connections=conf.max_keepalive_connections,
+                keepalive_expiry=conf.keepalive_expiry,
+            ),
+            http2=_http2(),
+            **kwargs,
+        )
         self.headers["User-Agent"] = self.random_user_agent
-        self.timeout = 5
+
+    @cached_property
+    def provider(self) -> str:
+        """RESOURCES 中的平台名称, 限速与熔断按平台区分"""
+        return next(
+            (k for k, v in RESOURCES.items() if v is type(self)), type(self).__name__
+        )
 
     async def request(self, method: str, url: URLTypes, **kwargs) -> Response:
-        resp = await super().request(method, url, **kwargs)
-        if resp.status_code != 200:
-            raise Exception(f">> 请求失败: {resp.status_code}\n>> {resp.text}")
-        return resp
+        """经过平台的限速与熔断发出请求, 429 / 5xx / 网络错误时退避重试"""
+        return await get_guard(self.provider).send(
+            lambda: super(AbcClient, self).request(method, url, **kwargs)
+        )
 
     @abc.abstractmethod
     async def fetch_lyric(self, song_id):
@@ -398,28 +444,202 @@ class QMusicClient(AbcClient):
         return self.format_list((await self.get_music_search(title))["data"])
 
 
+class SmartTagClient(AbcClient):
+    """
+    同时查询 settings.smart_tag_config.providers 中的平台
+    每个平台有各自的超时时间, 整体不超过 deadline; 第一个平台返回结果后其他平台最多再等待
+    grace 秒. 总耗时接近最快的有结果的平台, 而不是各平台耗时之和.
+    各平台的结果由 MusicResource 缓存 (被放弃的请求在后台完成后同样写入缓存),
+    合并后的结果不再缓存 (到期时可能不完整).
+    """
+
+    cacheable = False
+
+    @staticmethod
+    def _provider_timeout(provider: str) -> float:
+        conf = settings.smart_tag_config
+        return min(conf.timeouts.get(provider, conf.default_timeout), conf.deadline)
+
+    async def _query(self, provider: str, fetch: typing.Callable) -> typing.Any:
+        start = asyncio.get_running_loop().time()
+        try:
+            return await asyncio.wait_for(fetch(), self._provider_timeout(provider))
+        except asyncio.TimeoutError:
+            logger.info("smart_tag: %s 超时, 放弃", provider)
+            return None
+        finally:
+            logger.debug(
+                "smart_tag: %s %.3fs",
+                provider,
+                asyncio.get_running_loop().time() - start,
+            )
+
+    async def _fan_out(self, fetch: typing.Callable[[str], typing.Awaitable]) -> dict:
+        """
+        在时间预算内查询全部平台, 返回 平台 -> 结果 (超时或未完成为 None)
+        第一个平台返回非空结果后, 其他平台最多再等待 grace 秒.
+        """
+        conf = settings.smart_tag_config
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + conf.deadline
+        tasks = {
+            asyncio.ensure_future(self._query(_, lambda _=_: fetch(_))): _
+            for _ in conf.providers
+        }
+        results = dict.fromkeys(conf.providers)
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(
+                pending,
+                timeout=max(deadline - loop.time(), 0),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if not done:
+                break
+            for task in done:
+                results[tasks[task]] = task.result()
+            if any(results.values()):
+                deadline = min(deadline, loop.time() + conf.grace)
+        for task in pending:
+            logger.info("smart_tag: %s 未在时间预算内返回, 放弃", tasks[task])
+            task.cancel()
+        return results
+
+    @staticmethod
+    def _tag(provider: str, song: dict) -> dict:
+        """id 改为 "平台:id" (fetch_lyric 使用), 平台的原始 id 保存在 source_id"""
+        song = dict(song, resource=provider)
+        if song.get("id") is not None:
+            song["source_id"], song["id"] = song["id"], f"{provider}:{song['id']}"
+        return song
+
+    @classmethod
+    def merge(cls, results: dict[str, list | None]) -> list[dict]:
+        """
+        交替合并各平台的结果 (每个平台的第一名在前), 以 (歌名, 艺术家) 去重
+        结果中增加 resource: 结果所属的平台; id 带有平台前缀, 见 _tag.
+        """
+        ranked = [
+            [cls._tag(provider, _) for _ in songs if isinstance(_, dict)]
+            for provider, songs in results.items()
+            if isinstance(songs, list)
+        ]
+        merged, seen = [], set()
+        for rank in range(max(map(len, ranked), default=0)):
+            for songs in ranked:
+                if rank >= len(songs):
+                    continue
+                song = songs[rank]
+                key = (
+                    normalize_query(song.get("name") or ""),
+                    normalize_query(song.get("artist") or ""),
+                )
+                if key in seen:
+                    continue
+                seen.add(key)
+                merged.append(song)
+        return merged
+
+    async def fetch_id3_by_title(self, title):
+        if isinstance(title, dict):
+            full_path = title.get("full_path")
+            title = title.get("title") or (
+                Path(full_path).stem if full_path else ""
+            )
+        results = await self._fan_out(
+            lambda provider: MusicResource(provider).fetch_id3_by_title(title)
+        )
+        return self.merge(results)
+
+    async def fetch_lyric(self, song_id):
+        """
+        song_id 为 merge 返回的 "平台:id", 只查询该平台
+        平台的原始 id 只对该平台有意义, 不带平台前缀时不查询.
+        """
+        provider, _, _id = str(song_id).partition(":")
+        if not _id or provider not in RESOURCES or provider == "smart_tag":
+            logger.info("smart_tag: 歌词 id 没有平台前缀: %s", song_id)
+            return ""
+        return await MusicResource(provider).fetch_lyric(_id)
+
+
+RESOURCES: dict[str, type[AbcClient]] = {
+    "smart_tag": SmartTagClient,
+    "netease": AbcClient,
+    "migu": MiguMusicClient,
+    "qmusic": QMusicClient,
+    "kugou": AbcClient,
+    "kuwo": KuwoClient,
+    "acoustid": AbcClient,
+}
+# 平台 -> 共享的客户端
+_clients: dict[str, AbcClient] = {}
+
+
+def get_client(resource: str) -> AbcClient:
+    """平台的共享客户端, 第一次使用时创建"""
+    client = _clients.get(resource)
+    if client is None or client.is_closed:
+        client = _clients[resource] = RESOURCES[resource]()
+        client.provider = resource
+    return client
+
+
+def open_clients():
+    """创建全部平台的客户端"""
+    for resource in RESOURCES:
+        get_client(resource)
+
+
+async def close_clients():
+    """关闭全部客户端, 释放连接池"""
+    clients = list(_clients.values())
+    _clients.clear()
+    await asyncio.gather(*(_.aclose() for _ in clients))
+
+
+def provider_status() -> list[ProviderStatus]:
+    """各平台的限速与熔断状态"""
+    return [
+        get_guard(_).status()
+        for _, client in RESOURCES.items()
+        if not issubclass(client, SmartTagClient)
+    ]
+
+
 class MusicResource:
+    """平台的搜索 / 歌词, 结果经过 resource_cache 缓存"""
+
     def __init__(self, info):
-        self.resource = {
-            "smart_tag": AbcClient,
-            "netease": AbcClient,
-            "migu": MiguMusicClient,
-            "qmusic": QMusicClient,
-            "kugou": AbcClient,
-            "kuwo": KuwoClient,
-            "acoustid": AbcClient,
-        }[info]()
+        self.name = info
+        self.resource = get_client(info)
+        self.cache = resource_cache if self.resource.cacheable else None
 
     async def fetch_lyric(self, song_id):
         try:
-            return await self.resource.fetch_lyric(song_id)
+            if self.cache is None:
+                return await self.resource.fetch_lyric(song_id)
+            return await self.cache.get_or_fetch(
+                self.name,
+                "lyric",
+                song_id,
+                lambda: self.resource.fetch_lyric(song_id),
+                casefold=False,
+            )
         except Exception as e:
             print("音乐平台歌词获取失败", e)
             return ""
 
     async def fetch_id3_by_title(self, title):
         try:
-            return await self.resource.fetch_id3_by_title(title)
+            if self.cache is None:
+                return await self.resource.fetch_id3_by_title(title)
+            return await self.cache.get_or_fetch(
+                self.name,
+                "search",
+                title,
+                lambda: self.resource.fetch_id3_by_title(title),
+            )
         except Exception as e:
             print("音乐平台搜索失败", e)
             return []
@@ -0,0 +1,274 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : native_probe.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/18 21:00
+
+进程内读取 FLAC / MP3 / WAV 的元数据 (基于 mutagen), 不启动 ffprobe.
+
+输出与 `ffprobe -show_format -show_streams` 相同结构的 dict,
+可直接用于 FfprobrModel.from_meta 与探测缓存.
+不支持的容器抛出 UnsupportedFormat, 由调用方回退到 ffprobe.
+"""
+import logging
+import os
+import struct
+from pathlib import Path
+
+__all__ = [
+    "UnsupportedFormat",
+    "SUPPORTED_SUFFIXES",
+    "image_size",
+    "get_music_meta_artwork",
+]
+
+logger = logging.getLogger("music_manager.music_lib.native_probe")
+
+SUPPORTED_SUFFIXES = {".flac", ".mp3", ".wav"}
+
+# mutagen 的 Vorbis Comment 键 -> ffprobe 的键 (同 ffmpeg ff_vorbiscomment_metadata_conv)
+_VORBIS_KEYS = {
+    "albumartist": "album_artist",
+    "tracknumber": "track",
+    "discnumber": "disc",
+    "description": "comment",
+    "unsyncedlyrics": "lyrics",
+}
+
+# ID3 帧 -> ffprobe 的键 (同 ffmpeg ff_id3v2_34_metadata_conv / ff_id3v2_4_metadata_conv)
+_ID3_KEYS = {
+    "TALB": "album",
+    "TCOM": "composer",
+    "TCON": "genre",
+    "TCOP": "copyright",
+    "TENC": "encoded_by",
+    "TIT2": "title",
+    "TLAN": "language",
+    "TPE1": "artist",
+    "TPE2": "album_artist",
+    "TPE3": "performer",
+    "TPOS": "disc",
+    "TPUB": "publisher",
+    "TRCK": "track",
+    "TSSE": "encoder",
+    "TDRC": "date",
+    "TYER": "date",
+    "COMM": "comment",
+    "USLT": "lyrics",
+}
+
+# RIFF INFO -> ffprobe 的键 (同 ffmpeg ff_riff_info_conv)
+_RIFF_INFO_KEYS = {
+    b"IART": "artist",
+    b"ICMT": "comment",
+    b"ICOP": "copyright",
+    b"ICRD": "date",
+    b"IGNR": "genre",
+    b"ILNG": "language",
+    b"INAM": "title",
+    b"IPRD": "album",
+    b"IPRT": "track",
+    b"ITRK": "track",
+    b"ISFT": "encoder",
+    b"ITCH": "encoded_by",
+}
+
+_AUDIO_CODECS = {
+    "flac": ("flac", "FLAC (Free Lossless Audio Codec)", "raw FLAC"),
+    "mp3": ("mp3", "MP3 (MPEG audio layer 3)", "MP2/3 (MPEG audio layer 2/3)"),
+    "wav": (
+        "pcm_s16le",
+        "PCM signed 16-bit little-endian",
+        "WAV / WAVE (Waveform Audio)",
+    ),
+}
+
+_IMAGE_CODECS = {
+    "image/png": ("png", "PNG (Portable Network Graphics) image"),
+    "image/jpeg": ("mjpeg", "Motion JPEG"),
+}
+
+
+class UnsupportedFormat(ValueError):
+    """native 无法处理的文件"""
+
+
+def image_size(data: bytes) -> tuple[int | None, int | None]:
+    """从 JPEG / PNG 的文件头读取宽高"""
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return struct.unpack(">II", data[16:24])
+    if data[:2] == b"\xff\xd8":
+        i = 2
+        while i + 9 < len(data):
+            if data[i] != 0xFF:
+                i += 1
+                continue
+            marker = data[i + 1]
+            if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7 or marker == 0xFF:
+                i += 1 if marker == 0xFF else 2
+                continue
+            (length,) = struct.unpack(">H", data[i + 2 : i + 4])
+            # SOF0 - SOF15, 除去 DHT(C4) JPG(C8) DAC(CC)
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                h, w = struct.unpack(">HH", data[i + 5 : i + 9])
+                return w, h
+            i += 2 + length
+    return None, None
+
+
+def _image_mime(data: bytes) -> str:
+    return "image/png" if data[:4] == b"\x89PNG" else "image/jpeg"
+
+
+def _vorbis_tags(tags) -> dict:
+    result = {}
+    for key, value in tags or []:
+        key = _VORBIS_KEYS.get(key.lower(), key.lower())
+        result[key] = f"{result[key]};{value}" if key in result else value
+    return result
+
+
+def _id3_tags(tags) -> dict:
+    result = {}
+    for frame in (tags or {}).values():
+        key = _ID3_KEYS.get(frame.FrameID)
+        if key is None:
+            continue
+        if frame.FrameID == "USLT":
+            value = frame.text
+        else:
+            value = ";".join(str(_) for _ in frame.text)
+        result.setdefault(key, value)
+    return result
+
+
+def _riff_info_tags(file_path: Path) -> dict:
+    """读取 WAV 中 LIST/INFO 块的标签, 只读取块头与 LIST 块"""
+    result = {}
+    with open(file_path, "rb") as f:
+        if f.read(12)[8:] != b"WAVE":
+            return result
+        while header := f.read(8):
+            if len(header) < 8:
+                break
+            chunk_id, size = header[:4], struct.unpack("<I", header[4:])[0]
+            if chunk_id != b"LIST":
+                f.seek(size + (size & 1), os.SEEK_CUR)
+                continue
+            data = f.read(size + (size & 1))
+            if data[:4] != b"INFO":
+                continue
+            i = 4
+            while i + 8 <= len(data):
+                key, length = (
+                    data[i : i + 4],
+                    struct.unpack("<I", data[i + 4 : i + 8])[0],
+                )
+                value = data[i + 8 : i + 8 + length].rstrip(b"\x00")
+                if key in _RIFF_INFO_KEYS:
+                    value = value.decode("utf-8", errors="replace")
+                    result.setdefault(_RIFF_INFO_KEYS[key], value)
+                i += 8 + length + (length & 1)
+    return result
+
+
+def _id3_picture(tags) -> bytes | None:
+    pictures = tags.getall("APIC") if tags else []
+    # 优先选择封面 (type 3)
+    pictures = sorted(pictures, key=lambda _: _.type != 3)
+    return pictures[0].data if pictures else None
+
+
+def _open(file_path: Path):
+    """-> (格式, mutagen 对象, tags dict, 封面)"""
+    try:
+        import mutagen
+        from mutagen.flac import FLAC
+        from mutagen.mp3 import MP3
+        from mutagen.wave import WAVE
+    except ImportError as e:
+        raise UnsupportedFormat(f"mutagen 未安装: {e}")
+
+    suffix = file_path.suffix.lower()
+    try:
+        if suffix == ".flac":
+            _mu = FLAC(file_path)
+            artwork = _mu.pictures[0].data if _mu.pictures else None
+            return "flac", _mu, _vorbis_tags(_mu.tags), artwork
+        if suffix == ".mp3":
+            _mu = MP3(file_path)
+            return "mp3", _mu, _id3_tags(_mu.tags), _id3_picture(_mu.tags)
+        if suffix == ".wav":
+            _mu = WAVE(file_path)
+            tags = {**_riff_info_tags(file_path), **_id3_tags(_mu.tags)}
+            return "wav", _mu, tags, _id3_picture(_mu.tags)
+    except mutagen.MutagenError as e:
+        raise UnsupportedFormat(f"mutagen 读取失败: {file_path}: {e}")
+    raise UnsupportedFormat(f"不支持的格式: {file_path}")
+
+
+def get_music_meta_artwork(file_path: str | Path) -> tuple[dict, bytes | None]:
+    """
+    进程内获取音乐文件的元数据与封面
+    :param file_path: 音乐文件路径
+    :return: (与 ffprobe 结构相同的元数据, 封面) 没有封面时为 None
+    """
+    file_path = Path(file_path)
+    format_name, _mu, tags, artwork = _open(file_path)
+    info = _mu.info
+    codec_name, codec_long_name, format_long_name = _AUDIO_CODECS[format_name]
+    if format_name == "wav" and getattr(info, "bits_per_sample", 16) != 16:
+        codec_name = f"pcm_s{info.bits_per_sample}le"
+        codec_long_name = f"PCM signed {info.bits_per_sample}-bit little-endian"
+
+    size = os.path.getsize(file_path)
+    duration = info.length or 0.0
+    streams = [
+        {
+            "index": 0,
+            "codec_name": codec_name,
+            "codec_long_name": codec_long_name,
+            "codec_type": "audio",
+            "codec_tag_string": "[0][0][0][0]",
+            "codec_tag": "0x0000",
+            "sample_rate": str(info.sample_rate),
+            "channels": info.channels,
+            "bits_per_sample": getattr(info, "bits_per_sample", 0),
+            "duration": f"{duration:.6f}",
+            "bit_rate": str(info.bitrate) if info.bitrate else None,
+        }
+    ]
+    if artwork:
+        width, height = image_size(artwork)
+        image_codec, image_long_name = _IMAGE_CODECS[_image_mime(artwork)]
+        streams.append(
+            {
+                "index": 1,
+                "codec_name": image_codec,
+                "codec_long_name": image_long_name,
+                "codec_type": "video",
+                "codec_tag_string": "[0][0][0][0]",
+                "codec_tag": "0x0000",
+                "width": width,
+                "height": height,
+                "disposition": {"attached_pic": 1},
+            }
+        )
+    meta = {
+        "streams": streams,
+        "format": {
+            "filename": str(file_path),
+            "nb_streams": len(streams),
+            "nb_programs": 0,
+            "format_name": format_name,
+            "format_long_name": format_long_name,
+            "start_time": "0.000000",
+            "duration": f"{duration:.6f}",
+            "size": str(size),
+            "bit_rate": str(int(size * 8 / duration)) if duration else "0",
+            "probe_score": 100,
+            "tags": tags,
+        },
+    }
+    return meta, artwork
@@ -0,0 +1,245 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : probe_cache.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/18 20:05
+
+ffprobe 结果的持久化缓存
+
+与 data.db 放在同一目录下 (probe_cache.db), 以 (path, st_size, st_mtime_ns, st_ino)
+作为键, 文件未变化时不再启动 ffprobe / ffmpeg.
+
+- probe_table: 文件 -> ffprobe 原始 JSON + 封面摘要
+- 封面数据保存在 ArtworkStore 中 (相同封面只存一份)
+
+淘汰策略: 访问时间最久的条目超出 max_entries 时被删除;
+prune() 额外删除文件已不存在或已变化的条目, 并删除既不被缓存也不被音乐库
+(music_table.artwork_hash) 引用的封面.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from music_manager.config import settings
+from music_manager.music_lib.artwork_store import ArtworkStore, artwork_store
+
+__all__ = ["ProbeCache", "probe_cache"]
+
+logger = logging.getLogger("music_manager.music_lib.probe_cache")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS probe_table (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    ino INTEGER NOT NULL,
+    meta TEXT,
+    artwork_digest TEXT,
+    access_time REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS probe_table_access_time ON probe_table (access_time);
+"""
+
+# 命中时刷新访问时间的最小间隔, 避免每次读取都写库
+_TOUCH_INTERVAL = 3600
+# 每写入多少次检查一次条目数量
+_EVICT_EVERY = 1000
+
+
+def _file_key(file_path: str | Path) -> tuple[str, int, int, int] | None:
+    """(path, size, mtime_ns, ino), 文件不存在时返回 None"""
+    path = os.path.abspath(file_path)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return path, stat.st_size, stat.st_mtime_ns, stat.st_ino
+
+
+class ProbeCache:
+    """ffprobe 结果缓存"""
+
+    def __init__(
+        self,
+        db_file: Path,
+        max_entries: int = 200_000,
+        enable=True,
+        store: ArtworkStore = artwork_store,
+    ):
+        self.db_file = Path(db_file)
+        self.store = store
+        self.max_entries = max_entries
+        self.enable = enable
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._pid = None
+        self._writes = 0
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # 连接不能跨进程使用 (进程池 fork 后需要重新打开)
+        if self._conn is None or self._pid != os.getpid():
+            self.db_file.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(
+                self.db_file, check_same_thread=False, isolation_level=None
+            )
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            self._pid = os.getpid()
+        return self._conn
+
+    def close(self):
+        if self._conn is not None and self._pid == os.getpid():
+            self._conn.close()
+        self._conn = None
+
+    def _lookup(self, key) -> tuple[str | None, str | None] | None:
+        if not self.enable or key is None:
+            return None
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT size, mtime_ns, ino, meta, artwork_digest, access_time "
+                "FROM probe_table WHERE path = ?",
+                key[:1],
+            ).fetchone()
+            if row is None or tuple(row[:3]) != key[1:]:
+                return None
+            now = time.time()
+            if now - row[5] > _TOUCH_INTERVAL:
+                self.conn.execute(
+                    "UPDATE probe_table SET access_time = ? WHERE path = ?",
+                    (now, key[0]),
+                )
+        return row[3], row[4]
+
+    def _store(self, key, **values):
+        """写入 meta 或 artwork_digest, 文件变化时丢弃旧条目的其他字段"""
+        if not self.enable or key is None:
+            return
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT size, mtime_ns, ino FROM probe_table WHERE path = ?",
+                key[:1],
+            ).fetchone()
+            if row is None or tuple(row) != key[1:]:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO probe_table "
+                    "(path, size, mtime_ns, ino, access_time) VALUES (?, ?, ?, ?, ?)",
+                    (*key, time.time()),
+                )
+            for column, value in values.items():
+                self.conn.execute(
+                    f"UPDATE probe_table SET {column} = ? WHERE path = ?",
+                    (value, key[0]),
+                )
+            self._writes += 1
+            if self._writes % _EVICT_EVERY == 0:
+                self._evict()
+
+    def get_meta(self, file_path: str | Path) -> dict | None:
+        """缓存的 ffprobe JSON, 未命中时返回 None"""
+        row = self._lookup(_file_key(file_path))
+        if row is None or row[0] is None:
+            return None
+        return json.loads(row[0])
+
+    def set_meta(self, file_path: str | Path, meta: dict):
+        self._store(_file_key(file_path), meta=json.dumps(meta, ensure_ascii=False))
+
+    def get_artwork(self, file_path: str | Path) -> tuple[bool, bytes | None]:
+        """
+        缓存的封面
+        :return: (是否命中, 封面) 命中但没有封面时为 (True, None)
+        """
+        row = self._lookup(_file_key(file_path))
+        if row is None or row[1] is None:
+            return False, None
+        if row[1] == "":
+            return True, None
+        data = self.store.get(row[1])
+        if data is None:
+            return False, None
+        return True, data
+
+    def set_artwork(self, file_path: str | Path, artwork: bytes | None):
+        """缓存封面, artwork 为 None 表示文件没有封面"""
+        key = _file_key(file_path)
+        if not self.enable or key is None:
+            return
+        digest = self.store.put(artwork).digest if artwork else ""
+        self._store(key, artwork_digest=digest)
+
+    def _evict(self) -> int:
+        """删除访问时间最久的条目, 直到不超过 max_entries"""
+        cur = self.conn.execute(
+            "DELETE FROM probe_table WHERE path IN ("
+            "SELECT path FROM probe_table ORDER BY access_time DESC "
+            "LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+        return cur.rowcount
+
+    def prune(self) -> int:
+        """
+        清理缓存: 删除文件已不存在或已变化的条目, 淘汰超出数量的条目
+        :return: 删除的条目数量
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT path, size, mtime_ns, ino FROM probe_table"
+            ).fetchall()
+            stale = [(_[0],) for _ in rows if _file_key(_[0]) != tuple(_)]
+            self.conn.execute("BEGIN")
+            self.conn.executemany("DELETE FROM probe_table WHERE path = ?", stale)
+            removed = len(stale) + self._evict()
+            self.conn.execute("COMMIT")
+            self.conn.execute("VACUUM")
+        logger.info("probe cache pruned: %d entries", removed)
+        self.collect_artwork()
+        return removed
+
+    def collect_artwork(self) -> int:
+        """
+        删除不再被引用的封面: 引用来自本缓存与音乐库 (music_table.artwork_hash)
+        清理期间保存的封面可能尚未写入音乐库, 不要与导入同时运行.
+        :return: 删除的封面数量
+        """
+        from sqlalchemy.exc import OperationalError
+
+        from music_manager.music_lib.database import engine
+
+        with self._lock:
+            referenced = {
+                _[0]
+                for _ in self.conn.execute(
+                    "SELECT DISTINCT artwork_digest FROM probe_table "
+                    "WHERE artwork_digest != ''"
+                )
+            }
+        try:
+            with engine.connect() as conn:
+                referenced.update(
+                    _[0]
+                    for _ in conn.exec_driver_sql(
+                        "SELECT DISTINCT artwork_hash FROM music_table "
+                        "WHERE artwork_hash IS NOT NULL"
+                    )
+                )
+        except OperationalError as e:
+            # 音乐库不可用时无法判断引用, 不删除
+            logger.warning("跳过封面清理: %s", e)
+            return 0
+        return self.store.collect_garbage(referenced)
+
+
+probe_cache = ProbeCache(
+    settings.data_dir.joinpath("probe_cache.db"),
+    max_entries=settings.probe_cache_config.max_entries,
+    enable=settings.probe_cache_config.enable,
+)
@@ -0,0 +1,268 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : rate_limit.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 10:20
+
+第三方平台请求的限速, 重试与熔断
+
+每个平台一个 ProviderGuard (get_guard), 与客户端的生命周期无关, 客户端重建后状态保留:
+
+- TokenBucket: 令牌桶, 平均每秒 rate 个请求, 空闲之后最多连续 burst 个
+- 429 / 5xx / 网络错误时以随机抖动的指数退避重试, 429 优先使用 Retry-After
+- CircuitBreaker: 连续 failure_threshold 个请求失败后熔断, cooldown 秒内直接抛出
+  CircuitOpenError 而不请求平台; 之后放行一个试探请求, 成功则恢复.
+  重试用尽才算一个请求失败, 单次重试不计入.
+
+限速与熔断的参数每次请求时从 settings.rate_limit_config 读取, 修改后立即生效.
+"""
+import asyncio
+import logging
+import random
+import time
+from typing import Awaitable, Callable
+
+from httpx import Response, TransportError
+
+from music_manager.apis.models import ProviderStatus
+from music_manager.config import settings
+
+__all__ = [
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "ProviderError",
+    "ProviderGuard",
+    "ProviderStatus",
+    "TokenBucket",
+    "get_guard",
+]
+
+logger = logging.getLogger("music_manager.music_lib.rate_limit")
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class ProviderError(Exception):
+    """平台返回了非 200 的响应"""
+
+    def __init__(self, resp: Response):
+        super().__init__(f">> 请求失败: {resp.status_code}\n>> {resp.text}")
+        self.status_code = resp.status_code
+
+
+class CircuitOpenError(Exception):
+    """平台处于熔断状态, 请求没有发出"""
+
+    def __init__(self, provider: str, retry_after: float):
+        super().__init__(f">> {provider} 熔断中, {retry_after:.1f}s 后重试")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """令牌桶; 令牌可以预支, 并发的请求按到达顺序依次等待"""
+
+    def __init__(self, rate: float, burst: int, clock=time.monotonic):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.clock = clock
+        self.tokens = float(self.burst)
+        self._updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def available(self) -> float:
+        if self.rate > 0:
+            self._refill()
+        return self.tokens
+
+    def reserve(self) -> float:
+        """取一个令牌, 返回取得之前需要等待的秒数"""
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        self.tokens -= 1
+        return max(-self.tokens / self.rate, 0.0)
+
+    async def acquire(self) -> float:
+        delay = self.reserve()
+        if delay:
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                # 请求没有发出, 归还预支的令牌
+                self._refill()
+                self.tokens = min(self.burst, self.tokens + 1)
+                raise
+        return delay
+
+
+class CircuitBreaker:
+    """连续失败 failure_threshold 次后熔断 cooldown 秒; failure_threshold 为 0 时不熔断"""
+
+    def __init__(self, failure_threshold: int, cooldown: float, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self.failures = 0
+        self.opened_at: float | None = None
+        # 半开状态下是否已有试探请求在进行
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return CLOSED
+        if self.clock() - self.opened_at < self.cooldown:
+            return OPEN
+        return HALF_OPEN
+
+    def retry_after(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(self.opened_at + self.cooldown - self.clock(), 0.0)
+
+    def allow(self) -> bool:
+        """是否可以发出请求; 半开状态只放行一个试探请求"""
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.failure_threshold <= 0:
+            return
+        # 试探失败时重新熔断
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = self.clock()
+
+    def release(self):
+        """请求没有结果 (取消, 或不代表平台故障的错误): 不计入成功或失败"""
+        self._probing = False
+
+
+def _retryable(status_code: int) -> bool:
+    return status_code == 429 or status_code >= 500
+
+
+def _retry_after(resp: Response) -> float | None:
+    try:
+        return max(float(resp.headers["Retry-After"]), 0.0)
+    except (KeyError, ValueError):
+        return None
+
+
+class ProviderGuard:
+    """一个平台的限速, 重试与熔断"""
+
+    def __init__(self, provider: str):
+        conf = settings.rate_limit_config
+        self.provider = provider
+        self.bucket = TokenBucket(
+            conf.rates.get(provider, conf.default_rate), conf.burst
+        )
+        self.breaker = CircuitBreaker(conf.failure_threshold, conf.cooldown)
+        self.requests = 0
+        self.retries = 0
+        self.throttled = 0
+        self.rejected = 0
+
+    def _configure(self):
+        conf = settings.rate_limit_config
+        self.bucket.rate = conf.rates.get(self.provider, conf.default_rate)
+        self.bucket.burst = max(conf.burst, 1)
+        self.breaker.failure_threshold = conf.failure_threshold
+        self.breaker.cooldown = conf.cooldown
+
+    @staticmethod
+    def backoff(attempt: int, retry_after: float | None = None) -> float:
+        """第 attempt 次重试前等待的秒数"""
+        conf = settings.rate_limit_config
+        if retry_after is not None:
+            return min(retry_after, conf.max_backoff)
+        return random.uniform(0, min(conf.backoff * 2**attempt, conf.max_backoff))
+
+    def status(self) -> ProviderStatus:
+        self._configure()
+        return ProviderStatus(
+            provider=self.provider,
+            rate=self.bucket.rate,
+            tokens=round(self.bucket.available(), 3),
+            state=self.breaker.state,
+            failures=self.breaker.failures,
+            retry_after=round(self.breaker.retry_after(), 3),
+            requests=self.requests,
+            retries=self.retries,
+            throttled=self.throttled,
+            rejected=self.rejected,
+        )
+
+    async def send(self, send: Callable[[], Awaitable[Response]]) -> Response:
+        """
+        经过限速与熔断发出请求, 429 / 5xx / 网络错误时重试
+        :raise CircuitOpenError: 平台熔断中
+        :raise ProviderError: 非 200 的响应 (重试之后)
+        """
+        self._configure()
+        # 熔断只在请求开始时检查, 重试属于同一个请求 (半开状态下同为试探请求)
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise CircuitOpenError(self.provider, self.breaker.retry_after())
+        attempt = 0
+        try:
+            while True:
+                try:
+                    if await self.bucket.acquire():
+                        self.throttled += 1
+                    self.requests += 1
+                    resp = await send()
+                except TransportError as e:
+                    error, retry_after = e, None
+                else:
+                    if resp.status_code == 200:
+                        self.breaker.success()
+                        return resp
+                    if not _retryable(resp.status_code):
+                        raise ProviderError(resp)
+                    error, retry_after = ProviderError(resp), _retry_after(resp)
+                if attempt >= settings.rate_limit_config.retries:
+                    break
+                delay = self.backoff(attempt, retry_after)
+                attempt += 1
+                self.retries += 1
+                logger.info(
+                    "%s: %r, %.2fs 后第 %d 次重试", self.provider, error, delay, attempt
+                )
+                await asyncio.sleep(delay)
+        except BaseException:
+            # 取消, 不可重试的响应等不计入成功或失败
+            self.breaker.release()
+            raise
+        # 重试用尽: 整个请求计为一次失败
+        self.breaker.failure()
+        raise error
+
+
+# 平台 -> ProviderGuard
+_guards: dict[str, ProviderGuard] = {}
+
+
+def get_guard(provider: str) -> ProviderGuard:
+    guard = _guards.get(provider)
+    if guard is None:
+        guard = _guards[provider] = ProviderGuard(provider)
+    return guard
@@ -0,0 +1,260 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : resource_cache.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 09:20
+
+第三方平台搜索 / 歌词结果的缓存
+
+两级缓存, 键为 (平台, 操作, 规范化的查询):
+
+- 内存: LRU, 最多 memory_entries 条
+- SQLite: data/resource_cache.db, 重启后仍然有效; 超出 max_entries 时淘汰最久未访问的条目
+
+每个平台有各自的有效期 (ttl). 过期之后 stale_ttl 内仍然返回旧结果, 同时在后台刷新
+(stale-while-revalidate); 超过 stale_ttl 后等待平台返回. 请求失败的结果不缓存.
+同一个键同时只有一个请求在进行, 其他调用等待它的结果.
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+from music_manager.apis.models import ResourceCacheStats
+from music_manager.config import settings
+
+__all__ = ["ResourceCache", "ResourceCacheStats", "normalize_query", "resource_cache"]
+
+logger = logging.getLogger("music_manager.music_lib.resource_cache")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS resource_table (
+    provider TEXT NOT NULL,
+    operation TEXT NOT NULL,
+    query TEXT NOT NULL,
+    value TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    access_time REAL NOT NULL,
+    PRIMARY KEY (provider, operation, query)
+);
+CREATE INDEX IF NOT EXISTS resource_table_access_time ON resource_table (access_time);
+"""
+
+# 命中时刷新访问时间的最小间隔, 避免每次读取都写库
+_TOUCH_INTERVAL = 3600
+# 每写入多少次检查一次条目数量
+_EVICT_EVERY = 1000
+
+Key = tuple[str, str, str]
+
+
+def normalize_query(query: Any, casefold: bool = True) -> str:
+    """
+    查询的规范形式: 全角 / 半角统一 (NFKC), 合并空白, casefold 时忽略大小写
+    非字符串的查询 (例如 smart_tag 的 dict) 序列化为 JSON, 其中的字符串同样规范化.
+    """
+    if isinstance(query, str):
+        query = " ".join(unicodedata.normalize("NFKC", query).split())
+        return query.casefold() if casefold else query
+    if isinstance(query, dict):
+        query = {k: normalize_query(v, casefold) for k, v in query.items()}
+        return json.dumps(query, ensure_ascii=False, sort_keys=True)
+    return normalize_query(str(query), casefold)
+
+
+class ResourceCache:
+    """第三方平台结果缓存"""
+
+    def __init__(
+        self,
+        db_file: Path,
+        memory_entries: int = 1024,
+        max_entries: int = 100_000,
+        default_ttl: float = 24 * 3600,
+        ttl: dict[str, float] | None = None,
+        stale_ttl: float = 7 * 24 * 3600,
+        enable=True,
+    ):
+        self.db_file = Path(db_file)
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.ttl = ttl or {}
+        self.stale_ttl = stale_ttl
+        self.enable = enable
+        self.counters = ResourceCacheStats()
+        # 键 -> (JSON, 获取时间)
+        self._memory: OrderedDict[Key, tuple[str, float]] = OrderedDict()
+        self._inflight: dict[Key, asyncio.Task] = {}
+        # 后台刷新的任务, 保留引用直到完成
+        self._background: set[asyncio.Task] = set()
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._pid = None
+        self._writes = 0
+        self.clock = time.time
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            self.db_file.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(
+                self.db_file, check_same_thread=False, isolation_level=None
+            )
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            self._pid = os.getpid()
+        return self._conn
+
+    def close(self):
+        if self._conn is not None and self._pid == os.getpid():
+            self._conn.close()
+        self._conn = None
+
+    def stats(self) -> ResourceCacheStats:
+        return self.counters.model_copy(update={"memory_entries": len(self._memory)})
+
+    def _remember(self, key: Key, entry: tuple[str, float]):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _lookup(self, key: Key) -> tuple[str, float, bool] | None:
+        """内存, 然后 SQLite; 返回 (JSON, 获取时间, 是否来自内存)"""
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+            return *entry, True
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT value, fetched_at, access_time FROM resource_table "
+                "WHERE provider = ? AND operation = ? AND query = ?",
+                key,
+            ).fetchone()
+            if row is None:
+                return None
+            now = self.clock()
+            if now - row[2] > _TOUCH_INTERVAL:
+                self.conn.execute(
+                    "UPDATE resource_table SET access_time = ? "
+                    "WHERE provider = ? AND operation = ? AND query = ?",
+                    (now, *key),
+                )
+        self._remember(key, (row[0], row[1]))
+        return row[0], row[1], False
+
+    def _store(self, key: Key, value: Any):
+        now = self.clock()
+        entry = json.dumps(value, ensure_ascii=False), now
+        self._remember(key, entry)
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO resource_table "
+                "(provider, operation, query, value, fetched_at, access_time) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (*key, *entry, now),
+            )
+            self._writes += 1
+            if self._writes % _EVICT_EVERY == 0:
+                self._evict()
+
+    def _evict(self) -> int:
+        """删除访问时间最久的条目, 直到不超过 max_entries"""
+        cur = self.conn.execute(
+            "DELETE FROM resource_table WHERE rowid IN ("
+            "SELECT rowid FROM resource_table ORDER BY access_time DESC "
+            "LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+        return cur.rowcount
+
+    def clear(self):
+        """清空两级缓存"""
+        self._memory.clear()
+        with self._lock:
+            self.conn.execute("DELETE FROM resource_table")
+
+    async def _fetch(self, key: Key, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """请求平台并缓存结果, 同一个键同时只请求一次"""
+        task = self._inflight.get(key)
+        if task is None:
+
+            async def run():
+                try:
+                    value = await fetch()
+                    if value is not None:
+                        self._store(key, value)
+                    return value
+                finally:
+                    self._inflight.pop(key, None)
+
+            task = self._inflight[key] = asyncio.ensure_future(run())
+        return await asyncio.shield(task)
+
+    def _revalidate(self, key: Key, fetch: Callable[[], Awaitable[Any]]):
+        """在后台刷新过期的结果, 失败时保留旧结果"""
+        if key in self._inflight:
+            return
+
+        async def run():
+            try:
+                await self._fetch(key, fetch)
+            except Exception as e:
+                self.counters.refresh_errors += 1
+                logger.warning("后台刷新失败: %s: %r", key, e)
+
+        task = asyncio.ensure_future(run())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def get_or_fetch(
+        self,
+        provider: str,
+        operation: str,
+        query: Any,
+        fetch: Callable[[], Awaitable[Any]],
+        casefold: bool = True,
+    ) -> Any:
+        """
+        缓存的结果, 未命中或已超过 stale_ttl 时调用 fetch 获取
+        :param provider: 平台
+        :param operation: 操作, 例如 search / lyric
+        :param query: 查询
+        :param fetch: 请求平台, 异常不缓存并抛给调用方; 返回 None 时不缓存
+        :param casefold: 查询忽略大小写 (搜索); 歌曲 id 等区分大小写时为 False
+        """
+        if not self.enable:
+            return await fetch()
+        key = provider, operation, normalize_query(query, casefold)
+        entry = self._lookup(key)
+        if entry is not None:
+            age = self.clock() - entry[1]
+            ttl = self.ttl.get(provider, self.default_ttl)
+            if age <= ttl:
+                if entry[2]:
+                    self.counters.memory_hits += 1
+                else:
+                    self.counters.disk_hits += 1
+                return json.loads(entry[0])
+            if age <= ttl + self.stale_ttl:
+                self.counters.stale_hits += 1
+                self._revalidate(key, fetch)
+                return json.loads(entry[0])
+        self.counters.misses += 1
+        return await self._fetch(key, fetch)
+
+
+resource_cache = ResourceCache(
+    settings.data_dir.joinpath("resource_cache.db"),
+    **settings.resource_cache_config.model_dump(),
+)
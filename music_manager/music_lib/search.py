@@ -0,0 +1,170 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : search.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 01:40
+
+音乐搜索
+
+music_fts 是 music_table 的 FTS5 外部内容表 (title, artist, album, lyrics),
+由触发器与 music_table 保持同步.
+
+使用 trigram 分词: 中文没有空格分词, trigram 对任意 3 个字符以上的子串都能命中,
+不依赖词典. 少于 3 个字符的查询无法使用 trigram, 回退到 LIKE.
+结果按 bm25 排序, 标题的权重最高.
+"""
+import asyncio
+import logging
+
+from sqlalchemy import column, literal_column, table
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, and_, func, or_, select
+
+from music_manager.apis.models import MusicId3, SearchResult
+from music_manager.music_lib.database import async_session, engine, get_async_engine
+from music_manager.music_lib.models import Music
+
+__all__ = ["SearchResult", "create_fts", "search", "search_async"]
+
+logger = logging.getLogger("music_manager.music_lib.search")
+
+_FTS_COLUMNS = ("title", "artist", "album", "lyrics")
+# bm25 权重, 与 _FTS_COLUMNS 对应
+_FTS_WEIGHTS = (10.0, 5.0, 3.0, 1.0)
+
+_new = ", ".join(f"new.{_}" for _ in _FTS_COLUMNS)
+_old = ", ".join(f"old.{_}" for _ in _FTS_COLUMNS)
+_columns = ", ".join(_FTS_COLUMNS)
+_FTS_SCHEMA = [
+    f"CREATE VIRTUAL TABLE music_fts USING fts5({_columns}, "
+    f"content='music_table', content_rowid='id', tokenize='trigram')",
+    f"CREATE TRIGGER music_fts_insert AFTER INSERT ON music_table BEGIN "
+    f"INSERT INTO music_fts(rowid, {_columns}) VALUES (new.id, {_new}); END",
+    f"CREATE TRIGGER music_fts_delete AFTER DELETE ON music_table BEGIN "
+    f"INSERT INTO music_fts(music_fts, rowid, {_columns}) "
+    f"VALUES ('delete', old.id, {_old}); END",
+    f"CREATE TRIGGER music_fts_update AFTER UPDATE OF {_columns} ON music_table BEGIN "
+    f"INSERT INTO music_fts(music_fts, rowid, {_columns}) "
+    f"VALUES ('delete', old.id, {_old}); "
+    f"INSERT INTO music_fts(rowid, {_columns}) VALUES (new.id, {_new}); END",
+    "INSERT INTO music_fts(music_fts) VALUES ('rebuild')",
+]
+
+_fts_table = table("music_fts", column("rowid"))
+# MATCH / bm25 的左侧为表名
+_fts_column = literal_column("music_fts")
+
+# 搜索结果只返回列表需要的列, 不读取歌词
+_RESULT_COLUMNS = [
+    Music.id,
+    Music.title,
+    Music.artist,
+    Music.album,
+    Music.albumartist,
+    Music.duration,
+    Music.file_full_path,
+    Music.filename,
+    Music.artwork,
+    Music.artwork_hash,
+]
+
+
+def _has_fts(conn) -> bool:
+    return (
+        conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'music_fts'"
+        ).first()
+        is not None
+    )
+
+
+def create_fts(conn):
+    """
+    创建 music_fts 与同步触发器, 并由 music_table 重建索引; 已存在时跳过
+    SQLite 不支持 trigram (< 3.34) 时只记录警告, 搜索回退到 LIKE.
+    """
+    if _has_fts(conn):
+        return
+    logger.info("migrate: CREATE VIRTUAL TABLE music_fts")
+    try:
+        for ddl in _FTS_SCHEMA:
+            conn.exec_driver_sql(ddl)
+    except OperationalError as e:
+        logger.warning("无法创建 FTS5 trigram 索引, 搜索使用 LIKE: %s", e)
+
+
+def _match_query(terms: list[str]) -> str:
+    """每个词作为一个短语, 多个词之间为 AND"""
+    return " ".join('"{}"'.format(_.replace('"', '""')) for _ in terms)
+
+
+def _like(terms: list[str]):
+    columns = [getattr(Music, _) for _ in _FTS_COLUMNS]
+    return and_(
+        *[or_(*[_.contains(term, autoescape=True) for _ in columns]) for term in terms]
+    )
+
+
+def _statement(terms: list[str], fts: bool):
+    """
+    搜索语句 (未分页) 与排序
+    3 个字符以上的词使用全文索引, 较短的词只在命中的结果中用 LIKE 过滤
+    """
+    long_terms = [_ for _ in terms if len(_) >= 3]
+    short_terms = [_ for _ in terms if len(_) < 3]
+    stmt = select(*_RESULT_COLUMNS)
+    if long_terms and fts:
+        where = _fts_column.op("MATCH")(_match_query(long_terms))
+        if short_terms:
+            where = and_(where, _like(short_terms))
+        order = func.bm25(_fts_column, *_FTS_WEIGHTS)
+        stmt = stmt.join(_fts_table, _fts_table.c.rowid == Music.id)
+    else:
+        where, order = _like(terms), Music.title
+    return stmt.where(where), order
+
+
+def search(query: str, page: int = 1, size: int = 20) -> SearchResult:
+    """
+    搜索 标题 / 艺术家 / 专辑 / 歌词
+    :param query: 以空格分隔的多个词, 同时匹配
+    :param page: 页码, 从 1 开始
+    :param size: 每页数量
+    :return:
+    """
+    terms = query.split()
+    result = SearchResult(total=0, page=page, size=size, items=[])
+    if not terms:
+        return result
+
+    with Session(engine) as session:
+        stmt, order = _statement(terms, _has_fts(session.connection()))
+        result.total = session.exec(
+            select(func.count()).select_from(stmt.subquery())
+        ).one()
+        rows = session.exec(stmt.order_by(order).limit(size).offset((page - 1) * size))
+        result.items = [MusicId3(**_._mapping) for _ in rows]
+    return result
+
+
+async def search_async(query: str, page: int = 1, size: int = 20) -> SearchResult:
+    """search 的异步版本, 使用异步引擎, 不占用线程池"""
+    if get_async_engine() is None:
+        return await asyncio.to_thread(search, query, page, size)
+    terms = query.split()
+    result = SearchResult(total=0, page=page, size=size, items=[])
+    if not terms:
+        return result
+
+    async with async_session() as session:
+        conn = await session.connection()
+        stmt, order = _statement(terms, await conn.run_sync(_has_fts))
+        result.total = (
+            await session.exec(select(func.count()).select_from(stmt.subquery()))
+        ).one()
+        rows = await session.exec(
+            stmt.order_by(order).limit(size).offset((page - 1) * size)
+        )
+        result.items = [MusicId3(**_._mapping) for _ in rows]
+    return result
@@ -0,0 +1,238 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : stats.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 05:40
+
+音乐库统计
+
+汇总表由 music_table 上的触发器增量维护, 索引器 / 导入器 / 手动修改写入的同一个
+事务中同步更新, 读取统计不再对 music_table 做 GROUP BY, 耗时与音乐库大小无关.
+
+- artist_stats: 艺术家 -> 音乐数量 / 总时长 / 总大小
+- album_stats:  (专辑, 专辑艺术家) -> 同上
+- format_stats: 文件扩展名 -> 同上
+- library_summary: 总计, 以及艺术家 / 专辑数量 (由汇总表上的触发器维护)
+
+空的艺术家 / 专辑 / 扩展名记为 ''. 汇总表损坏或与数据不一致时, 使用 rebuild_stats() 重建.
+"""
+import asyncio
+import logging
+
+from music_manager.apis.models import LibraryStats, StatsItem
+from music_manager.music_lib.database import async_session, engine, get_async_engine
+
+__all__ = [
+    "LibraryStats",
+    "StatsItem",
+    "create_stats",
+    "rebuild_stats",
+    "library_stats",
+    "library_stats_async",
+]
+
+logger = logging.getLogger("music_manager.music_lib.stats")
+
+
+def _ext(row: str) -> str:
+    """文件扩展名 (小写), 没有扩展名时为 ''"""
+    f = f"COALESCE({row}.filename, '')"
+    return (
+        f"lower(CASE WHEN instr({f}, '.') "
+        f"THEN replace({f}, rtrim({f}, replace({f}, '.', '')), '') ELSE '' END)"
+    )
+
+
+# 汇总表 -> (键列, 由 music_table 的行计算键的表达式)
+_GROUPS = {
+    "artist_stats": {"artist": lambda r: f"COALESCE({r}.artist, '')"},
+    "album_stats": {
+        "album": lambda r: f"COALESCE({r}.album, '')",
+        "albumartist": lambda r: f"COALESCE({r}.albumartist, '')",
+    },
+    "format_stats": {"format": _ext},
+}
+# library_summary 中记录汇总表行数的列
+_COUNTERS = {"artist_stats": "artists", "album_stats": "albums"}
+
+
+def _add(row: str) -> str:
+    """将 music_table 的一行计入汇总表"""
+    sql = ""
+    for name, keys in _GROUPS.items():
+        values = ", ".join(_(row) for _ in keys.values())
+        sql += (
+            f"INSERT INTO {name} ({', '.join(keys)}, tracks, duration, size) "
+            f"VALUES ({values}, 1, COALESCE({row}.duration, 0), COALESCE({row}.size, 0)) "
+            f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET tracks = tracks + 1, "
+            f"duration = duration + excluded.duration, size = size + excluded.size; "
+        )
+    sql += (
+        f"UPDATE library_summary SET tracks = tracks + 1, "
+        f"duration = duration + COALESCE({row}.duration, 0), "
+        f"size = size + COALESCE({row}.size, 0); "
+    )
+    return sql
+
+
+def _sub(row: str) -> str:
+    """从汇总表中减去 music_table 的一行, 删除数量为 0 的分组"""
+    sql = ""
+    for name, keys in _GROUPS.items():
+        where = " AND ".join(f"{key} = {_(row)}" for key, _ in keys.items())
+        sql += (
+            f"UPDATE {name} SET tracks = tracks - 1, "
+            f"duration = duration - COALESCE({row}.duration, 0), "
+            f"size = size - COALESCE({row}.size, 0) WHERE {where}; "
+            f"DELETE FROM {name} WHERE {where} AND tracks <= 0; "
+        )
+    sql += (
+        f"UPDATE library_summary SET tracks = tracks - 1, "
+        f"duration = duration - COALESCE({row}.duration, 0), "
+        f"size = size - COALESCE({row}.size, 0); "
+    )
+    return sql
+
+
+_STATS_SCHEMA = [
+    "CREATE TABLE library_summary (id INTEGER PRIMARY KEY CHECK (id = 1), "
+    "tracks INTEGER NOT NULL DEFAULT 0, duration REAL NOT NULL DEFAULT 0, "
+    "size INTEGER NOT NULL DEFAULT 0, artists INTEGER NOT NULL DEFAULT 0, "
+    "albums INTEGER NOT NULL DEFAULT 0)",
+    "INSERT INTO library_summary (id) VALUES (1)",
+]
+for _name, _keys in _GROUPS.items():
+    _STATS_SCHEMA += [
+        f"CREATE TABLE {_name} ({' TEXT NOT NULL, '.join(_keys)} TEXT NOT NULL, "
+        f"tracks INTEGER NOT NULL, duration REAL NOT NULL, size INTEGER NOT NULL, "
+        f"PRIMARY KEY ({', '.join(_keys)}))",
+        f"CREATE INDEX ix_{_name}_tracks ON {_name} (tracks DESC, {', '.join(_keys)})",
+    ]
+for _name, _counter in _COUNTERS.items():
+    _STATS_SCHEMA += [
+        f"CREATE TRIGGER {_name}_insert AFTER INSERT ON {_name} BEGIN "
+        f"UPDATE library_summary SET {_counter} = {_counter} + 1; END",
+        f"CREATE TRIGGER {_name}_delete AFTER DELETE ON {_name} BEGIN "
+        f"UPDATE library_summary SET {_counter} = {_counter} - 1; END",
+    ]
+_STATS_SCHEMA += [
+    f"CREATE TRIGGER music_stats_insert AFTER INSERT ON music_table BEGIN "
+    f"{_add('new')}END",
+    f"CREATE TRIGGER music_stats_delete AFTER DELETE ON music_table BEGIN "
+    f"{_sub('old')}END",
+    f"CREATE TRIGGER music_stats_update AFTER UPDATE OF "
+    f"artist, album, albumartist, filename, duration, size ON music_table BEGIN "
+    f"{_sub('old')}{_add('new')}END",
+]
+
+
+def _has_stats(conn) -> bool:
+    return (
+        conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master "
+            "WHERE type = 'table' AND name = 'library_summary'"
+        ).first()
+        is not None
+    )
+
+
+def _rebuild(conn):
+    for name, keys in _GROUPS.items():
+        conn.exec_driver_sql(f"DELETE FROM {name}")
+        conn.exec_driver_sql(
+            f"INSERT INTO {name} ({', '.join(keys)}, tracks, duration, size) "
+            f"SELECT {', '.join(_('m') for _ in keys.values())}, COUNT(*), "
+            f"TOTAL(m.duration), TOTAL(m.size) FROM music_table AS m "
+            f"GROUP BY {', '.join(str(_) for _ in range(1, len(keys) + 1))}"
+        )
+    conn.exec_driver_sql(
+        "UPDATE library_summary SET "
+        "(tracks, duration, size) = "
+        "(SELECT COUNT(*), TOTAL(duration), TOTAL(size) FROM music_table), "
+        "artists = (SELECT COUNT(*) FROM artist_stats), "
+        "albums = (SELECT COUNT(*) FROM album_stats)"
+    )
+
+
+def create_stats(conn):
+    """创建汇总表与触发器, 并由 music_table 计算初始值; 已存在时跳过"""
+    if _has_stats(conn):
+        return
+    logger.info("migrate: CREATE TABLE library_summary")
+    for ddl in _STATS_SCHEMA:
+        conn.exec_driver_sql(ddl)
+    _rebuild(conn)
+
+
+def rebuild_stats():
+    """由 music_table 重新计算全部汇总表"""
+    with engine.begin() as conn:
+        create_stats(conn)
+        _rebuild(conn)
+    logger.info("stats rebuilt")
+
+
+def _item(row) -> StatsItem:
+    return StatsItem(
+        name=row[0],
+        artist=row[1],
+        tracks=row[2],
+        duration=round(row[3], 3),
+        size=int(row[4]),
+    )
+
+
+def _read(conn, top: int) -> LibraryStats:
+    tracks, duration, size, artists, albums = conn.exec_driver_sql(
+        "SELECT tracks, duration, size, artists, albums FROM library_summary"
+    ).one()
+    columns = "tracks, duration, size"
+    return LibraryStats(
+        tracks=tracks,
+        duration=round(duration, 3),
+        size=int(size),
+        artists=artists,
+        albums=albums,
+        formats=[
+            _item(_)
+            for _ in conn.exec_driver_sql(
+                f"SELECT format, NULL, {columns} FROM format_stats "
+                f"ORDER BY tracks DESC, format"
+            )
+        ],
+        top_artists=[
+            _item(_)
+            for _ in conn.exec_driver_sql(
+                f"SELECT artist, NULL, {columns} FROM artist_stats "
+                f"ORDER BY tracks DESC, artist LIMIT ?",
+                (top,),
+            )
+        ],
+        top_albums=[
+            _item(_)
+            for _ in conn.exec_driver_sql(
+                f"SELECT album, albumartist, {columns} FROM album_stats "
+                f"ORDER BY tracks DESC, album, albumartist LIMIT ?",
+                (top,),
+            )
+        ],
+    )
+
+
+def library_stats(top: int = 20) -> LibraryStats:
+    """
+    音乐库统计
+    :param top: 返回音乐数量最多的 top 个艺术家 / 专辑
+    """
+    with engine.connect() as conn:
+        return _read(conn, top)
+
+
+async def library_stats_async(top: int = 20) -> LibraryStats:
+    """library_stats 的异步版本"""
+    if get_async_engine() is None:
+        return await asyncio.to_thread(library_stats, top)
+    async with async_session() as session:
+        conn = await session.connection()
+        return await conn.run_sync(_read, top)
@@ -0,0 +1,141 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : watcher.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 00:20
+
+监听音乐库的变化, 实时更新索引
+
+通过 watchdog (Linux 下为 inotify) 订阅音乐库的文件系统事件, 不轮询.
+一段时间内的事件被合并 (例如复制一整张专辑), 事件平静 debounce 秒后,
+只将受影响的路径交给 index_paths 更新.
+"""
+import asyncio
+import functools
+import logging
+from pathlib import Path
+from typing import Callable, Iterable
+
+from music_manager.config import settings
+from music_manager.music_lib.music_index import index_paths
+
+__all__ = ["LibraryWatcher"]
+
+logger = logging.getLogger("music_manager.music_lib.watcher")
+
+# 不会改变文件内容的事件
+_IGNORED_EVENTS = {"opened", "closed_no_write"}
+
+
+class _Handler:
+    """watchdog 的事件处理器, 在 watchdog 的线程中调用, 转发到事件循环"""
+
+    def __init__(self, watcher: "LibraryWatcher", loop: asyncio.AbstractEventLoop):
+        self.watcher = watcher
+        self.loop = loop
+
+    def dispatch(self, event):
+        if event.event_type in _IGNORED_EVENTS:
+            return
+        # 目录的 modified 伴随其中文件的事件, 忽略以免重新扫描整个目录
+        if event.is_directory and event.event_type == "modified":
+            return
+        paths = [event.src_path, getattr(event, "dest_path", "")]
+        paths = [_.decode() if isinstance(_, bytes) else _ for _ in paths if _]
+        self.loop.call_soon_threadsafe(self.watcher.add, paths)
+
+
+class LibraryWatcher:
+    """监听音乐库并更新索引, 作为后台任务运行在服务进程中"""
+
+    def __init__(
+        self,
+        root: str | Path,
+        debounce: float | None = None,
+        max_delay: float | None = None,
+        callback: Callable[[list[str]], object] | None = None,
+    ):
+        """
+        :param root: 音乐库目录
+        :param debounce: 事件平静多少秒后更新, 默认 settings.watcher_config.debounce
+        :param max_delay: 持续有事件时最多等待多少秒, 默认 settings.watcher_config.max_delay
+        :param callback: 同步函数, 在线程中以合并后的路径列表调用, 默认 index_paths
+        """
+        config = settings.watcher_config
+        self.root = Path(root)
+        self.debounce = config.debounce if debounce is None else debounce
+        self.max_delay = config.max_delay if max_delay is None else max_delay
+        self.callback = callback or functools.partial(index_paths, executor="thread")
+        self._pending: set[str] = set()
+        self._event: asyncio.Event | None = None
+        self._observer = None
+        self._task: asyncio.Task | None = None
+
+    def add(self, paths: Iterable[str]):
+        """记录发生变化的路径, 必须在事件循环中调用"""
+        self._pending.update(paths)
+        self._event.set()
+
+    async def start(self) -> bool:
+        """
+        开始监听
+        :return: watchdog 未安装或目录不存在时返回 False
+        """
+        try:
+            from watchdog.observers import Observer
+        except ImportError:
+            logger.warning("watchdog 未安装, 不监听音乐库的变化")
+            return False
+        if not self.root.is_dir():
+            logger.warning("音乐库不存在, 不监听: %s", self.root)
+            return False
+
+        self._event = asyncio.Event()
+        self._observer = Observer()
+        self._observer.schedule(
+            _Handler(self, asyncio.get_running_loop()), str(self.root), recursive=True
+        )
+        self._observer.start()
+        self._task = asyncio.create_task(self._run())
+        logger.info("开始监听音乐库: %s", self.root)
+        return True
+
+    async def stop(self):
+        """停止监听, 未处理的事件由下一次全量索引处理"""
+        if self._observer is not None:
+            self._observer.stop()
+            await asyncio.to_thread(self._observer.join)
+            self._observer = None
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _wait_quiet(self):
+        """等待事件平静 debounce 秒, 最多等待 max_delay 秒"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_delay
+        while True:
+            self._event.clear()
+            timeout = min(self.debounce, deadline - loop.time())
+            if timeout <= 0:
+                return
+            try:
+                await asyncio.wait_for(self._event.wait(), timeout)
+            except asyncio.TimeoutError:
+                return
+
+    async def _run(self):
+        while True:
+            await self._event.wait()
+            await self._wait_quiet()
+            paths, self._pending = sorted(self._pending), set()
+            logger.debug("音乐库变化: %d 个路径", len(paths))
+            try:
+                await asyncio.to_thread(self.callback, paths)
+            except Exception:
+                logger.exception("更新索引失败: %s", paths[:10])
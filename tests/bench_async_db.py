@@ -0,0 +1,127 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : bench_async_db.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 04:30
+
+数据库访问接口的压力测试: 同步接口 (线程池) 与异步接口 (aiosqlite)
+
+    python tests/bench_async_db.py [-n 歌曲数] [-c 并发数] [-r 每个并发的请求数]
+
+在临时数据目录中生成一个音乐库, 以 c 个并发客户端请求 按 id 获取 / 搜索,
+对比两种接口的 p50 / p99 延迟与吞吐量.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 使用临时的数据目录, 必须在导入 music_manager 之前设置
+os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="bench_async_db_")
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+from fastapi import APIRouter, FastAPI
+
+from music_manager.apis.models import MusicId3, ResponseModel
+from music_manager.apis.router import router
+from music_manager.music_lib.database import get_async_engine, init
+from music_manager.music_lib.models import Music, save_all
+from music_manager.music_lib.search import search
+
+# 改为异步之前的同步接口, 由 FastAPI 在线程池中执行
+sync_router = APIRouter()
+
+
+@sync_router.get("/search/")
+def sync_search(q: str, page: int = 1, size: int = 20):
+    return ResponseModel(data=search(q, page=page, size=size))
+
+
+@sync_router.get("/music/{music_id}")
+def sync_music(music_id: int):
+    data = Music.get(music_id)
+    return ResponseModel(data=MusicId3.model_validate(data, from_attributes=True))
+
+
+def generate(count: int) -> list[str]:
+    rnd = random.Random(0)
+    artists = [f"Artist{_:05d}" for _ in range(count // 20 + 1)]
+    musics = (
+        Music(
+            title=f"Title {i} {rnd.random():.6f}",
+            artist=rnd.choice(artists),
+            album=f"Album {rnd.randrange(count // 10 + 1)}",
+            file_full_path=Path(f"/music/{i}.flac"),
+        )
+        for i in range(count)
+    )
+    start = time.perf_counter()
+    save_all(musics, chunk_size=2000)
+    print(f"generate: {count} tracks in {time.perf_counter() - start:.1f}s")
+    return artists
+
+
+async def load(app, urls: list[str], concurrency: int, repeat: int):
+    transport = httpx.ASGITransport(app=app)
+    latencies = []
+
+    async def worker(client: httpx.AsyncClient, rnd: random.Random):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            resp = await client.get(rnd.choice(urls))
+            latencies.append(time.perf_counter() - start)
+            assert resp.status_code == 200, resp.text
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+        start = time.perf_counter()
+        await asyncio.gather(*[worker(c, random.Random(_)) for _ in range(concurrency)])
+        seconds = time.perf_counter() - start
+    await get_async_engine().dispose()
+    return latencies, seconds
+
+
+def report(name: str, latencies: list[float], seconds: float):
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(
+        f"{name:<14} p50={quantiles[49] * 1000:8.1f} ms  "
+        f"p99={quantiles[98] * 1000:8.1f} ms  "
+        f"{len(latencies) / seconds:8.0f} req/s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--count", type=int, default=20_000)
+    parser.add_argument("-c", "--concurrency", type=int, default=200)
+    parser.add_argument("-r", "--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    init()
+    artists = generate(args.count)
+    cases = {
+        "music": [f"/music/{_}" for _ in range(1, args.count + 1)],
+        "search": [f"/search/?q={_}" for _ in artists[:200]],
+    }
+
+    apps = {}
+    for name, _router in [("sync", sync_router), ("async", router)]:
+        apps[name] = FastAPI()
+        apps[name].include_router(_router)
+
+    for case, urls in cases.items():
+        for name, app in apps.items():
+            latencies, seconds = asyncio.run(
+                load(app, urls, args.concurrency, args.repeat)
+            )
+            report(f"{case}/{name}", latencies, seconds)
+
+
+if __name__ == "__main__":
+    main()
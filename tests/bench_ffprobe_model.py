@@ -0,0 +1,80 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : bench_ffprobe_model.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/18 23:30
+
+FfprobrModel 解析耗时的基准测试
+
+    python tests/bench_ffprobe_model.py [-n 次数]
+
+使用 models_json 中的 ffprobe 输出, 对比完整输出与 PROBE_ENTRIES 裁剪后的输出.
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from music_manager.music_lib.ffmpeg_operator import PROBE_ENTRIES
+from music_manager.music_lib.model_ffmpeg import FfprobrModel
+
+models_json = Path(__file__).parent.joinpath("models_json")
+
+
+def load_meta() -> dict:
+    """由 formats / streams 组合出一份完整的 ffprobe 输出"""
+    formats = json.load(
+        models_json.joinpath("task_music_formats.json").open(encoding="utf-8")
+    )
+    streams = json.load(
+        models_json.joinpath("task_music_streams.json").open(encoding="utf-8")
+    )
+    return {"format": formats[0], "streams": streams}
+
+
+def trim_meta(meta: dict) -> dict:
+    """按 PROBE_ENTRIES 裁剪, 模拟 ffprobe -show_entries 的输出"""
+    entries = dict(_.partition("=")[::2] for _ in PROBE_ENTRIES.split(":"))
+    format_keys = set(entries["format"].split(",")) | {"tags"}
+    stream_keys = set(entries["stream"].split(",")) | {"disposition"}
+    return {
+        "format": {k: v for k, v in meta["format"].items() if k in format_keys},
+        "streams": [
+            {k: v for k, v in _.items() if k in stream_keys} for _ in meta["streams"]
+        ],
+    }
+
+
+def bench(name: str, func, count: int):
+    start = time.perf_counter()
+    for _ in range(count):
+        func()
+    cost = time.perf_counter() - start
+    print(f"{name:<36} {cost / count * 1e6:8.1f} us/file")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--count", type=int, default=20000)
+    args = parser.parse_args()
+
+    full = load_meta()
+    trimmed = trim_meta(full)
+    for name, meta in (("full", full), ("trimmed", trimmed)):
+        raw = json.dumps(meta, ensure_ascii=False).encode()
+        print(f"{name}: {len(raw)} bytes")
+        bench(f"{name} json.loads", lambda: json.loads(raw), args.count)
+        bench(f"{name} from_meta", lambda: FfprobrModel.from_meta(meta), args.count)
+        bench(
+            f"{name} json.loads + from_meta",
+            lambda: FfprobrModel.from_meta(json.loads(raw)),
+            args.count,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : bench_import.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 07:00
+
+导入大文件的基准测试: 峰值内存 (RSS) 与吞吐量
+
+    python tests/bench_import.py [--size-mb 1024] [--dst-dir 其他文件系统上的目录]
+
+对比:
+- bytes: 旧的导入方式, read_bytes() 后写入缓存, 再写入音乐库
+- link / copy_file_range / sendfile / copy: place_file 的各种方式
+
+每种方式在独立的子进程中运行, 峰值 RSS 互不影响.
+--dst-dir 位于其他文件系统时硬链接不可用, link 回退到复制.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+METHODS = ["bytes", "link", "copy_file_range", "sendfile", "copy"]
+
+
+def child(method: str, src: Path, dst: Path):
+    from music_manager.music_lib import file_ops
+
+    start = time.perf_counter()
+    if method == "bytes":
+        data = src.read_bytes()
+        cache = dst.with_name(f"{dst.name}.cache")
+        cache.write_bytes(data)
+        dst.write_bytes(data)
+        cache.unlink()
+        used = method
+    elif method == "link":
+        used = file_ops.place_file(src, dst, "link")
+    else:
+        file_ops._COPY_METHODS = [_ for _ in file_ops._COPY_METHODS if _[0] == method]
+        used = file_ops.place_file(src, dst, "copy")
+    seconds = time.perf_counter() - start
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # KiB
+    print(json.dumps({"used": used, "seconds": seconds, "rss": rss}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=int, default=1024)
+    parser.add_argument("--dst-dir", type=Path, default=None)
+    parser.add_argument("--child", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        method, src, dst = args.child
+        return child(method, Path(src), Path(dst))
+
+    tmp = Path(tempfile.mkdtemp(prefix="bench_import_"))
+    dst_dir = Path(tempfile.mkdtemp(dir=args.dst_dir)) if args.dst_dir else tmp
+    src = tmp / "src.flac"
+    with open(src, "wb") as f:
+        for _ in range(args.size_mb):
+            f.write(os.urandom(1024 * 1024))
+    print(f"file: {args.size_mb} MiB, {src.parent} -> {dst_dir}")
+
+    for method in METHODS:
+        dst = dst_dir / f"{method}.flac"
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", method, str(src), str(dst)],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        result = json.loads(out.splitlines()[-1])
+        print(
+            f"{method:<16} used={result['used']:<16} "
+            f"rss={result['rss'] / 1024:8.1f} MiB  "
+            f"{result['seconds'] * 1000:9.1f} ms  "
+            f"{args.size_mb / result['seconds']:8.0f} MB/s"
+        )
+        dst.unlink()
+    src.unlink()
+
+
+if __name__ == "__main__":
+    main()
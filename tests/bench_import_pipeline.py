@@ -0,0 +1,93 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : bench_import_pipeline.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 08:00
+
+导入目录的基准测试: 每个阶段一个线程 vs 默认线程数, 以及由导入日志恢复
+
+    python tests/bench_import_pipeline.py [--files 2000] [--size-kb 512] [--mode copy]
+
+由 ffmpeg 生成一个 FLAC, 复制为 --files 个文件并改写结尾的音频数据 (摘要各不相同),
+分布在 100 个子目录中. 每一轮导入到新的音乐库与数据库.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="bench_pipeline_")
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from music_manager.config import settings  # noqa: E402
+from music_manager.music_lib.database import engine, init  # noqa: E402
+from music_manager.music_lib.importer import import_tree  # noqa: E402
+
+
+def make_tree(root: Path, files: int, size_kb: int):
+    seed = root / "seed.flac"
+    subprocess.run(
+        # 单声道 16 位白噪声几乎不可压缩, 约 86 KiB/s
+        ["ffmpeg", "-v", "quiet", "-f", "lavfi", "-i", f"anoisesrc=d={size_kb / 86}"]
+        + ["-metadata", "title=Bench", str(seed)],
+        check=True,
+    )
+    data = seed.read_bytes()
+    seed.unlink()
+    for i in range(files):
+        sub = root / f"{i % 100:03d}"
+        sub.mkdir(exist_ok=True)
+        sub.joinpath(f"{i:06d}.flac").write_bytes(data[:-16] + os.urandom(16))
+
+
+def run(src: Path, mode: str, **workers) -> float:
+    settings.music_library = Path(tempfile.mkdtemp(prefix="bench_library_"))
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DELETE FROM music_table")
+    start = time.perf_counter()
+    result = import_tree(src, mode=mode, **workers)
+    seconds = time.perf_counter() - start
+    assert result.imported == result.scanned, result
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--size-kb", type=int, default=512)
+    parser.add_argument("--mode", default="copy")
+    args = parser.parse_args()
+
+    init()
+    src = Path(tempfile.mkdtemp(prefix="bench_src_"))
+    make_tree(src, args.files, args.size_kb)
+    print(
+        f"{args.files} files x {args.size_kb} KiB, mode={args.mode}, cpus={os.cpu_count()}"
+    )
+    for name, workers in [
+        (
+            "1-thread",
+            dict(hash_workers=1, probe_workers=1, place_workers=1, queue_size=1),
+        ),
+        ("pipeline", {}),
+    ]:
+        seconds = run(src, args.mode, **workers)
+        print(
+            f"{name:<10} {seconds:8.2f} s  {args.files / seconds:8.0f} files/s  "
+            f"{args.files * args.size_kb / 1024 / seconds:8.1f} MiB/s"
+        )
+
+    # 由导入日志恢复: 全部文件已完成, 只扫描目录与查询日志
+    start = time.perf_counter()
+    result = import_tree(src, mode=args.mode, resume=True)
+    seconds = time.perf_counter() - start
+    assert result.resumed == args.files, result
+    print(f"{'resume':<10} {seconds:8.2f} s  {args.files / seconds:8.0f} files/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : bench_probe.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/18 19:30
+
+元数据探测的基准测试
+
+    python tests/bench_probe.py [-n 文件数]
+
+使用 ffmpeg 生成一个带封面的音乐库, 对比不同的探测方式.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 使用临时的数据目录与音乐库, 必须在导入 music_manager 之前设置
+os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="bench_probe_")
+os.environ["MUSIC_LIBRARY"] = tempfile.mkdtemp(prefix="bench_library_")
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from music_manager.apis.models import MusicId3
+from music_manager.config import settings
+from music_manager.music_lib.batch_probe import probe_many
+from music_manager.music_lib.ffmpeg_operator import runner, get_music_artwork
+from music_manager.music_lib.model_ffmpeg import FfprobrModel
+from music_manager.music_lib.probe_cache import probe_cache
+
+
+def generate_library(
+    root: Path, count: int, cover_size: int = 500, formats=("flac", "mp3")
+) -> list[Path]:
+    """生成 count 首带封面的音乐"""
+    cover = root.joinpath("cover.jpg")
+    runner(
+        ["ffmpeg", "-v", "quiet", "-y", "-f", "lavfi"]
+        + ["-i", f"mandelbrot=size={cover_size}x{cover_size}"]
+        + ["-frames:v", "1", "-q:v", "2", cover]
+    )
+    print(f"cover: {cover_size}x{cover_size} {cover.stat().st_size // 1024} KB")
+    files = []
+    for i in range(count):
+        file = root.joinpath(f"track-{i:04d}.{formats[i % len(formats)]}")
+        runner(
+            ["ffmpeg", "-v", "quiet", "-y", "-f", "lavfi"]
+            + ["-i", f"sine=frequency={220 + i}:duration=10", "-i", cover]
+            + ["-map", "0", "-map", "1", "-c:v", "copy"]
+            + ["-disposition:v", "attached_pic", "-id3v2_version", "3"]
+            + ["-metadata", f"title=Track {i}", "-metadata", "artist=Bench"]
+            + ["-metadata", "album=Bench Album", file]
+        )
+        files.append(file)
+    return files
+
+
+def bench(name: str, func, files: list[Path]):
+    start = time.perf_counter()
+    for file in files:
+        func(file)
+    cost = time.perf_counter() - start
+    print(
+        f"{name:<24} {len(files) / cost:8.1f} files/s"
+        f" {cost / len(files) * 1000:8.2f} ms/file"
+    )
+
+
+def two_call(file: Path):
+    settings.probe_backend = "ffprobe"
+    get_music_artwork(file)
+    FfprobrModel.from_media_file(file)
+
+
+def single_pass(file: Path):
+    settings.probe_backend = "ffprobe"
+    FfprobrModel.from_media_file_with_artwork(file)
+
+
+def backend(name: str):
+    def _probe(file: Path):
+        settings.probe_backend = name
+        MusicId3.from_ffprobe(file)
+
+    return _probe
+
+
+def cached(file: Path):
+    """先预热, 再计时"""
+    MusicId3.from_ffprobe(file)
+
+
+BENCHES = {
+    # ffprobe / ffmpeg 进程
+    "two-call": two_call,
+    "single-pass": single_pass,
+    # MusicId3.from_ffprobe 的各个后端
+    "backend=ffprobe": backend("ffprobe"),
+    "backend=native": backend("native"),
+    "backend=auto": backend("auto"),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--count", type=int, default=50)
+    parser.add_argument("--cover-size", type=int, default=500, help="封面边长")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = generate_library(Path(tmp), args.count, args.cover_size)
+        probe_cache.enable = False
+        for name, func in BENCHES.items():
+            bench(name, func, files)
+
+        for name in ("native", "ffprobe"):
+            settings.probe_backend = name
+            executor = "process" if name == "native" else "thread"
+            start = time.perf_counter()
+            errors = sum(bool(_.error) for _ in probe_many(files, executor=executor))
+            cost = time.perf_counter() - start
+            print(
+                f"{f'batch backend={name}':<24} {len(files) / cost:8.1f} files/s"
+                f" ({os.cpu_count()} workers, {errors} errors)"
+            )
+
+        probe_cache.enable = True
+        probe_cache.db_file = Path(tmp).joinpath("probe_cache.db")
+        settings.probe_backend = "ffprobe"
+        for file in files:
+            cached(file)
+        bench("cached", cached, files)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : bench_search.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 02:20
+
+搜索的基准测试: FTS5 trigram 与 LIKE 全表扫描
+
+    python tests/bench_search.py [-n 歌曲数]
+
+在临时数据目录中生成一个音乐库 (含歌词), 对比两种方式的查询耗时.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 使用临时的数据目录, 必须在导入 music_manager 之前设置
+os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="bench_search_")
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from music_manager.music_lib import search as search_module
+from music_manager.music_lib.database import init
+from music_manager.music_lib.models import Music, save_all
+from music_manager.music_lib.search import search
+
+CHARS = "的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就分对成会可主发年动同工也能下过子说产种面而方后多定行学法所民得经十三之进着等部度家电力里如水化高自二理起小物现实加量都两体制机当使点从业本去把性好应开它合还因由其些然前外天政四日那社义事平形相全表间样与关各重新线内数正心反你明看原又么利比或但质气第向道命此变条只没结解问意建月公无系军很情者最立代想已通并提直题党程展五果料象员革位入常文总次品式活设及管特件长求老头基资边流路级少图山统接知较将组见计别她手角期根论运农指几九区强放决西被干做必战先回则任取据处队南给色光门即保治北造百规热领七海口东导器压志世金增争济阶油思术极交受联什认六共权收证改清己美再采转更单风切打白教速花带安场身车例真务具万每目至达走积示议声报斗完类八离华名确才科张信马节话米整空元况今集温传土许步群广石记需段研界拉林律叫且究观越织装影算低持音众书布复容儿须际商非验连断深难近矿千周委素技备半办青省列习响约支般史感劳便团往酸历市克何除消构府称太准精值号率族维划选标写存候毛亲快效斯院查江型眼王按格养易置派层片始却专状育厂京识适属圆包火住调满县局照参红细引听该铁价严"
+
+
+def generate(count: int) -> list[str]:
+    rnd = random.Random(0)
+    # 从随机文本中截取片段, 比逐字生成快得多
+    pool = "".join(rnd.choices(CHARS, k=1_000_000))
+
+    def text(length: int) -> str:
+        start = rnd.randrange(len(pool) - length)
+        return pool[start : start + length]
+
+    artists = [text(3) for _ in range(2000)]
+    albums = [text(4) for _ in range(10000)]
+    musics = (
+        Music(
+            title=text(rnd.randint(2, 8)),
+            artist=rnd.choice(artists),
+            album=rnd.choice(albums),
+            lyrics=text(300),
+            file_full_path=Path(f"/music/{i}.flac"),
+        )
+        for i in range(count)
+    )
+    start = time.perf_counter()
+    save_all(musics, chunk_size=2000)
+    print(f"generate: {count} tracks in {time.perf_counter() - start:.1f}s")
+    return artists
+
+
+def bench(name: str, query: str, repeat: int):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = search(query)
+    cost = (time.perf_counter() - start) / repeat * 1000
+    print(f"{name:<6} {query!r:<16} {cost:9.2f} ms  total={result.total}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--count", type=int, default=100_000)
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    init()
+    artists = generate(args.count)
+    queries = [artists[0], "天空海", f"{artists[1]} 音乐", "zzzz"]
+
+    for query in queries:
+        bench("fts", query, args.repeat)
+    # 强制使用 LIKE (与少于 3 个字符的查询相同的路径)
+    search_module._has_fts = lambda conn: False
+    for query in queries:
+        bench("like", query, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : conftest.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/18 22:10
+
+"""
+import asyncio
+import os
+import struct
+import tempfile
+
+import pytest
+
+# 测试期间的数据目录 (data.db / probe_cache.db) 与音乐库, 必须在导入 music_manager 之前设置
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="music_manager_"))
+os.environ.setdefault("MUSIC_LIBRARY", tempfile.mkdtemp(prefix="music_library_"))
+
+
+def _make_wav(
+    path, title="Title", artist="Artist", seconds=1, fill=b"\x00\x00\x00\x00"
+):
+    """带 LIST/INFO 的 WAV, fill 为重复的采样数据 (4 字节)"""
+    fmt = struct.pack("<HHIIHH", 1, 2, 44100, 44100 * 4, 4, 16)
+    info = b"INFO"
+    for key, value in [(b"INAM", title), (b"IART", artist)]:
+        value = value.encode() + b"\x00"
+        info += key + struct.pack("<I", len(value)) + value + b"\x00" * (len(value) & 1)
+    data = fill * 44100 * seconds
+    body = b"WAVE"
+    body += b"fmt " + struct.pack("<I", len(fmt)) + fmt
+    body += b"LIST" + struct.pack("<I", len(info)) + info
+    body += b"data" + struct.pack("<I", len(data)) + data
+    path.write_bytes(b"RIFF" + struct.pack("<I", len(body)) + body)
+    return path
+
+
+@pytest.fixture
+def make_wav():
+    return _make_wav
+
+
+def _make_sine(path, frequency=440, **tags):
+    """ffmpeg 生成 1 秒的正弦波, 格式由扩展名决定; 没有 ffmpeg 时跳过测试"""
+    from music_manager.music_lib.ffmpeg_operator import fund_exec, runner
+
+    try:
+        fund_exec("ffmpeg")
+    except FileNotFoundError:
+        pytest.skip("ffmpeg not found")
+    metadata = [_ for k, v in tags.items() for _ in ("-metadata", f"{k}={v}")]
+    runner(
+        ["ffmpeg", "-v", "quiet", "-f", "lavfi"]
+        + ["-i", f"sine=frequency={frequency}:duration=1"]
+        + metadata
+        + [path]
+    )
+    return path
+
+
+@pytest.fixture
+def make_sine():
+    return _make_sine
+
+
+@pytest.fixture(autouse=True)
+def dispose_async_engine():
+    """异步连接绑定在创建它的事件循环上, 每个测试结束后释放"""
+    yield
+    from music_manager.music_lib.database import get_async_engine
+
+    if (async_engine := get_async_engine()) is not None:
+        asyncio.run(async_engine.dispose())
@@ -0,0 +1,116 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : test_task_artwork_api.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/18 23:10
+
+"""
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from music_manager.apis import router as router_module
+from music_manager.music_lib.artwork_store import ArtworkStore
+from music_manager.music_lib.ffmpeg_operator import fund_exec, runner
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    _store = ArtworkStore(tmp_path.joinpath("artwork"))
+    monkeypatch.setattr(router_module, "artwork_store", _store)
+    return _store
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(router_module.router, prefix="/api")
+    return TestClient(app)
+
+
+def test_artwork(client, store):
+    info = store.put(b"\xff\xd8cover")
+    resp = client.get(f"/api/artwork/{info.digest}")
+    assert resp.status_code == 200
+    assert resp.content == b"\xff\xd8cover"
+    assert resp.headers["content-type"] == "image/jpeg"
+    assert resp.headers["etag"] == f'"{info.digest}"'
+    assert "immutable" in resp.headers["cache-control"]
+
+
+def test_artwork_not_modified(client, store):
+    info = store.put(b"\xff\xd8cover")
+    etag = f'"{info.digest}"'
+    resp = client.get(f"/api/artwork/{info.digest}", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.content == b""
+    assert resp.headers["etag"] == etag
+
+    resp = client.get(
+        f"/api/artwork/{info.digest}", headers={"If-None-Match": f'"other", W/{etag}'}
+    )
+    assert resp.status_code == 304
+
+    resp = client.get(f"/api/artwork/{info.digest}", headers={"If-None-Match": '"x"'})
+    assert resp.status_code == 200
+
+
+def test_artwork_thumbnail(client, tmp_path, monkeypatch):
+    """缩略图在第一次请求该尺寸时生成"""
+    try:
+        fund_exec("ffmpeg")
+    except FileNotFoundError:
+        pytest.skip("ffmpeg not found")
+    _store = ArtworkStore(tmp_path.joinpath("artwork"), thumbnail_sizes=[64])
+    monkeypatch.setattr(router_module, "artwork_store", _store)
+    cover = tmp_path.joinpath("cover.jpg")
+    runner(
+        ["ffmpeg", "-v", "quiet", "-f", "lavfi", "-i", "testsrc=size=300x300"]
+        + ["-frames:v", "1", cover]
+    )
+    info = _store.put(cover.read_bytes())
+    assert not list(_store.root.rglob("*_64.jpg"))
+
+    resp = client.get(f"/api/artwork/{info.digest}", params={"size": 64})
+    assert resp.status_code == 200
+    assert resp.headers["etag"] == f'"{info.digest}_64"'
+    assert resp.content == _store.get(info.digest, 64) != cover.read_bytes()
+
+
+def test_artwork_missing(client, store):
+    assert client.get(f"/api/artwork/{'0' * 40}").status_code == 404
+    assert client.get("/api/artwork/bad").status_code == 404
+
+
+def test_music_artwork_without_cover(client, store, make_wav, tmp_path):
+    wav = make_wav(tmp_path.joinpath("a.wav"))
+    resp = client.get("/api/music_artwork/", params={"file_path": str(wav)})
+    assert resp.status_code == 404
+    resp = client.get("/api/music_artwork/", params={"file_path": str(tmp_path)})
+    assert resp.status_code == 404
+
+
+def test_music_artwork_off_loop(client, store, make_wav, tmp_path, monkeypatch):
+    """保存封面 (摘要 / 写文件) 不在事件循环中执行"""
+    wav = make_wav(tmp_path.joinpath("a.wav"))
+    put, in_loop = store.put, []
+
+    def spy(data):
+        try:
+            asyncio.get_running_loop()
+            in_loop.append(True)
+        except RuntimeError:
+            in_loop.append(False)
+        return put(data)
+
+    async def cover(file_path):
+        return b"\xff\xd8cover"
+
+    monkeypatch.setattr(store, "put", spy)
+    monkeypatch.setattr(router_module, "get_music_artwork_async", cover)
+    resp = client.get("/api/music_artwork/", params={"file_path": str(wav)})
+    assert resp.status_code == 200 and resp.content == b"\xff\xd8cover"
+    assert in_loop == [False]
@@ -0,0 +1,81 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : test_task_artwork_store.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/18 22:50
+
+"""
+import asyncio
+import stat
+
+import pytest
+
+from music_manager.music_lib.artwork_store import ArtworkStore
+from music_manager.music_lib.ffmpeg_operator import fund_exec, runner
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ArtworkStore(tmp_path.joinpath("artwork"))
+
+
+def test_put_dedup(store):
+    first = store.put(b"\xff\xd8cover")
+    second = store.put(b"\xff\xd8cover")
+    assert first == second
+    assert first.mime == "image/jpeg" and first.size == 7
+    assert len(list(store.root.rglob("*.jpg"))) == 1
+    assert store.get(first.digest) == b"\xff\xd8cover"
+    assert store.path(first.digest).parent.name == first.digest[:2]
+
+
+def test_missing(store):
+    assert store.get("0" * 40) is None
+    assert store.path("../../etc/passwd") is None
+
+
+def test_thumbnails(tmp_path):
+    try:
+        fund_exec("ffmpeg")
+    except FileNotFoundError:
+        pytest.skip("ffmpeg not found")
+    cover = tmp_path.joinpath("cover.jpg")
+    runner(
+        ["ffmpeg", "-v", "quiet", "-f", "lavfi", "-i", "testsrc=size=600x600"]
+        + ["-frames:v", "1", cover]
+    )
+    store = ArtworkStore(tmp_path.joinpath("artwork"), thumbnail_sizes=[64, 256, 1024])
+
+    info = store.put(cover.read_bytes())
+
+    assert (info.width, info.height) == (600, 600)
+    # 保存时不生成缩略图, 第一次请求时生成
+    assert store.path(info.digest, 32).name == f"{info.digest}.jpg"
+    assert store.thumbnail(info.digest, 32).name == f"{info.digest}_64.jpg"
+    assert store.path(info.digest, 200).name == f"{info.digest}_256.jpg"
+    # 不生成大于原图的缩略图
+    assert store.thumbnail(info.digest, 800).name == f"{info.digest}.jpg"
+    assert store.info(info.digest) == info
+    assert not list(store.root.rglob(".thumbnail_*"))
+
+    other = store.put(cover.read_bytes() + b"\x00")
+    path = asyncio.run(store.thumbnail_async(other.digest, 64))
+    assert path.name == f"{other.digest}_64.jpg"
+
+
+def test_permissions(store):
+    """原图与缩略图一样, 其他用户可读"""
+    info = store.put(b"\xff\xd8cover")
+    assert stat.S_IMODE(store.path(info.digest).stat().st_mode) == 0o644
+
+
+def test_collect_garbage(store):
+    keep = store.put(b"\xff\xd8keep")
+    drop = store.put(b"\xff\xd8drop")
+    store.path(drop.digest).with_name(f"{drop.digest}_64.jpg").write_bytes(b"x")
+
+    assert store.collect_garbage({keep.digest}) == 1
+    assert store.get(keep.digest) and store.get(drop.digest) is None
+    assert list(store.digests()) == [keep.digest]
+    assert len(list(store.root.rglob("*.jpg"))) == 1
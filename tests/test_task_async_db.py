@@ -0,0 +1,75 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : test_task_async_db.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 04:10
+
+"""
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from music_manager.apis.router import router
+from music_manager.music_lib import models, search as search_module
+from music_manager.music_lib.database import get_async_engine, init
+from music_manager.music_lib.models import Music, save_all
+from music_manager.music_lib.search import search, search_async
+
+
+@pytest.fixture(scope="module")
+def musics():
+    init()
+    musics = [
+        Music(title="异步测试之歌", artist="Async Artist", audio_hash="async-1"),
+        Music(title="异步测试之二", artist="Async Artist", audio_hash="async-2"),
+    ]
+    save_all(musics)
+    return musics
+
+
+def test_async_engine():
+    assert get_async_engine() is not None
+    assert get_async_engine() is get_async_engine()
+
+
+def test_search_async(musics):
+    expected = search("Async Artist")
+    result = asyncio.run(search_async("Async Artist"))
+    assert result.total == expected.total == 2
+    assert [_.id for _ in result.items] == [_.id for _ in expected.items]
+    assert asyncio.run(search_async(" ")).total == 0
+
+
+def test_music_async(musics):
+    assert asyncio.run(Music.get_async(musics[0].id)).title == "异步测试之歌"
+    assert asyncio.run(Music.get_async(-1)) is None
+    assert asyncio.run(Music.find_by_audio_hash_async(["async-2", "missing"])) == {
+        "async-2": None
+    }
+
+    music = Music(title="异步写入")
+    asyncio.run(music.save_to_db_async())
+    assert music.id and Music.get(music.id).title == "异步写入"
+
+
+def test_fallback(musics, monkeypatch):
+    """aiosqlite 未安装时在线程中使用同步引擎"""
+    monkeypatch.setattr(models, "get_async_engine", lambda: None)
+    monkeypatch.setattr(search_module, "get_async_engine", lambda: None)
+
+    assert asyncio.run(Music.get_async(musics[1].id)).title == "异步测试之二"
+    assert asyncio.run(search_async("异步测试")).total == 2
+
+
+def test_api(musics):
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    with TestClient(app) as client:
+        data = client.get(f"/api/music/{musics[0].id}").json()
+        assert data["data"]["title"] == "异步测试之歌"
+        assert client.get("/api/music/-1").json()["code"] == "404"
+        data = client.get("/api/search/", params={"q": "异步测试"}).json()
+        assert data["data"]["total"] == 2
@@ -0,0 +1,71 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : test_task_audio_hash.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 03:40
+
+"""
+import os
+import shutil
+
+import pytest
+from mutagen import File
+
+from music_manager.music_lib.audio_hash import audio_hash
+from music_manager.music_lib.database import init
+from music_manager.music_lib.importer import import_music
+from music_manager.music_lib.models import Music
+
+
+def test_wav_retag(tmp_path, make_wav):
+    fill = os.urandom(4)
+    first = make_wav(tmp_path / "a.wav", title="A", fill=fill)
+    second = make_wav(tmp_path / "b.wav", title="Another Title", fill=fill)
+    other = make_wav(tmp_path / "c.wav", title="A", fill=os.urandom(4))
+
+    assert audio_hash(first) == audio_hash(second)
+    assert audio_hash(first) != audio_hash(other)
+
+
+def _retag(src, dst, **tags):
+    shutil.copy(src, dst)
+    audio = File(dst, easy=True)
+    audio.update(tags)
+    audio.save()
+    return dst
+
+
+@pytest.mark.parametrize("suffix", [".flac", ".mp3"])
+def test_retag(tmp_path, suffix, make_sine):
+    first = make_sine(tmp_path.joinpath(f"a{suffix}"), title="A")
+    second = _retag(
+        first, tmp_path.joinpath(f"b{suffix}"), title="Another Title " * 100
+    )
+
+    assert first.read_bytes() != second.read_bytes()
+    assert audio_hash(first) == audio_hash(second)
+
+
+def test_import_duplicates(tmp_path, make_sine):
+    init()
+    src = tmp_path.joinpath("src")
+    src.mkdir()
+    # 每次测试使用不同的频率, 避免与之前导入的音乐重复
+    frequency = int.from_bytes(os.urandom(2), "big") % 2000 + 200
+    name = f"{frequency}_{os.urandom(4).hex()}"
+    first = make_sine(src.joinpath(f"{name}_a.flac"), frequency, title="A", artist="X")
+    # 只修改了标签的副本
+    _retag(first, src.joinpath(f"{name}_b.flac"), title="B")
+
+    musics = import_music(src)
+    assert len(musics) == 1
+    assert musics[0].audio_hash in Music.find_by_audio_hash([musics[0].audio_hash])
+
+    # 库中已存在
+    again = tmp_path.joinpath("again")
+    again.mkdir()
+    copy = _retag(first, again.joinpath(f"{name}_c.flac"), title="C")
+    assert import_music(again) == []
+    with pytest.raises(FileExistsError):
+        Music.importer(f"{name}_d.flac", copy.read_bytes())
@@ -0,0 +1,31 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : test_task_batch_probe.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/18 22:15
+
+"""
+import pytest
+
+from music_manager.music_lib.batch_probe import probe_many
+
+pytest.importorskip("mutagen")
+
+
+@pytest.mark.parametrize("executor", ["process", "thread"])
+def test_probe_many(tmp_path, make_wav, executor):
+    files = [
+        make_wav(tmp_path.joinpath(f"{_}.wav"), title=f"Title {_}") for _ in range(6)
+    ]
+    missing = tmp_path.joinpath("missing.wav")
+
+    results = list(probe_many(iter(files + [missing]), workers=2, executor=executor))
+
+    assert len(results) == 7
+    by_path = {_.path: _ for _ in results}
+    assert by_path[missing].music is None and by_path[missing].error
+    for _, file in enumerate(files):
+        assert by_path[file].error is None
+        assert by_path[file].music.title == f"Title {_}"
+        assert by_path[file].music.file_full_path == file
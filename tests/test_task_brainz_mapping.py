@@ -0,0 +1,80 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : test_task_brainz_mapping.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 02:50
+
+"""
+import datetime
+
+from sqlalchemy import event
+from sqlmodel import Session, func, select
+
+from music_manager.music_lib.database import engine, init, migrate
+from music_manager.music_lib.models import (
+    BrainZModify,
+    MusicBrainZMapping,
+    mapping_cache,
+    save_all,
+)
+
+
+def _count(name: str) -> int:
+    with Session(engine) as session:
+        return session.exec(
+            select(func.count()).where(MusicBrainZMapping.name == name)
+        ).one()
+
+
+def _mapping(name: str, type_=BrainZModify.artist):
+    return MusicBrainZMapping(
+        type=type_, name=name, update_time=datetime.datetime.now()
+    )
+
+
+def test_add_upsert():
+    init()
+    first = MusicBrainZMapping.add(BrainZModify.artist, "Upsert Artist")
+    mapping_cache.clear()  # 缓存未命中时由唯一索引去重
+    second = MusicBrainZMapping.add(BrainZModify.artist, "Upsert Artist")
+    assert first.id == second.id
+    assert _count("Upsert Artist") == 1
+
+    # 同名的专辑是另一个实体
+    MusicBrainZMapping.add(BrainZModify.album, "Upsert Artist")
+    assert _count("Upsert Artist") == 2
+
+
+def test_cache_skips_database():
+    init()
+    save_all(mappings=[_mapping("Cached Artist")])
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        result = save_all(mappings=[_mapping("Cached Artist") for _ in range(100)])
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert result.rows == 0
+    assert statements == []
+
+
+def test_migrate_collapse_duplicates():
+    init()
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP INDEX ux_music_brain_z_mapping_type_name")
+        for value in ("old", "new"):
+            conn.exec_driver_sql(
+                "INSERT INTO music_brain_z_mapping (type, name, value, update_time) "
+                "VALUES ('artist', 'Duplicated', ?, '2024-01-01')",
+                (value,),
+            )
+    assert _count("Duplicated") == 2
+    migrate()
+    assert _count("Duplicated") == 1
+    with Session(engine) as session:
+        row = session.exec(
+            select(MusicBrainZMapping).where(MusicBrainZMapping.name == "Duplicated")
+        ).one()
+    assert row.value == "new"
@@ -0,0 +1,48 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : test_task_bulk_save.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 01:00
+
+"""
+from pathlib import Path
+
+from sqlmodel import Session, select
+
+from music_manager.music_lib.database import engine, init
+from music_manager.music_lib.models import Music, MusicBrainZMapping, save_all
+
+
+def test_save_all(tmp_path):
+    init()
+    musics = [
+        Music(title=f"Title {_}", artist="Artist", file_full_path=tmp_path / f"{_}")
+        for _ in range(7)
+    ]
+    mappings = [_ for music in musics[:2] for _ in music.brainz_mappings()]
+
+    result = save_all(musics, mappings, chunk_size=3)
+    assert result.rows == 7 + 3  # 重复的 Artist 只写入一次
+    assert result.rows_per_sec > 0
+    assert all(_.id for _ in musics)
+    assert len({_.id for _ in musics}) == 7
+
+    # 已有 id 的行按 id 更新, 新行追加
+    musics[0].title = "Changed"
+    new = Music(title="New", file_full_path=tmp_path / "new")
+    save_all([musics[0], new])
+    with Session(engine) as session:
+        assert session.get(Music, musics[0].id).title == "Changed"
+        assert session.get(Music, musics[0].id).file_full_path == tmp_path / "0"
+        assert session.get(Music, new.id).file_full_path == Path(tmp_path / "new")
+        names = session.exec(
+            select(MusicBrainZMapping.name).where(
+                MusicBrainZMapping.name.in_(["Title 0", "Title 1"])
+            )
+        ).all()
+    assert sorted(names) == ["Title 0", "Title 1"]
+
+
+def test_save_all_empty():
+    assert save_all().rows == 0
@@ -0,0 +1,41 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : test_task_database.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 01:20
+
+"""
+from sqlalchemy import inspect
+
+from music_manager.music_lib.database import engine, init, migrate
+
+
+def test_pragmas():
+    with engine.connect() as conn:
+        pragma = lambda _: conn.exec_driver_sql(f"PRAGMA {_}").scalar()
+        assert pragma("journal_mode") == "wal"
+        assert pragma("synchronous") == 1  # NORMAL
+        assert pragma("cache_size") == -64 * 1024
+        assert pragma("busy_timeout") == 5000
+
+
+def test_migrate_indexes():
+    init()
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP INDEX ix_music_table_file_full_path")
+    migrate()
+    indexes = {_["name"] for _ in inspect(engine).get_indexes("music_table")}
+    assert {
+        "ix_music_table_artist",
+        "ix_music_table_album",
+        "ix_music_table_title",
+        "ix_music_table_file_full_path",
+    } <= indexes
+
+    with engine.connect() as conn:
+        plan = conn.exec_driver_sql(
+            "EXPLAIN QUERY PLAN SELECT id FROM music_table "
+            "WHERE file_full_path >= '/a/' AND file_full_path < '/a0'"
+        ).all()
+    assert "ix_music_table_file_full_path" in str(plan)
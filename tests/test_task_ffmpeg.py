@@ -0,0 +1,93 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : test_task_ffmpeg.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/18 19:40
+
+"""
+import asyncio
+import os
+import time
+
+import pytest
+
+from music_manager.apis.models import MusicId3
+from music_manager.config import settings
+from music_manager.music_lib import native_probe
+from music_manager.music_lib.ffmpeg_operator import _parse_hex_dump, async_runner
+from music_manager.music_lib.probe_cache import probe_cache
+
+
+def test_parse_hex_dump():
+    data = (
+        "\n"
+        "00000000: ffd8 ffe0 0010 4a46 4946 0001 0200 0001  ......JFIF......\n"
+        "00000010: 0001 0000 fffe 000f 4c                   ........L\n"
+    )
+    assert _parse_hex_dump(data) == bytes.fromhex(
+        "ffd8ffe000104a46494600010200000100010000fffe000f4c"
+    )
+
+
+def test_async_runner():
+    stdout, stderr = asyncio.run(async_runner(["echo", "hello"]))
+    assert stdout == b"hello\n"
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(async_runner(["false"]))
+
+
+def test_async_runner_timeout():
+    with pytest.raises(TimeoutError):
+        asyncio.run(async_runner(["sleep", "5"], timeout=0.1))
+
+
+def test_async_runner_cancel(tmp_path):
+    """取消等待的任务时结束子进程"""
+    pid_file = tmp_path.joinpath("pid")
+
+    async def main():
+        task = asyncio.ensure_future(
+            async_runner(["sh", "-c", f"echo $$ > {pid_file}; exec sleep 5"])
+        )
+        while not pid_file.exists() or not pid_file.read_text():
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    start = time.perf_counter()
+    asyncio.run(main())
+    assert time.perf_counter() - start < 2
+    with pytest.raises(ProcessLookupError):
+        os.kill(int(pid_file.read_text()), 0)
+
+
+def test_async_runner_concurrency(monkeypatch):
+    monkeypatch.setattr(settings.ffmpeg_config, "concurrency", 2)
+
+    async def main():
+        start = time.perf_counter()
+        await asyncio.gather(*[async_runner(["sleep", "0.2"]) for _ in range(4)])
+        return time.perf_counter() - start
+
+    assert 0.4 <= asyncio.run(main()) < 0.8
+
+
+@pytest.mark.parametrize("backend", ["native", "auto"])
+def test_from_ffprobe_async_native_once(tmp_path, make_wav, monkeypatch, backend):
+    """native 读取时元数据与封面来自同一次读取, 文件只解析一次"""
+    monkeypatch.setattr(settings, "probe_backend", backend)
+    monkeypatch.setattr(settings.ffmpeg_config, "single_pass", False)
+    monkeypatch.setattr(probe_cache, "enable", False)
+    calls, real = [], native_probe.get_music_meta_artwork
+    monkeypatch.setattr(
+        native_probe,
+        "get_music_meta_artwork",
+        lambda path: calls.append(path) or real(path),
+    )
+    wav = make_wav(tmp_path.joinpath("a.wav"), title="Native")
+    music = asyncio.run(MusicId3.from_ffprobe_async(wav))
+    assert music.title == "Native" and music.artwork_hash is None
+    assert len(calls) == 1
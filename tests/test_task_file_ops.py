@@ -0,0 +1,129 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : test_task_file_ops.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 06:40
+
+"""
+import errno
+import os
+
+import pytest
+
+from music_manager.config import settings
+from music_manager.music_lib import file_ops
+from music_manager.music_lib.database import init
+from music_manager.music_lib.file_ops import place_file
+from music_manager.music_lib.models import Music
+from music_manager.music_lib.music_index import index_paths
+
+
+@pytest.fixture
+def src(tmp_path):
+    src = tmp_path / "src.bin"
+    src.write_bytes(os.urandom(3 * 1024 * 1024 + 7))
+    return src
+
+
+def _raise(code):
+    def func(*args, **kwargs):
+        raise OSError(code, os.strerror(code))
+
+    return func
+
+
+def test_link(src, tmp_path):
+    dst = tmp_path / "library" / "dst.bin"
+    assert place_file(src, dst) == "link"
+    assert dst.stat().st_ino == src.stat().st_ino
+    with pytest.raises(FileExistsError):
+        place_file(src, dst)
+
+
+def test_move(src, tmp_path):
+    data = src.read_bytes()
+    assert place_file(src, tmp_path / "dst.bin", "move") == "rename"
+    assert not src.exists() and (tmp_path / "dst.bin").read_bytes() == data
+
+
+def test_copy(src, tmp_path):
+    dst = tmp_path / "dst.bin"
+    assert place_file(src, dst, "copy") in ("copy_file_range", "sendfile", "copy")
+    assert dst.read_bytes() == src.read_bytes()
+    assert dst.stat().st_ino != src.stat().st_ino
+    assert dst.stat().st_mtime_ns == src.stat().st_mtime_ns
+    assert sorted(_.name for _ in tmp_path.iterdir()) == ["dst.bin", "src.bin"]
+
+
+def test_cross_device(src, tmp_path, monkeypatch):
+    """跨文件系统: 硬链接 / rename 失败时复制, 内核复制不可用时逐级回退"""
+    data = src.read_bytes()
+    monkeypatch.setattr(os, "link", _raise(errno.EXDEV))
+    monkeypatch.setattr(os, "rename", _raise(errno.EXDEV))
+    if hasattr(os, "copy_file_range"):
+        monkeypatch.setattr(os, "copy_file_range", _raise(errno.EXDEV))
+    assert place_file(src, tmp_path / "a.bin") in ("sendfile", "copy")
+    assert (tmp_path / "a.bin").read_bytes() == data
+
+    monkeypatch.setattr(file_ops, "_COPY_METHODS", [])
+    assert place_file(src, tmp_path / "b.bin", "move") == "copy"
+    assert (tmp_path / "b.bin").read_bytes() == data and not src.exists()
+
+
+def test_copy_error(src, tmp_path, monkeypatch):
+    """复制失败时不留下临时文件"""
+    monkeypatch.setattr(os, "link", _raise(errno.EXDEV))
+    monkeypatch.setattr(file_ops, "_COPY_METHODS", [("bad", _raise(errno.EIO))])
+    with pytest.raises(OSError):
+        place_file(src, tmp_path / "dst.bin")
+    assert [_.name for _ in tmp_path.iterdir()] == ["src.bin"]
+
+
+def test_import_file(tmp_path, make_sine):
+    init()
+    frequency = int.from_bytes(os.urandom(2), "big") % 2000 + 200
+    src = make_sine(
+        tmp_path / f"import_{frequency}_{os.urandom(4).hex()}.flac", frequency
+    )
+
+    music = Music.import_file(src)
+
+    assert music.id and music.audio_hash
+    assert music.file_full_path == settings.music_library / src.name
+    assert music.file_full_path.stat().st_ino == src.stat().st_ino
+    with pytest.raises(FileExistsError):
+        Music.import_file(src, mode="copy", filename="other.flac")
+
+
+@pytest.mark.parametrize("suffix", [".flac", ".mp3", ".wav"])
+@pytest.mark.parametrize("mode", ["copy", "move"])
+def test_import_file_not_reindexed(tmp_path, make_sine, make_wav, mode, suffix):
+    """导入时记录的 size / mtime_ns 与文件一致, 索引时不再探测"""
+    init()
+    frequency = int.from_bytes(os.urandom(2), "big") % 2000 + 200
+    src = tmp_path / f"{mode}_{frequency}_{os.urandom(4).hex()}{suffix}"
+    if suffix == ".wav":
+        make_wav(src, title="Imported", fill=os.urandom(4))
+    else:
+        make_sine(src, frequency, title="Imported")
+
+    music = Music.import_file(src, mode=mode)
+
+    assert music.title == "Imported"
+    assert music.mtime_ns == music.file_full_path.stat().st_mtime_ns
+    result = index_paths([music.file_full_path], executor="thread")
+    assert (result.unchanged, result.added, result.updated) == (1, 0, 0)
+
+
+def test_importer_bytes(tmp_path, make_sine):
+    init()
+    frequency = int.from_bytes(os.urandom(2), "big") % 2000 + 200
+    src = make_sine(
+        tmp_path / f"bytes_{frequency}_{os.urandom(4).hex()}.flac", frequency
+    )
+
+    music = Music.importer(src.name, src.read_bytes())
+
+    assert music.file_full_path.read_bytes() == src.read_bytes()
+    assert not settings.data_dir.joinpath("cache", src.name).exists()
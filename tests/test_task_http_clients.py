@@ -0,0 +1,120 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : test_task_http_clients.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 09:00
+
+"""
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from fastapi.testclient import TestClient
+
+from music_manager.config import settings
+from music_manager.music_lib import music_resource
+from music_manager.music_lib.music_resource import (
+    AbcClient,
+    MusicResource,
+    close_clients,
+    get_client,
+)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_GET(self):
+        body = json.dumps([{"id": 1, "name": self.path}]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    """本地 HTTP 服务, 统计建立的 TCP 连接数"""
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    httpd.daemon_threads = True
+    httpd.connections = 0
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def local(server, monkeypatch):
+    """注册一个请求本地服务的平台"""
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    class LocalClient(AbcClient):
+        async def fetch_lyric(self, song_id):
+            return (await self.get(f"{url}/lyric/{song_id}")).text
+
+        async def fetch_id3_by_title(self, title):
+            return (await self.get(f"{url}/search", params={"key": title})).json()
+
+    monkeypatch.setitem(music_resource.RESOURCES, "local", LocalClient)
+    # 本地服务不限速
+    monkeypatch.setitem(settings.rate_limit_config.rates, "local", 0)
+    return LocalClient
+
+
+def test_shared_connections(server, local):
+    async def lookups():
+        for i in range(100):
+            assert await MusicResource("local").fetch_id3_by_title(f"t{i}")
+        await close_clients()
+
+    asyncio.run(lookups())
+    assert server.connections == 1
+
+
+def test_client_per_lookup(server, local):
+    """之前每次请求创建新的客户端: 每次查询都建立连接"""
+
+    async def lookups():
+        for i in range(100):
+            async with local() as client:
+                assert await client.fetch_id3_by_title(f"t{i}")
+
+    asyncio.run(lookups())
+    assert server.connections == 100
+
+
+def test_concurrent_limit(server, local, monkeypatch):
+    monkeypatch.setattr(settings.http_config, "max_connections", 4)
+
+    async def lookups():
+        await asyncio.gather(
+            *(MusicResource("local").fetch_lyric(str(i)) for i in range(100))
+        )
+        await close_clients()
+
+    asyncio.run(lookups())
+    assert server.connections <= 4
+
+
+def test_lifespan(monkeypatch):
+    monkeypatch.setattr(settings.watcher_config, "enable", False)
+    from music_manager.main import app
+
+    with TestClient(app):
+        client = get_client("qmusic")
+        assert not client.is_closed
+        assert set(music_resource._clients) == set(music_resource.RESOURCES)
+    assert client.is_closed and not music_resource._clients
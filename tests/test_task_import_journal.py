@@ -0,0 +1,187 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : test_task_import_journal.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 08:40
+
+"""
+import os
+import random
+import shutil
+
+import pytest
+
+from music_manager.config import settings
+from music_manager.music_lib import importer
+from music_manager.music_lib.audio_hash import audio_hash
+from music_manager.music_lib.database import init
+from music_manager.music_lib.import_journal import (
+    COMMITTED,
+    DUPLICATED,
+    FAILED,
+    HASHED,
+    PLACED,
+    ImportJournal,
+)
+from music_manager.music_lib.importer import import_tree
+from music_manager.music_lib.models import Music
+
+
+def _files(root, make_sine, make_wav, suffixes=(".flac", ".mp3", ".wav")):
+    """每个扩展名一个文件, 音频数据各不相同"""
+    prefix = os.urandom(4).hex()
+    files = []
+    for i, suffix in enumerate(suffixes):
+        path = root / f"{prefix}_{i}{suffix}"
+        if suffix == ".wav":
+            files.append(make_wav(path, title=f"J{i}", fill=os.urandom(4)))
+        else:
+            frequency = f"{random.uniform(200, 4000):.3f}"
+            files.append(make_sine(path, frequency, title=f"J{i}"))
+    return files
+
+
+def _stat(path) -> dict:
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _rewrite(path, make_wav):
+    """改写音频数据, 大小不变, mtime 增加 1 秒"""
+    make_wav(path, title=path.stem, fill=os.urandom(4))
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+
+def test_journal(tmp_path):
+    with ImportJournal(tmp_path) as journal:
+        journal.record(tmp_path / "a.flac", HASHED, hash="1", size=1, mtime_ns=2)
+        journal.record(tmp_path / "a.flac", PLACED, hash="1", dst="/x/a.flac")
+        journal.record(tmp_path / "b.flac", FAILED, error="boom")
+    with open(journal.path, "a") as f:
+        f.write('{"path": "torn')
+
+    with ImportJournal(tmp_path, resume=True) as journal:
+        assert journal.stage(tmp_path / "a.flac") == PLACED
+        # 后续阶段沿用 hashed 记录的 size / mtime_ns
+        entry = journal.entries[str(tmp_path / "a.flac")]
+        assert journal.unchanged(entry, 1, 2) and not journal.unchanged(entry, 1, 3)
+        assert journal.stage(tmp_path / "b.flac") == FAILED
+        assert journal.stage(tmp_path / "c.flac") is None
+        assert [_["dst"] for _ in journal.pending(PLACED)] == ["/x/a.flac"]
+
+    # 不恢复时清空
+    with ImportJournal(tmp_path) as journal:
+        pass
+    assert ImportJournal(tmp_path, resume=True).entries == {}
+
+
+def test_resume_after_failure(tmp_path, make_sine, make_wav, monkeypatch):
+    init()
+    files = _files(tmp_path, make_sine, make_wav)
+    calls, real_save_all = [], importer.save_all
+
+    def save_all(*args, **kwargs):
+        """第一次写入之后中断"""
+        if calls:
+            raise RuntimeError("killed")
+        calls.append(args)
+        return real_save_all(*args, **kwargs)
+
+    monkeypatch.setattr(importer, "save_all", save_all)
+    with pytest.raises(RuntimeError):
+        import_tree(tmp_path, chunk_size=1, place_workers=1, queue_size=1)
+    monkeypatch.undo()
+    assert len(calls) == 1
+
+    hashed = []
+    monkeypatch.setattr(
+        importer, "audio_hash", lambda path: hashed.append(path) or audio_hash(path)
+    )
+    result = import_tree(tmp_path, resume=True)
+    assert result.resumed == 1 and result.imported == 2 and not result.errors
+    # 已写入数据库的文件不再计算摘要
+    assert len(hashed) == 2
+    found = Music.find_by_audio_hash(audio_hash(_) for _ in files)
+    assert sorted(_.suffix for _ in found.values()) == [".flac", ".mp3", ".wav"]
+
+    # 再次恢复: 全部跳过
+    result = import_tree(tmp_path, resume=True)
+    assert result.resumed == 3 and result.imported == 0
+
+
+@pytest.mark.parametrize("suffixes", [(".mp3", ".flac"), (".wav", ".mp3")])
+def test_resume_placed(tmp_path, make_sine, make_wav, suffixes):
+    """放入音乐库之后, 写入数据库之前中断"""
+    init()
+    src = tmp_path / "src"
+    src.mkdir()
+    moved, orphan = _files(src, make_sine, make_wav, suffixes)
+    with ImportJournal(src) as journal:
+        # move 方式已放入音乐库, 源文件已不存在
+        dst = settings.music_library / moved.name
+        digest, stat = audio_hash(moved), _stat(moved)
+        shutil.move(moved, dst)
+        journal.record(moved, HASHED, hash=digest, **stat)
+        journal.record(moved, PLACED, hash=digest, dst=str(dst))
+        # 已放入音乐库, 但日志没有写入
+        shutil.copy(orphan, settings.music_library / orphan.name)
+        orphan_digest = audio_hash(orphan)
+
+    result = import_tree(src, mode="move", resume=True)
+    assert result.imported == 2 and not result.errors
+    # 沿用音乐库中内容相同的文件, 源文件保留
+    assert orphan.exists()
+    found = Music.find_by_audio_hash([digest, orphan_digest])
+    assert found[digest] == dst
+    assert sorted(_.suffix for _ in found.values()) == sorted(suffixes)
+
+    with ImportJournal(src, resume=True) as journal:
+        assert journal.stage(moved) == COMMITTED
+        assert journal.stage(orphan) == COMMITTED
+
+
+def test_resume_modified(tmp_path, make_wav):
+    """中断之后被修改的文件重新导入, 不沿用日志中的摘要"""
+    init()
+    src = tmp_path / "src"
+    src.mkdir()
+    prefix = os.urandom(4).hex()
+    hashed, placed, duplicated = (
+        make_wav(src / f"{prefix}_{name}.wav", fill=os.urandom(4))
+        for name in ("hashed", "placed", "duplicated")
+    )
+    with ImportJournal(src) as journal:
+        journal.record(hashed, HASHED, hash=audio_hash(hashed), **_stat(hashed))
+        dst = settings.music_library / placed.name
+        shutil.copy2(placed, dst)
+        journal.record(placed, HASHED, hash=audio_hash(placed), **_stat(placed))
+        journal.record(placed, PLACED, hash=audio_hash(placed), dst=str(dst))
+        journal.record(duplicated, HASHED, hash="0" * 32, **_stat(duplicated))
+        journal.record(duplicated, DUPLICATED)
+    for path in (hashed, placed, duplicated):
+        _rewrite(path, make_wav)
+
+    result = import_tree(src, mode="copy", resume=True)
+    assert result.imported == 3 and result.resumed == 0 and not result.errors
+    found = Music.find_by_audio_hash(
+        audio_hash(_) for _ in (hashed, placed, duplicated)
+    )
+    assert len(found) == 3
+    assert dst.read_bytes() == placed.read_bytes()
+
+
+def test_name_collision(tmp_path, make_wav):
+    """音乐库中的同名文件内容不同 (例如只有标签不同) 时报告错误, 不删除源文件"""
+    init()
+    src = tmp_path / "src"
+    src.mkdir()
+    name, fill = f"{os.urandom(4).hex()}.wav", os.urandom(4)
+    existing = make_wav(settings.music_library / name, title="Old", fill=fill)
+    before = existing.read_bytes()
+    path = make_wav(src / name, title="New", fill=fill)
+
+    result = import_tree(src, mode="move")
+    assert result.imported == 0 and "同名" in result.errors[str(path)]
+    assert path.exists() and existing.read_bytes() == before
@@ -0,0 +1,162 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : test_task_import_pipeline.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 07:40
+
+"""
+import os
+import random
+import shutil
+import time
+
+import pytest
+
+from music_manager.config import settings
+from music_manager.music_lib import importer
+from music_manager.music_lib.database import init
+from music_manager.music_lib.importer import _DONE, _Pipeline, import_tree
+from music_manager.music_lib.models import Music
+from music_manager.music_lib import music_index
+from music_manager.music_lib.music_index import index_library
+
+
+def _music(path, make_sine, make_wav, **tags):
+    """不同的音频数据: FLAC / MP3 由 ffmpeg 生成, WAV 使用随机的采样"""
+    if path.suffix == ".wav":
+        return make_wav(path, fill=os.urandom(4), **tags)
+    return make_sine(path, f"{random.uniform(200, 4000):.3f}", **tags)
+
+
+def _tree(root, make_sine, make_wav):
+    """两层目录, 每次使用不同的音频与文件名, 避免与其他测试导入的音乐重复"""
+    prefix = os.urandom(4).hex()
+    files = []
+    for i, suffix in enumerate([".flac", ".mp3", ".wav", ".flac"]):
+        sub = root.joinpath(f"disc{i % 2}")
+        sub.mkdir(parents=True, exist_ok=True)
+        path = sub / f"{prefix}_{i}{suffix}"
+        files.append(_music(path, make_sine, make_wav, title=f"T{i}", artist="A"))
+    return prefix, files
+
+
+def test_import_tree(tmp_path, make_sine, make_wav):
+    init()
+    prefix, files = _tree(tmp_path, make_sine, make_wav)
+    # 与 files[0] 音频相同
+    shutil.copy(files[0], tmp_path / f"{prefix}_copy.flac")
+    # 与 files[1] 文件名相同, 音频不同
+    _music(tmp_path / files[1].name, make_sine, make_wav)
+    # 损坏的 STREAMINFO; ffprobe 会把随机数据当作裸 FLAC 流读取, 不使用随机数据
+    tmp_path.joinpath(f"{prefix}_broken.flac").write_bytes(b"fLaC" + bytes(1020))
+    tmp_path.joinpath("cover.jpg").write_bytes(b"jpg")
+    tmp_path.joinpath(f".{prefix}_hidden.flac").write_bytes(b"")
+
+    committed = []
+    result = import_tree(
+        tmp_path, on_commit=committed.extend, queue_size=1, place_workers=2
+    )
+
+    assert result.scanned == 7
+    assert result.imported == 4 and result.duplicated == 1
+    assert len(result.errors) == 2
+    assert str(tmp_path / f"{prefix}_broken.flac") in result.errors
+    # 同名的两个文件先到达查重阶段的被导入
+    assert len(committed) == 4
+    assert {"T0", "T2", "T3"} <= {_.title for _ in committed}
+    for music in committed:
+        assert music.id is not None
+        assert music.artist == "A" or music.title is None
+        assert music.file_full_path.parent == settings.music_library
+        assert music.file_full_path.exists()
+    hashes = Music.find_by_audio_hash(_.audio_hash for _ in committed)
+    assert len(hashes) == 4
+
+    # 再次导入: 全部重复
+    again = import_tree(tmp_path.joinpath("disc0"))
+    assert again.imported == 0 and again.duplicated == 2
+
+
+def test_commit_failure(tmp_path, make_sine, make_wav, monkeypatch):
+    init()
+    _prefix, files = _tree(tmp_path, make_sine, make_wav)
+
+    def save_all(*args, **kwargs):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(importer, "save_all", save_all)
+    with pytest.raises(RuntimeError):
+        import_tree(tmp_path)
+    # 已放入音乐库的文件被撤销
+    for file in files:
+        assert not settings.music_library.joinpath(file.name).exists()
+        assert file.exists()
+
+
+def test_formats_not_reindexed(tmp_path, make_sine, make_wav, monkeypatch):
+    """FLAC / MP3 / WAV 的标签都被读取; 导入的文件在下次索引时不再探测"""
+    init()
+    library = tmp_path / "library"
+    library.mkdir()
+    monkeypatch.setattr(settings, "music_library", library)
+    _prefix, files = _tree(tmp_path / "src", make_sine, make_wav)
+
+    committed = []
+    result = import_tree(tmp_path / "src", mode="copy", on_commit=committed.extend)
+
+    assert result.imported == 4 and not result.errors
+    assert {(_.filename[-4:], _.title, _.artist) for _ in committed} == {
+        (file.name[-4:], f"T{i}", "A") for i, file in enumerate(files)
+    }
+    for music in committed:
+        assert music.mtime_ns == music.file_full_path.stat().st_mtime_ns
+
+    probed = []
+    monkeypatch.setattr(
+        music_index, "probe_many", lambda paths, **kwargs: probed.extend(paths) or []
+    )
+    indexed = index_library(library)
+    assert indexed.unchanged == 4 and not probed
+
+
+def test_backpressure():
+    """下游不取出时, 上游最多多产出队列长度的条目"""
+    pipeline = _Pipeline(queue_size=2)
+    source, output = pipeline.channel(), pipeline.channel()
+    produced = []
+
+    def feed():
+        for i in range(100):
+            if not pipeline.put(source, i):
+                return
+            produced.append(i)
+        pipeline.put(source, _DONE)
+
+    pipeline.start("feed", feed)
+    pipeline.stage("double", lambda items: (_ * 2 for _ in items), 2, source, output)
+    time.sleep(0.5)
+    # source 与 output 各 2 项, 每个线程手中 1 项
+    assert len(produced) <= 2 + 2 + 2
+
+    rest = pipeline.join(output)
+    assert rest and all(_ % 2 == 0 for _ in rest)
+    assert all(not _.is_alive() for _ in pipeline.threads)
+
+
+def test_stage_done():
+    pipeline = _Pipeline(queue_size=4)
+    source, output = pipeline.channel(), pipeline.channel()
+
+    def feed():
+        for i in range(50):
+            pipeline.put(source, i)
+        pipeline.put(source, _DONE)
+
+    pipeline.start("feed", feed)
+    pipeline.stage("batch", lambda items: [sum(items)], 3, source, output, batch=8)
+    total = 0
+    while (item := output.get(timeout=5)) is not _DONE:
+        total += item
+    assert total == sum(range(50))
+    assert pipeline.join(output) == []
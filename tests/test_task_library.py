@@ -0,0 +1,126 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : test_task_library.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 05:20
+
+"""
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from music_manager.apis.router import router
+from music_manager.music_lib.database import engine, init
+from music_manager.music_lib.library import (
+    _statements,
+    list_library,
+    list_library_async,
+)
+from music_manager.music_lib.models import Music, save_all
+
+
+@pytest.fixture(scope="module")
+def musics(tmp_path_factory):
+    init()
+    root = tmp_path_factory.mktemp("library")
+    musics = [
+        Music(
+            title=None if _ % 5 == 0 else f"Library {_ % 7}",
+            artist=f"Library Artist {_ % 3}",
+            lyrics="歌词" * 100,
+            file_full_path=root / f"{_:03d}.flac",
+        )
+        for _ in range(30)
+    ]
+    save_all(musics)
+    return musics
+
+
+def _walk(size: int, **kwargs) -> list[int]:
+    ids, cursor = [], None
+    while True:
+        page = list_library(cursor=cursor, size=size, **kwargs)
+        assert len(page.items) <= size
+        ids += [_["id"] for _ in page.items]
+        if page.next_cursor is None:
+            return ids
+        cursor = page.next_cursor
+
+
+@pytest.mark.parametrize("sort", ["title", "artist", "file_full_path", "id"])
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_pages(musics, sort, order):
+    column = getattr(Music, sort)
+    if order == "desc":
+        ordering = [column.desc(), Music.id.desc()]
+    else:
+        ordering = [column, Music.id]
+    with Session(engine) as session:
+        expected = session.exec(select(Music.id).order_by(*ordering)).all()
+
+    assert _walk(7, sort=sort, order=order) == expected
+
+
+def test_fields(musics):
+    page = list_library(sort="id", size=3)
+    assert "lyrics" not in page.items[0] and "file_full_path" not in page.items[0]
+
+    page = list_library(sort="artist", size=3, fields=["title", "lyrics"])
+    assert set(page.items[0]) == {"title", "lyrics"}
+
+
+def test_invalid(musics):
+    with pytest.raises(ValueError):
+        list_library(sort="lyrics")
+    with pytest.raises(ValueError):
+        list_library(fields=["password"])
+    with pytest.raises(ValueError):
+        list_library(cursor="not a cursor")
+
+
+def test_plan(musics):
+    """带游标的查询都由索引定位, 不随页数变慢"""
+    for sort in ["title", "file_full_path", "id"]:
+        for order in ["asc", "desc"]:
+            cursor = list_library(sort=sort, order=order, size=1).next_cursor
+            stmts, _ = _statements(sort, order, cursor, ["id", "title"])
+            with engine.connect() as conn:
+                for stmt in stmts:
+                    sql = stmt.limit(10).compile(
+                        engine, compile_kwargs={"literal_binds": True}
+                    )
+                    plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").all()
+                    assert all(_[-1].startswith("SEARCH") for _ in plan), plan
+                    assert "TEMP B-TREE" not in str(plan)
+
+
+def test_async(musics):
+    expected = list_library(sort="artist", size=5)
+    result = asyncio.run(list_library_async(sort="artist", size=5))
+    assert result == expected
+    cursor = expected.next_cursor
+    assert asyncio.run(list_library_async(sort="artist", cursor=cursor)) == (
+        list_library(sort="artist", cursor=cursor)
+    )
+
+
+def test_api(musics):
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    with TestClient(app) as client:
+        params = {"sort": "id", "size": 2, "fields": "id, lyrics"}
+        first = client.get("/api/library/", params=params).json()["data"]
+        assert len(first["items"]) == 2 and set(first["items"][0]) == {"id", "lyrics"}
+        params = {"sort": "id", "cursor": first["next_cursor"]}
+        second = client.get("/api/library/", params=params).json()["data"]
+        assert second["items"][0]["id"] > first["items"][-1]["id"]
+        assert "lyrics" not in second["items"][0]
+
+        resp = client.get("/api/library/", params={"cursor": "bad"}).json()
+        assert resp["code"] == "400"
+        resp = client.get("/api/library/", params={"order": "up"})
+        assert resp.status_code == 422
@@ -11,7 +11,10 @@ from pathlib import Path
 
 import pytest
 
-from music_models import *
+from music_manager.config import settings
+from music_manager.music_lib.ffmpeg_operator import fund_exec
+from music_manager.music_lib.model_ffmpeg import *
+from music_manager.music_lib.probe_cache import probe_cache
 
 models_json = Path(__file__).parent.joinpath("models_json")
 
@@ -42,3 +45,19 @@ def test_format_model(format_json):
 def test_stream_model(stream_json):
     model = StreamsModel(**stream_json)
     assert model.codec_type in ("audio", "video", "subtitle")
+
+
+def test_ffprobe_profile(tmp_path, make_wav, monkeypatch):
+    try:
+        fund_exec("ffprobe")
+    except FileNotFoundError:
+        pytest.skip("ffprobe not found")
+    monkeypatch.setattr(settings, "probe_backend", "ffprobe")
+    monkeypatch.setattr(probe_cache, "enable", False)
+    wav = make_wav(tmp_path.joinpath("a.wav"), title="Title", artist="Artist")
+    model = FfprobrModel.from_media_file(wav)
+    assert model.format.format_name == "wav"
+    assert model.format.tags.title == "Title"
+    assert model.format.duration == pytest.approx(1, abs=0.1)
+    assert model.stream_audio[0].sample_rate
+    assert model.format.format_long_name is None  # 未请求的字段
@@ -0,0 +1,80 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : test_task_music_index.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/18 23:50
+
+"""
+import os
+
+import pytest
+from sqlmodel import Session, select
+
+from music_manager.music_lib import music_index
+from music_manager.music_lib.database import engine, init
+from music_manager.music_lib.models import Music
+from music_manager.music_lib.music_index import index_library, scan_library
+
+pytest.importorskip("mutagen")
+
+
+@pytest.fixture
+def library(tmp_path, make_wav):
+    init()
+    root = tmp_path.joinpath("library")
+    root.joinpath("album", ".hidden").mkdir(parents=True)
+    for _ in range(3):
+        make_wav(root.joinpath("album", f"{_}.wav"), title=f"Title {_}")
+    make_wav(root.joinpath("album", ".hidden", "x.wav"))
+    root.joinpath("album", "cover.jpg").write_bytes(b"\xff\xd8")
+    return root
+
+
+def _titles(root) -> dict[str, str]:
+    with Session(engine) as session:
+        rows = session.exec(select(Music.file_full_path, Music.title)).all()
+    return {_.name: title for _, title in rows if str(_).startswith(str(root))}
+
+
+def test_scan_library(library):
+    files = sorted(os.path.basename(_[0]) for _ in scan_library(library))
+    assert files == ["0.wav", "1.wav", "2.wav"]
+
+
+def test_index_library(library, make_wav, monkeypatch):
+    result = index_library(library, workers=1, executor="thread")
+    assert (result.scanned, result.added, result.errors) == (3, 3, {})
+    assert _titles(library) == {f"{_}.wav": f"Title {_}" for _ in range(3)}
+
+    # 未变化的文件不会被探测
+    probed = []
+    probe_many = music_index.probe_many
+
+    def spy(paths, **kwargs):
+        probed.extend(paths)
+        return probe_many(list(paths), **kwargs)
+
+    monkeypatch.setattr(music_index, "probe_many", spy)
+    result = index_library(library, workers=1, executor="thread")
+    assert (result.unchanged, result.added, result.updated) == (3, 0, 0)
+    assert probed == []
+
+    # 修改一个, 删除一个, 新增一个
+    changed = make_wav(library.joinpath("album", "0.wav"), title="Changed", seconds=2)
+    os.utime(changed, ns=(0, 10**18))
+    library.joinpath("album", "1.wav").unlink()
+    make_wav(library.joinpath("3.wav"), title="Title 3")
+    result = index_library(library, workers=1, executor="thread")
+    assert (result.unchanged, result.added, result.updated, result.removed) == (
+        1,
+        1,
+        1,
+        1,
+    )
+    assert sorted(os.path.basename(_) for _ in probed) == ["0.wav", "3.wav"]
+    assert _titles(library) == {
+        "0.wav": "Changed",
+        "2.wav": "Title 2",
+        "3.wav": "Title 3",
+    }
@@ -0,0 +1,93 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : test_task_native_probe.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/18 21:40
+
+"""
+import struct
+
+import pytest
+
+from music_manager.music_lib.model_ffmpeg import FfprobrModel
+from music_manager.music_lib.native_probe import (
+    UnsupportedFormat,
+    get_music_meta_artwork,
+    image_size,
+)
+
+mutagen = pytest.importorskip("mutagen")
+
+PNG = (
+    b"\x89PNG\r\n\x1a\n"
+    + struct.pack(">I", 13)
+    + b"IHDR"
+    + struct.pack(">IIBBBBB", 300, 200, 8, 2, 0, 0, 0)
+)
+JPEG = (
+    b"\xff\xd8"
+    + b"\xff\xe0"
+    + struct.pack(">H", 16)
+    + b"JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00"
+    + b"\xff\xc0"
+    + struct.pack(">HBHHB", 11, 8, 500, 640, 1)
+    + b"\x01\x11\x00"
+)
+
+
+def make_flac(path):
+    """只有 STREAMINFO 的 FLAC: 44100Hz, 2ch, 16bit, 441000 samples"""
+    info = struct.pack(">HH", 4096, 4096) + b"\x00" * 6
+    info += ((44100 << 44) | (1 << 41) | (15 << 36) | 441000).to_bytes(8, "big")
+    info += b"\x00" * 16
+    path.write_bytes(b"fLaC" + bytes([0x80]) + len(info).to_bytes(3, "big") + info)
+    return path
+
+
+def test_image_size():
+    assert image_size(PNG) == (300, 200)
+    assert image_size(JPEG) == (640, 500)
+    assert image_size(b"GIF89a") == (None, None)
+
+
+def test_flac(tmp_path):
+    from mutagen.flac import FLAC, Picture
+
+    file = make_flac(tmp_path.joinpath("a.flac"))
+    _mu = FLAC(file)
+    _mu["TITLE"] = "海阔天空"
+    _mu["ARTIST"] = "BEYOND"
+    _mu["ALBUMARTIST"] = "BEYOND"
+    picture = Picture()
+    picture.data, picture.mime, picture.type = JPEG, "image/jpeg", 3
+    _mu.add_picture(picture)
+    _mu.save()
+
+    meta, artwork = get_music_meta_artwork(file)
+    ffprobe = FfprobrModel.from_meta(meta)
+    assert artwork == JPEG
+    assert ffprobe.format.tags.title == "海阔天空"
+    assert ffprobe.format.tags.album_artist == "BEYOND"
+    assert ffprobe.format.duration == 10
+    assert ffprobe.stream_audio[0].sample_rate == 44100
+    assert (ffprobe.stream_video[0].width, ffprobe.stream_video[0].height) == (640, 500)
+
+
+def test_wav(tmp_path, make_wav):
+    meta, artwork = get_music_meta_artwork(make_wav(tmp_path.joinpath("a.wav")))
+    ffprobe = FfprobrModel.from_meta(meta)
+    assert artwork is None
+    assert ffprobe.format.tags.title == "Title"
+    assert ffprobe.format.tags.artist == "Artist"
+    assert ffprobe.format.duration == 1
+    assert ffprobe.stream_video == []
+
+
+def test_unsupported(tmp_path):
+    file = tmp_path.joinpath("a.ogg")
+    file.write_bytes(b"OggS")
+    with pytest.raises(UnsupportedFormat):
+        get_music_meta_artwork(file)
+    with pytest.raises(UnsupportedFormat):
+        get_music_meta_artwork(make_flac(tmp_path.joinpath("b.mp3")))
@@ -0,0 +1,111 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : test_task_probe_cache.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/18 20:30
+
+"""
+import os
+
+import pytest
+
+from music_manager.music_lib.artwork_store import ArtworkStore
+from music_manager.music_lib.database import init
+from music_manager.music_lib.models import Music, save_all
+from music_manager.music_lib.probe_cache import ProbeCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    _cache = ProbeCache(
+        tmp_path.joinpath("probe_cache.db"),
+        max_entries=2,
+        store=ArtworkStore(tmp_path.joinpath("artwork")),
+    )
+    yield _cache
+    _cache.close()
+
+
+@pytest.fixture
+def music(tmp_path):
+    file = tmp_path.joinpath("a.flac")
+    file.write_bytes(b"fLaC")
+    return file
+
+
+def test_meta(cache, music):
+    assert cache.get_meta(music) is None
+    cache.set_meta(music, {"format": {"size": "4"}})
+    assert cache.get_meta(music) == {"format": {"size": "4"}}
+
+
+def test_changed_file_miss(cache, music):
+    cache.set_meta(music, {"format": {}})
+    music.write_bytes(b"fLaC-changed")
+    assert cache.get_meta(music) is None
+
+
+def test_artwork(cache, music):
+    assert cache.get_artwork(music) == (False, None)
+    cache.set_artwork(music, None)
+    assert cache.get_artwork(music) == (True, None)
+    cache.set_artwork(music, b"\xff\xd8")
+    assert cache.get_artwork(music) == (True, b"\xff\xd8")
+    cache.set_meta(music, {})
+    assert cache.get_artwork(music) == (True, b"\xff\xd8")
+
+
+def test_prune(cache, tmp_path):
+    files = [tmp_path.joinpath(f"{_}.mp3") for _ in range(4)]
+    for _, file in enumerate(files):
+        file.write_bytes(b"ID3")
+        cache.set_meta(file, {})
+        cache.set_artwork(file, b"cover-%d" % _)
+
+    # 0 已变化, 1 已删除, 剩余 2 条不超过 max_entries
+    os.utime(files[0], ns=(0, 0))
+    files[1].unlink()
+    assert cache.prune() == 2
+    assert cache.get_meta(files[2]) == {} and cache.get_meta(files[3]) == {}
+    assert cache.get_artwork(files[2]) == (True, b"cover-2")
+
+
+def test_evict(cache, tmp_path):
+    files = [tmp_path.joinpath(f"{_}.mp3") for _ in range(3)]
+    for _, file in enumerate(files):
+        file.write_bytes(b"ID3")
+        cache.set_meta(file, {})
+    cache.conn.execute(
+        "UPDATE probe_table SET access_time = 0 WHERE path = ?", (str(files[0]),)
+    )
+
+    assert cache.prune() == 1
+    assert cache.get_meta(files[0]) is None
+    assert cache.get_meta(files[2]) == {}
+
+
+def test_prune_artwork(cache, tmp_path):
+    """清理时删除既不被缓存也不被音乐库引用的封面"""
+    files = [tmp_path.joinpath(f"{_}.mp3") for _ in range(2)]
+    for _, file in enumerate(files):
+        file.write_bytes(b"ID3")
+        cache.set_artwork(file, b"\xff\xd8cover-%d" % _)
+    in_library = cache.store.put(b"\xff\xd8library")
+    orphan = cache.store.put(b"\xff\xd8orphan")
+    init()
+    save_all(
+        [
+            Music(
+                file_full_path=tmp_path.joinpath("x.flac"),
+                artwork_hash=in_library.digest,
+            )
+        ]
+    )
+
+    files[0].unlink()
+    assert cache.prune() == 1
+    assert cache.get_artwork(files[1]) == (True, b"\xff\xd8cover-1")
+    assert cache.store.get(in_library.digest) is not None
+    assert cache.store.get(orphan.digest) is None
+    assert cache.store.get(cache.store.digest(b"\xff\xd8cover-0")) is None
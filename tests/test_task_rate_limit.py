@@ -0,0 +1,256 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : test_task_rate_limit.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 10:40
+
+"""
+import asyncio
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from music_manager.apis.router import router
+from music_manager.config import settings
+from music_manager.music_lib import music_resource
+from music_manager.music_lib.music_resource import AbcClient, MusicResource
+from music_manager.music_lib.rate_limit import (
+    CircuitBreaker,
+    CircuitOpenError,
+    ProviderError,
+    TokenBucket,
+    get_guard,
+)
+from music_manager.music_lib.resource_cache import resource_cache
+
+_names = itertools.count()
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.server.hits += 1
+        status, headers = (
+            self.server.responses.pop(0) if self.server.responses else (200, {})
+        )
+        body = json.dumps([{"id": self.server.hits, "name": self.path}]).encode()
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    """本地 HTTP 服务, 按 responses 的顺序返回状态码, 之后返回 200"""
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    httpd.daemon_threads = True
+    httpd.hits = 0
+    httpd.responses = []
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def provider(server, monkeypatch):
+    """每个测试一个新的平台名称, 限速与熔断状态互不影响"""
+    name = f"remote{next(_names)}"
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    class RemoteClient(AbcClient):
+        async def fetch_lyric(self, song_id):
+            return (await self.get(f"{url}/lyric/{song_id}")).text
+
+        async def fetch_id3_by_title(self, title):
+            return (await self.get(f"{url}/search", params={"key": title})).json()
+
+    monkeypatch.setitem(music_resource.RESOURCES, name, RemoteClient)
+    monkeypatch.setattr(resource_cache, "enable", False)
+    conf = settings.rate_limit_config
+    monkeypatch.setitem(conf.rates, name, 0)
+    monkeypatch.setattr(conf, "backoff", 0.01)
+    monkeypatch.setattr(conf, "retries", 2)
+    monkeypatch.setattr(conf, "failure_threshold", 3)
+    monkeypatch.setattr(conf, "cooldown", 30)
+    yield name
+    asyncio.run(music_resource.close_clients())
+
+
+def _run(coro_func):
+    async def run():
+        try:
+            return await coro_func()
+        finally:
+            await music_resource.close_clients()
+
+    return asyncio.run(run())
+
+
+def _search(provider):
+    """直接使用客户端, 异常不被 MusicResource 吞掉"""
+    return music_resource.get_client(provider).fetch_id3_by_title("song")
+
+
+def test_token_bucket():
+    clock = _Clock()
+    bucket = TokenBucket(rate=10, burst=2, clock=clock)
+    assert [bucket.reserve() for _ in range(4)] == pytest.approx([0, 0, 0.1, 0.2])
+    clock.now += 1
+    assert bucket.available() == 2
+
+
+def test_token_bucket_cancel():
+    """等待令牌时取消, 预支的令牌归还"""
+    bucket = TokenBucket(rate=10, burst=1, clock=_Clock())
+    bucket.reserve()
+
+    async def run():
+        task = asyncio.ensure_future(bucket.acquire())
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert bucket.available() == 0
+
+
+def test_circuit_breaker():
+    clock = _Clock()
+    breaker = CircuitBreaker(failure_threshold=2, cooldown=10, clock=clock)
+    breaker.failure()
+    breaker.success()
+    breaker.failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.failure()
+    assert breaker.state == "open" and not breaker.allow()
+    assert breaker.retry_after() == 10
+
+    # 冷却之后只放行一个试探请求, 试探失败时重新熔断
+    clock.now += 10
+    assert breaker.allow() and not breaker.allow()
+    breaker.failure()
+    assert breaker.state == "open"
+    clock.now += 10
+    assert breaker.allow()
+    breaker.success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_retry(server, provider):
+    server.responses = [(503, {}), (429, {"Retry-After": "0"})]
+    result = _run(lambda: _search(provider))
+    assert result[0]["id"] == 3 and server.hits == 3
+    status = get_guard(provider).status()
+    assert status.retries == 2 and status.failures == 0 and status.state == "closed"
+
+
+def test_retries_exhausted(server, provider):
+    server.responses = [(500, {})] * 3
+    with pytest.raises(ProviderError) as e:
+        _run(lambda: _search(provider))
+    assert e.value.status_code == 500 and server.hits == 3
+    # 重试用尽的请求只计一次失败
+    assert get_guard(provider).status().failures == 1
+
+
+def test_not_retried(server, provider):
+    server.responses = [(404, {})] * 3
+    with pytest.raises(ProviderError):
+        _run(lambda: _search(provider))
+    assert server.hits == 1 and get_guard(provider).status().failures == 0
+
+
+def test_circuit_open(server, provider, monkeypatch):
+    monkeypatch.setattr(settings.rate_limit_config, "retries", 0)
+    server.responses = [(502, {})] * 100
+
+    async def lookups():
+        return [
+            await MusicResource(provider).fetch_id3_by_title("x") for _ in range(20)
+        ]
+
+    # 连续失败 3 次后熔断, 之后的请求不再发出
+    assert _run(lookups) == [[]] * 20
+    assert server.hits == 3
+    status = get_guard(provider).status()
+    assert status.state == "open" and status.rejected == 17
+    with pytest.raises(CircuitOpenError):
+        _run(lambda: _search(provider))
+
+    # 冷却之后试探成功, 恢复
+    get_guard(provider).breaker.opened_at -= 30
+    server.responses = []
+    assert _run(lambda: _search(provider))
+    assert get_guard(provider).status().state == "closed"
+
+
+def test_circuit_per_request(server, provider):
+    """每个请求重试 2 次; 连续 3 个请求失败 (9 次响应) 后熔断"""
+    server.responses = [(502, {})] * 100
+    for _ in range(2):
+        with pytest.raises(ProviderError):
+            _run(lambda: _search(provider))
+    status = get_guard(provider).status()
+    assert server.hits == 6 and status.failures == 2 and status.state == "closed"
+    with pytest.raises(ProviderError):
+        _run(lambda: _search(provider))
+    assert server.hits == 9 and get_guard(provider).status().state == "open"
+
+    # 冷却之后的试探请求同样可以重试
+    get_guard(provider).breaker.opened_at -= 30
+    server.responses = [(503, {})]
+    assert _run(lambda: _search(provider))
+    status = get_guard(provider).status()
+    assert server.hits == 11 and status.state == "closed" and status.failures == 0
+
+
+def test_rate_limit(server, provider, monkeypatch):
+    monkeypatch.setitem(settings.rate_limit_config.rates, provider, 20)
+    monkeypatch.setattr(settings.rate_limit_config, "burst", 2)
+
+    async def lookups():
+        return await asyncio.gather(
+            *(MusicResource(provider).fetch_lyric(str(i)) for i in range(12))
+        )
+
+    start = time.perf_counter()
+    assert all(_run(lookups))
+    # 2 个立即发出, 其余 10 个按每秒 20 个排队
+    assert time.perf_counter() - start >= 0.45
+    assert get_guard(provider).status().throttled == 10
+
+
+def test_api(server, provider):
+    _run(lambda: _search(provider))
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    with TestClient(app) as client:
+        data = client.get("/api/resource_status/").json()["data"]
+    status = {_["provider"]: _ for _ in data}
+    assert "smart_tag" not in status and "qmusic" in status
+    assert status[provider]["requests"] == 1 and status[provider]["state"] == "closed"
@@ -0,0 +1,206 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : test_task_resource_cache.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 09:40
+
+"""
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from music_manager.apis.router import router
+from music_manager.music_lib import music_resource
+from music_manager.music_lib.music_resource import AbcClient, MusicResource
+from music_manager.music_lib.resource_cache import (
+    ResourceCache,
+    normalize_query,
+    resource_cache,
+)
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return _Clock()
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    _cache = ResourceCache(
+        tmp_path.joinpath("resource_cache.db"),
+        memory_entries=2,
+        default_ttl=100,
+        ttl={"fast": 10},
+        stale_ttl=50,
+    )
+    _cache.clock = clock
+    yield _cache
+    _cache.close()
+
+
+class _Fetch:
+    """记录调用次数的 fetch, 每次返回不同的结果"""
+
+    def __init__(self, fail=False):
+        self.calls = 0
+        self.fail = fail
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        if self.fail:
+            raise RuntimeError("provider down")
+        return [{"name": "song", "version": self.calls}]
+
+
+def test_normalize():
+    assert normalize_query("  Hello　 ＷＯＲＬＤ ") == "hello world"
+    assert normalize_query("001YVo3U4H3LLH", casefold=False) == "001YVo3U4H3LLH"
+    assert normalize_query({"title": " A ", "full_path": "/x"}) == normalize_query(
+        {"full_path": "/x", "title": "a"}
+    )
+
+
+def test_hit_miss(cache):
+    fetch = _Fetch()
+
+    async def run():
+        first = await cache.get_or_fetch("p", "search", "Title", fetch)
+        second = await cache.get_or_fetch("p", "search", " title ", fetch)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == second and fetch.calls == 1
+    assert cache.stats().misses == 1 and cache.stats().memory_hits == 1
+
+    # 新的实例 (重启): 由 SQLite 命中
+    other = ResourceCache(cache.db_file)
+    other.clock = cache.clock
+    assert asyncio.run(other.get_or_fetch("p", "search", "TITLE", fetch)) == first
+    assert fetch.calls == 1 and other.stats().disk_hits == 1
+    other.close()
+
+
+def test_lru(cache):
+    fetch = _Fetch()
+    for query in ["a", "b", "c"]:
+        asyncio.run(cache.get_or_fetch("p", "search", query, fetch))
+    assert cache.stats().memory_entries == 2
+    # a 已被淘汰出内存, 仍在 SQLite 中
+    asyncio.run(cache.get_or_fetch("p", "search", "a", fetch))
+    assert fetch.calls == 3 and cache.stats().disk_hits == 1
+
+
+def test_stale_while_revalidate(cache, clock):
+    fetch = _Fetch()
+
+    async def run():
+        assert (await cache.get_or_fetch("fast", "search", "q", fetch))[0][
+            "version"
+        ] == 1
+        # 超过 fast 的 ttl (10), 未超过 stale_ttl: 返回旧结果, 后台刷新
+        clock.now += 20
+        stale = await cache.get_or_fetch("fast", "search", "q", fetch)
+        assert stale[0]["version"] == 1
+        await asyncio.sleep(0.05)
+        assert fetch.calls == 2
+        fresh = await cache.get_or_fetch("fast", "search", "q", fetch)
+        assert fresh[0]["version"] == 2
+
+        # 超过 ttl + stale_ttl: 等待平台返回
+        clock.now += 100
+        assert (await cache.get_or_fetch("fast", "search", "q", fetch))[0][
+            "version"
+        ] == 3
+
+        # 其他平台使用 default_ttl (100)
+        await cache.get_or_fetch("slow", "search", "q", fetch)
+        clock.now += 20
+        await cache.get_or_fetch("slow", "search", "q", fetch)
+        assert fetch.calls == 4
+
+    asyncio.run(run())
+    assert cache.stats().stale_hits == 1
+
+
+def test_errors_not_cached(cache, clock):
+    failing = _Fetch(fail=True)
+    with pytest.raises(RuntimeError):
+        asyncio.run(cache.get_or_fetch("p", "lyric", "id", failing))
+    assert asyncio.run(cache.get_or_fetch("p", "lyric", "id", _Fetch())) is not None
+
+    async def refresh():
+        clock.now += 150
+        # 刷新失败时保留旧结果
+        assert await cache.get_or_fetch("p", "lyric", "id", failing)
+        await asyncio.sleep(0.05)
+        assert await cache.get_or_fetch("p", "lyric", "id", failing)
+
+    asyncio.run(refresh())
+    assert cache.stats().refresh_errors >= 1
+
+
+def test_single_flight(cache):
+    fetch = _Fetch()
+
+    async def run():
+        return await asyncio.gather(
+            *(cache.get_or_fetch("p", "search", "same", fetch) for _ in range(20))
+        )
+
+    results = asyncio.run(run())
+    assert fetch.calls == 1 and all(_ == results[0] for _ in results)
+
+
+def test_music_resource(monkeypatch):
+    calls = []
+
+    class SlowClient(AbcClient):
+        async def fetch_lyric(self, song_id):
+            calls.append(song_id)
+            await asyncio.sleep(0.2)
+            return f"[00:00:00]{song_id}"
+
+        async def fetch_id3_by_title(self, title):
+            calls.append(title)
+            await asyncio.sleep(0.2)
+            return [{"name": title}]
+
+    monkeypatch.setitem(music_resource.RESOURCES, "slow", SlowClient)
+    title = f"Cached {time.time()}"
+
+    async def run():
+        await MusicResource("slow").fetch_id3_by_title(title)
+        start = time.perf_counter()
+        for _ in range(100):
+            assert await MusicResource("slow").fetch_id3_by_title(title.upper())
+        per_lookup = (time.perf_counter() - start) / 100
+        # 歌曲 id 区分大小写
+        await MusicResource("slow").fetch_lyric("AbC")
+        await MusicResource("slow").fetch_lyric("abc")
+        await music_resource.close_clients()
+        return per_lookup
+
+    per_lookup = asyncio.run(run())
+    assert calls == [title, "AbC", "abc"]
+    assert per_lookup < 0.001
+
+
+def test_api():
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    with TestClient(app) as client:
+        data = client.get("/api/resource_cache/").json()["data"]
+    assert data["misses"] == resource_cache.stats().misses
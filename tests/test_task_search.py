@@ -0,0 +1,78 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : test_task_search.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 02:00
+
+"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from music_manager.apis.router import router
+from music_manager.music_lib.database import engine, init
+from music_manager.music_lib.models import Music, save_all
+from music_manager.music_lib.search import search
+
+
+@pytest.fixture(scope="module")
+def musics():
+    init()
+    musics = [
+        Music(title="海阔天空", artist="Beyond", album="乐与怒", lyrics="寒夜里看雪飘过"),
+        Music(title="光辉岁月", artist="Beyond", album="命运派对"),
+        Music(title="Other Song", artist="Someone", lyrics="beyond the sea"),
+    ]
+    save_all(musics)
+    return musics
+
+
+def test_search_rank(musics):
+    result = search("Beyond")
+    assert result.total == 3
+    # 艺术家命中的权重高于歌词
+    assert result.items[-1].title == "Other Song"
+    assert result.items[0].lyrics is None  # 不返回歌词
+
+
+def test_search_terms(musics):
+    assert [_.title for _ in search("雪飘过").items] == ["海阔天空"]
+    assert [_.title for _ in search("beyond 岁月").items] == ["光辉岁月"]
+    assert search('"beyond').total == 0
+    assert search("  ").total == 0
+
+
+def test_search_short_query(musics):
+    # 少于 3 个字符使用 LIKE
+    assert [_.title for _ in search("海阔").items] == ["海阔天空"]
+    assert search("%").total == 0
+
+
+def test_search_page(musics):
+    first, second = search("beyond", size=2), search("beyond", page=2, size=2)
+    assert len(first.items) == 2 and len(second.items) == 1
+    assert first.total == second.total == 3
+
+
+def test_search_sync(musics):
+    with Session(engine) as session:
+        music = session.get(Music, musics[1].id)
+        music.title = "不再犹豫"
+        session.add(music)
+        session.commit()
+        assert search("光辉岁月").total == 0
+        assert search("不再犹豫").total == 1
+
+        session.delete(music)
+        session.commit()
+    assert search("不再犹豫").total == 0
+
+
+def test_search_api(musics):
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    resp = TestClient(app).get("/api/search/", params={"q": "雪飘过"})
+    assert resp.status_code == 200
+    assert resp.json()["data"]["items"][0]["title"] == "海阔天空"
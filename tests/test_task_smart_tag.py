@@ -0,0 +1,142 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : test_task_smart_tag.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 10:00
+
+"""
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from music_manager.apis.router import router
+from music_manager.config import settings
+from music_manager.music_lib import music_resource
+from music_manager.music_lib.music_resource import (
+    AbcClient,
+    MusicResource,
+    SmartTagClient,
+)
+from music_manager.music_lib.resource_cache import resource_cache
+
+
+def _provider(delay: float, songs: list[tuple[str, str]], fail=False):
+    class FakeClient(AbcClient):
+        async def fetch_id3_by_title(self, title):
+            await asyncio.sleep(delay)
+            if fail:
+                raise RuntimeError("provider down")
+            return [{"id": i, "name": n, "artist": a} for i, (n, a) in enumerate(songs)]
+
+        async def fetch_lyric(self, song_id):
+            await asyncio.sleep(delay)
+            return "" if fail or not songs else f"lyric {song_id}"
+
+    return FakeClient
+
+
+@pytest.fixture
+def providers(monkeypatch):
+    """fast / medium 有结果, slow 超时, broken 失败"""
+    fakes = {
+        "fast": _provider(0.05, [("Song", "A"), ("Other", "B")]),
+        "medium": _provider(0.15, [("song ", "a"), ("Third", "C")]),
+        "slow": _provider(5, [("Slow", "D")]),
+        "broken": _provider(0.01, [], fail=True),
+    }
+    for name, client in fakes.items():
+        monkeypatch.setitem(music_resource.RESOURCES, name, client)
+    conf = settings.smart_tag_config
+    monkeypatch.setattr(conf, "providers", ["medium", "fast", "slow", "broken"])
+    monkeypatch.setattr(conf, "deadline", 1.0)
+    monkeypatch.setattr(conf, "default_timeout", 0.8)
+    monkeypatch.setattr(conf, "grace", 0.3)
+    monkeypatch.setattr(conf, "timeouts", {})
+    monkeypatch.setattr(resource_cache, "enable", False)
+    yield fakes
+    asyncio.run(music_resource.close_clients())
+
+
+def _search(title):
+    async def run():
+        start = time.perf_counter()
+        result = await MusicResource("smart_tag").fetch_id3_by_title(title)
+        return result, time.perf_counter() - start
+
+    return asyncio.run(run())
+
+
+def test_merge():
+    merged = SmartTagClient.merge(
+        {
+            "a": [{"name": "X", "artist": "1"}, {"name": "Y", "artist": "2"}],
+            "b": [{"name": "x", "artist": "1 "}, {"name": "Z", "artist": "3"}],
+            "c": None,
+        }
+    )
+    assert [(_["name"], _["resource"]) for _ in merged] == [
+        ("X", "a"),
+        ("Y", "a"),
+        ("Z", "b"),
+    ]
+    assert "id" not in merged[0]
+
+
+def test_merge_id():
+    merged = SmartTagClient.merge(
+        {"a": [{"id": 0, "name": "X"}], "b": [{"id": "0", "name": "Y"}]}
+    )
+    assert [(_["id"], _["source_id"]) for _ in merged] == [("a:0", 0), ("b:0", "0")]
+
+
+def test_fan_out(providers):
+    result, seconds = _search({"title": "song", "full_path": "/music/song.flac"})
+    # 按排名交替, 同一排名中 medium 在前; fast 的 ("Song", "A") 与之重复
+    assert [(_["name"], _["resource"]) for _ in result] == [
+        ("song ", "medium"),
+        ("Third", "medium"),
+        ("Other", "fast"),
+    ]
+    # fast 返回后再等待 grace, 不等待 slow
+    assert 0.15 <= seconds < 0.6
+
+
+def test_provider_timeout(providers, monkeypatch):
+    monkeypatch.setattr(settings.smart_tag_config, "timeouts", {"medium": 0.1})
+    result, _ = _search("song")
+    assert {_["resource"] for _ in result} == {"fast"}
+
+
+def test_deadline(providers, monkeypatch):
+    monkeypatch.setattr(settings.smart_tag_config, "providers", ["slow", "broken"])
+    monkeypatch.setattr(settings.smart_tag_config, "deadline", 0.3)
+    result, seconds = _search("song")
+    assert result == [] and seconds < 0.5
+
+
+def test_lyric(providers):
+    async def run():
+        smart = MusicResource("smart_tag")
+        song = (await smart.fetch_id3_by_title("song"))[-1]
+        return (
+            await smart.fetch_lyric(song["id"]),
+            await smart.fetch_lyric("fast:42"),
+            await smart.fetch_lyric("42"),
+            await smart.fetch_lyric("smart_tag:42"),
+        )
+
+    # 搜索结果的 id 可以直接用于获取歌词; 不带平台前缀的 id 不查询
+    assert asyncio.run(run()) == ("lyric 1", "lyric 42", "", "")
+
+
+def test_api(providers):
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    body = {"title": "", "resource": "smart_tag", "full_path": "/music/Song.flac"}
+    with TestClient(app) as client:
+        data = client.post("/api/fetch_id3_by_title/", json=body).json()["data"]
+    assert {_["resource"] for _ in data} == {"fast", "medium"}
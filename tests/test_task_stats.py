@@ -0,0 +1,101 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : test_task_stats.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 06:00
+
+"""
+import asyncio
+import uuid
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlmodel import Session, delete, func, select
+
+from music_manager.apis.router import router
+from music_manager.music_lib.database import engine, init
+from music_manager.music_lib.models import Music, save_all
+from music_manager.music_lib.stats import (
+    library_stats,
+    library_stats_async,
+    rebuild_stats,
+)
+
+
+def _artist(name: str):
+    with engine.connect() as conn:
+        return conn.exec_driver_sql(
+            "SELECT tracks, duration, size FROM artist_stats WHERE artist = ?",
+            (name,),
+        ).first()
+
+
+def _formats() -> dict[str, int]:
+    return {_.name: _.tracks for _ in library_stats().formats}
+
+
+def test_incremental():
+    init()
+    artist, other = f"Stats {uuid.uuid4()}", f"Stats {uuid.uuid4()}"
+    before, formats = library_stats(), _formats()
+    musics = [
+        Music(
+            title=f"Stats {_}",
+            artist=artist,
+            album=artist,
+            filename=f"{_}.{'FLAC' if _ % 2 else 'mp3'}",
+            duration=60.5,
+            size=1000,
+        )
+        for _ in range(4)
+    ]
+    save_all(musics)
+
+    assert tuple(_artist(artist)) == (4, 242.0, 4000)
+    after = library_stats()
+    assert after.tracks == before.tracks + 4
+    assert after.size == before.size + 4000
+    assert after.artists == before.artists + 1
+    assert after.albums == before.albums + 1
+    assert _formats()["flac"] == formats.get("flac", 0) + 2
+    assert _formats()["mp3"] == formats.get("mp3", 0) + 2
+
+    # 修改艺术家: 从原分组移到新分组
+    musics[0].artist = other
+    save_all([musics[0]])
+    assert tuple(_artist(artist)) == (3, 181.5, 3000)
+    assert tuple(_artist(other)) == (1, 60.5, 1000)
+    assert library_stats().artists == before.artists + 2
+
+    # 删除: 数量为 0 的分组被删除
+    with Session(engine) as session:
+        session.exec(delete(Music).where(Music.id.in_([_.id for _ in musics])))
+        session.commit()
+    assert _artist(artist) is None and _artist(other) is None
+    assert library_stats() == before
+
+
+def test_rebuild():
+    init()
+    save_all([Music(title="Rebuild", artist="Rebuild", duration=1.25, size=10)])
+    incremental = library_stats(top=200)
+    rebuild_stats()
+    assert library_stats(top=200) == incremental
+    with Session(engine) as session:
+        assert incremental.tracks == session.exec(select(func.count(Music.id))).one()
+
+
+def test_async():
+    init()
+    assert asyncio.run(library_stats_async(top=5)) == library_stats(top=5)
+
+
+def test_api():
+    init()
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    with TestClient(app) as client:
+        data = client.get("/api/stats/", params={"top": 1}).json()["data"]
+    assert data["tracks"] == library_stats().tracks
+    assert len(data["top_artists"]) <= 1
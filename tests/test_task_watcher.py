@@ -0,0 +1,87 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : test_task_watcher.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 00:40
+
+"""
+import asyncio
+import os
+
+import pytest
+from sqlmodel import Session, select
+
+from music_manager.music_lib.database import engine, init
+from music_manager.music_lib.models import Music
+from music_manager.music_lib.music_index import index_paths
+from music_manager.music_lib.watcher import LibraryWatcher
+
+pytest.importorskip("watchdog")
+pytest.importorskip("mutagen")
+
+
+def test_watcher_coalesce(tmp_path, make_wav):
+    calls = []
+
+    async def main():
+        watcher = LibraryWatcher(tmp_path, debounce=0.3, callback=calls.append)
+        assert await watcher.start()
+        album = tmp_path.joinpath("album")
+        album.mkdir()
+        for _ in range(20):
+            make_wav(album.joinpath(f"{_}.wav"))
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(1)
+        album.joinpath("0.wav").unlink()
+        await asyncio.sleep(1)
+        await watcher.stop()
+
+    asyncio.run(main())
+    assert len(calls) == 2
+    assert str(tmp_path.joinpath("album", "19.wav")) in calls[0]
+    assert calls[1] == [str(tmp_path.joinpath("album", "0.wav"))]
+
+
+def test_watcher_max_delay(tmp_path):
+    calls = []
+
+    async def main():
+        watcher = LibraryWatcher(
+            tmp_path, debounce=0.5, max_delay=0.3, callback=calls.append
+        )
+        await watcher.start()
+        for _ in range(10):
+            tmp_path.joinpath(f"{_}.txt").write_text("")
+            await asyncio.sleep(0.1)
+        await asyncio.sleep(0.8)
+        await watcher.stop()
+
+    asyncio.run(main())
+    assert len(calls) >= 2
+
+
+def test_index_paths(tmp_path, make_wav):
+    init()
+    album = tmp_path.joinpath("album")
+    album.mkdir()
+    files = [make_wav(album.joinpath(f"{_}.wav"), title=f"Title {_}") for _ in range(3)]
+
+    result = index_paths([album, files[0]], workers=1, executor="thread")
+    assert (result.scanned, result.added) == (3, 3)
+
+    files[0].unlink()
+    result = index_paths([files[0], files[1]], workers=1, executor="thread")
+    assert (result.scanned, result.unchanged, result.removed) == (1, 1, 1)
+
+    os.rename(album, tmp_path.joinpath("moved"))
+    result = index_paths([album, tmp_path.joinpath("moved")], executor="thread")
+    assert (result.added, result.removed) == (2, 2)
+    with Session(engine) as session:
+        rows = session.exec(
+            select(Music.file_full_path).where(Music.file_full_path.is_not(None))
+        ).all()
+    assert sorted(_.name for _ in rows if _.parent.parent == tmp_path) == [
+        "1.wav",
+        "2.wav",
+    ]